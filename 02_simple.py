@@ -4,11 +4,12 @@ from typing import TypedDict, Literal, Dict, Any, Annotated, List
 from IPython.display import display, Image
 import graphviz
 from nodes import SpecializedNodes
-from model_manager import LocalModelManager
+from model_manager import create_manager
 from workflow_logger import WorkflowLogger
 from workflow_interface import WorkflowInterface
+from state_schema import WorkflowState
 ##ich uebergebe den manager die auswahl der modelle. er verwaltet das laden und entladen
-manager = LocalModelManager("modelle.json")
+manager = create_manager("modelle.json") # 🔵 NEU: lokal oder über den Inferenz-Daemon
 logger = WorkflowLogger()
 interface = WorkflowInterface()
 nodes = SpecializedNodes(manager, logger, interface)
@@ -21,20 +22,8 @@ nodes = SpecializedNodes(manager, logger, interface)
 #     metrics: list[dict] # Die Performance-Daten
 #     report: str         # Der finale Text
 
-class PortfolioState(TypedDict):
-    # --- Start-Objekt (Die Quelle) ---
-    portfolio_items: List[Dict[str, Any]]
-    # --- Zwischenergebnisse (Parallele Nodes) ---
-    # Wir nutzen den Funktionsnamen als Key (passend zum state_packer)
-    llama_3_2_3_b_node: str  # Analyse von Llama
-    qwen_3_1_7b_node: str    # Daten-Extraktion von Qwen
-    # --- Kontroll-Ebene ---
-    deepseek_r1_7b_node: str # Abgleich & Erkenntnisse
-    # --- Struktur-Ebene ---
-    gemma_2b_node: Dict[str, Any] # Finales JSON-Format
-    # --- Infrastruktur ---
-    metrics: Annotated[List[Dict[str, Any]], operator.add]
-    report: str
+# 🔵 NEU: Gemeinsames Schema (state_schema.py) - Modell-Antworten unter "results", Metriken werden angehängt
+PortfolioState = WorkflowState
 #nodes gestalten
 def calc_total(state: PortfolioState) -> PortfolioState:
     state["total_usd"] = state["amount_usd"] * 1.08
@@ -1,58 +1,57 @@
 import os
 import sys
 import time
+import functools
 venv_site_packages = os.path.join(os.getcwd(), ".venv", "Lib", "site-packages")
 
 # 2. Wir schieben diesen Pfad an die ALLERERSTE Stelle der Suchliste
 if os.path.exists(venv_site_packages):
     sys.path.insert(0, venv_site_packages)
     print(f"---  PFAD-ANKER GESETZT: Nutze .venv aus {venv_site_packages} ---")
-from typing import TypedDict, List, Any
 from langgraph.graph import StateGraph, START, END
 
 # Importiere deine Komponenten
 from nodes import SpecializedNodes
-from model_manager import LocalModelManager
+from model_manager import create_manager
 from workflow_logger import WorkflowLogger
 from workflow_interface import WorkflowInterface
+from state_schema import WorkflowState
 
 # 1. Setup der Infrastruktur
-manager = LocalModelManager("modelle.json")
-logger = WorkflowLogger()
-interface = WorkflowInterface()
-nodes = SpecializedNodes(manager, logger, interface)
+# 🔵 NEU: Erst beim ersten Aufruf bauen, nicht schon beim Import
+@functools.lru_cache(maxsize=None)
+def setup():
+    manager = create_manager("modelle.json") # 🔵 NEU: lokal oder über den Inferenz-Daemon
+    logger = WorkflowLogger()
+    interface = WorkflowInterface()
+    nodes = SpecializedNodes(manager, logger, interface)
+    return nodes, interface
 
-# 2. State Definition (DTO)
-class PortfolioState(TypedDict):
-    portfolio_items: List[dict]
-    metrics: List[dict]
-    report: str
-    # Dynamische Keys für die Modell-Antworten (werden von Decorator befüllt)
-    analyst_out: str
-    teacher_out: str
-    strategist_out: str
+# 2. State Definition (DTO): gemeinsames Schema, Modell-Antworten landen unter "results"
 
 # 3. Test-Konfiguration
 # Liste aller Nodes, die wir einzeln testen wollen
 # Format: (Node_ID_im_Graph, Funktion_in_SpecializedNodes, Anzeigename)
 
-tests = [
-    ("analyst", nodes.llama_3_2_3_b_node, "Llama 3.2 3B"),
-    #("optimizer", nodes.qwen_2_5_7B_node, "Qwen 2.5 7B"),
-    # ("teacher", nodes.deepseek_r1_7b_node, "DeepSeek R1 7B"),
-    ("strategist", nodes.mistral_7b_node, "Mistral 7B v0.3"),
-    #("risk_check", nodes.gemma_2b_node, "Gemma 2B"),
-    #("logic_check", nodes.deepseek_r1_1_5b_node, "DeepSeek R1 1.5B"),
-    ("fast_analyst", nodes.qwen_3_1_7b_node, "Qwen 3 1.7B")
-]
+def get_tests(nodes):
+    return [
+        ("analyst", nodes.llama_3_2_3_b_node, "Llama 3.2 3B"),
+        #("optimizer", nodes.qwen_2_5_7B_node, "Qwen 2.5 7B"),
+        # ("teacher", nodes.deepseek_r1_7b_node, "DeepSeek R1 7B"),
+        ("strategist", nodes.mistral_7b_node, "Mistral 7B v0.3"),
+        #("risk_check", nodes.gemma_2b_node, "Gemma 2B"),
+        #("logic_check", nodes.deepseek_r1_1_5b_node, "DeepSeek R1 1.5B"),
+        ("fast_analyst", nodes.qwen_3_1_7b_node, "Qwen 3 1.7B")
+    ]
 
 def run_single_test(node_id, node_func, label):
     print(f"\n{'-'*60}")
     print(f" STARTE EINZELTEST FÜR: {label}")
     print(f"{'-'*60}")
+    nodes, _ = setup()
     
     # Minimalen Graphen für diesen Test bauen
-    test_workflow = StateGraph(PortfolioState)
+    test_workflow = StateGraph(WorkflowState)
     test_workflow.add_node(node_id, node_func)
     test_workflow.add_node("reporter", nodes.reporter_node)
     test_workflow.add_edge(START, node_id)
@@ -81,6 +80,8 @@ def run_single_test(node_id, node_func, label):
 
 # 4. Hauptschleife: Alle Tests nacheinander ausführen
 if __name__ == "__main__":
+    nodes, interface = setup()
+    tests = get_tests(nodes)
     print(f"Starte Test-Suite für {len(tests)} Modelle...")
     
     for node_id, node_func, label in tests:
@@ -1,56 +1,68 @@
 from langgraph.graph import StateGraph, START, END
-from typing import TypedDict, List, Dict, Any, Optional
 from nodes import SpecializedNodes
-from model_manager import LocalModelManager, get_ts
+from model_manager import create_manager, get_ts
 from workflow_logger import WorkflowLogger
 from workflow_interface import WorkflowInterface
-from workflow_utils import state_packer
-from typing import Annotated
-import operator
-# --- 1. INITIALISIERUNG ---
-# Wir laden alle bereitgestellten Funktionen
-manager = LocalModelManager("modelle.json")
-logger = WorkflowLogger()       
-interface = WorkflowInterface()
-nodes = SpecializedNodes(manager, logger, interface)
+from state_schema import WorkflowState
+import functools
 
 # --- 2. STATE DEFINITION ---
-class PortfolioState(TypedDict, total=False):  # total=False macht den State flexibel
-    portfolio_items: Annotated[list, operator.add]
-    # Die Keys müssen zu den Decorators in nodes.py passen (Model-Namen)
-    # Wenn deine Nodes die Namen als Keys nutzen, lassen wir das Dict flexibel.
-    metrics: List[Dict[str, Any]]
-    report: str
-    report_complete: bool
+# 🔵 NEU: Gemeinsames Schema mit Reducern (state_schema.py) - Nodes liefern nur ihr Delta
 
 # --- 3. NODES GESTALTEN ---
-# Die alten Währungs-Funktionen passen nicht zum PortfolioState TypedDict
+# Die alten Währungs-Funktionen passen nicht zum WorkflowState TypedDict
 # und würden Fehler werfen. Wir konzentrieren uns auf die KI-Nodes.
 
-# --- 4. GRAPH DEFINITION ---
-workflow = StateGraph(Annotated[dict, operator.ior])
+# --- 1. INITIALISIERUNG (lazy) ---
+# 🔵 NEU: Manager, Nodes und Graph erst bei Bedarf bauen (nicht schon beim Import)
+# use_async=True: Async-Nodes für graph.ainvoke() (siehe run_async.py)
+@functools.lru_cache(maxsize=None)
+def build_workflow(use_async: bool = False):
+    # Wir laden alle bereitgestellten Funktionen
+    manager = create_manager("modelle.json") # 🔵 NEU: lokal oder über den Inferenz-Daemon
+    manager.enable_weight_cache() # 🔵 NEU: Konvertierte/quantisierte Gewichte wiederverwenden (model_cache/converted)
+    logger = WorkflowLogger()       
+    interface = WorkflowInterface()
+    nodes = SpecializedNodes(manager, logger, interface)
 
-# Alle bereitgestellten Nodes registrieren
-workflow.add_node("llama", state_packer(nodes.llama_3_2_3_b_node))
-workflow.add_node("qwen", state_packer(nodes.qwen_3_1_7b_node))
-workflow.add_node("strategist", state_packer(nodes.mistral_7b_node))
-#workflow.add_node("teacher", nodes.deepseek_r1_7b_node)
-# workflow.add_node("risk_check", nodes.gemma_2b_node)
-# workflow.add_node("logic_check", nodes.deepseek_r1_1_5b_node)
+    # --- 4. GRAPH DEFINITION ---
+    workflow = StateGraph(WorkflowState)
 
-workflow.add_node("reporter", nodes.reporter_node)
+    # Alle bereitgestellten Nodes registrieren
+    if use_async:
+        workflow.add_node("llama", nodes.allama_3_2_3_b_node)
+        workflow.add_node("qwen", nodes.aqwen_3_1_7b_node)
+        workflow.add_node("strategist", nodes.amistral_7b_node)
+    else:
+        workflow.add_node("llama", nodes.llama_3_2_3_b_node)
+        workflow.add_node("qwen", nodes.qwen_3_1_7b_node)
+        workflow.add_node("strategist", nodes.mistral_7b_node)
+    #workflow.add_node("teacher", nodes.deepseek_r1_7b_node)
+    # workflow.add_node("risk_check", nodes.gemma_2b_node)
+    # workflow.add_node("logic_check", nodes.deepseek_r1_1_5b_node)
 
+    workflow.add_node("reporter", nodes.areporter_node if use_async else nodes.reporter_node)
 
-# --- 5. FLOW DEFINIEREN (Kanten) ---
-# 🔵 Wir bauen eine stabile Kette, die deine 12GB VRAM schont
-workflow.add_edge(START, "llama")
-workflow.add_edge("llama", "strategist")
-workflow.add_edge("strategist", "qwen")
-workflow.add_edge("qwen", "reporter")
-workflow.add_edge("reporter", END)
 
-# Kompilieren
-graph = workflow.compile()
+    # --- 5. FLOW DEFINIEREN (Kanten) ---
+    # 🔵 Wir bauen eine stabile Kette, die deine 12GB VRAM schont
+    workflow.add_edge(START, "llama")
+    workflow.add_edge("llama", "strategist")
+    workflow.add_edge("strategist", "qwen")
+    workflow.add_edge("qwen", "reporter")
+    workflow.add_edge("reporter", END)
+
+    # Kompilieren
+    graph = workflow.compile()
+    nodes.enable_prefetch(graph) # 🔵 NEU: Nächstes Modell im Hintergrund laden
+    nodes.enable_prefix_cache() # 🔵 NEU: KV-Cache für System-Prompt + Quelle wiederverwenden
+    nodes.enable_speculative() # 🔵 NEU: Llama 3B mit Llama 1B als Draft (Assisted Generation)
+    nodes.enable_response_cache() # 🔵 NEU: Unveränderte Nodes nicht erneut rechnen (nur mit Seed/Greedy)
+    nodes.generation_seed = 42 # Fester Seed -> Sampling reproduzierbar; für neue Samples: bypass=True
+    nodes.enable_tracing() # 🔵 NEU: Spans pro Phase -> dAbA/traces (JSONL + Chrome-Trace)
+    nodes.enable_resource_sampler() # 🔵 NEU: RSS/CPU/Gerätespeicher pro Node (Peak + Ø)
+    interface.enable_write_behind() # 🔵 NEU: Tagebuch/DB/Bericht im Hintergrund schreiben, Reporter blockiert nicht
+    return graph, nodes
 
 # --- 6. EXECUTION ---
 if __name__ == "__main__":
@@ -64,6 +76,7 @@ if __name__ == "__main__":
         "metrics": [] 
     }
 
+    graph, nodes = build_workflow()
     print(graph.get_graph().draw_ascii())
     print(f"[{get_ts()}]  Starte Workflow...")
 
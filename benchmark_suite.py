@@ -0,0 +1,437 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import operator
+import statistics
+import subprocess
+from datetime import datetime
+from typing import Annotated
+
+# --- Benchmark-Suite für alle Nodes und Graphen ---
+# Läuft komplett auf der CPU gegen winzige, lokal erzeugte Modelle mit Zufallsgewichten
+# (kein Download, keine GPU). Gemessen wird die Pipeline drumherum: Laden, Tokenisieren,
+# Prefill, Decode und Speicher - nicht die Qualität der Antworten.
+#
+# Aufruf:
+#   python benchmark_suite.py run [--cases node:qwen_3_1_7b_node graph:chain] [--trials 3]
+#   python benchmark_suite.py baseline            # letzten Run als Referenz übernehmen
+#   python benchmark_suite.py compare [--threshold 0.2]   # Exit-Code 1 bei Regression
+#   python benchmark_suite.py state [--sizes 0 1000 10000]  # State-Update-Overhead pro Node (ohne Modelle)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = os.path.join(BASE_DIR, "dAbA", "bench_results.jsonl")
+BASELINE_PATH = os.path.join(BASE_DIR, "dAbA", "bench_baseline.json")
+MODELS_DIR = os.path.join(BASE_DIR, "model_cache", "bench_models")
+SOURCE_PATH = os.path.join(BASE_DIR, "01_Quelle.txt")
+
+# Graphen aus Node-Methoden; Liste = nacheinander, Tupel = parallel (Fan-out)
+GRAPHS = {
+    "chain": ["llama_3_2_3_b_node", "qwen_3_1_7b_node", "deepseek_r1_1_5b_node", "mistral_7b_node"],
+    "fanout": [("llama_3_2_3_b_node", "qwen_3_1_7b_node"), "deepseek_r1_1_5b_node", "mistral_7b_node"],
+}
+
+# Metrik -> True, wenn kleiner besser ist
+METRICS = {
+    "import_sec": True,
+    "load_sec": True,
+    "tokenize_sec": True,
+    "prefill_sec": True,
+    "decode_tps": False,
+    "duration_sec": True,
+    "peak_rss_mb": True,
+}
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+def all_cases() -> list:
+    from nodes import SpecializedNodes
+    return [f"node:{name}" for name in SpecializedNodes.NODE_MODELS] + [f"graph:{name}" for name in GRAPHS]
+
+# ------------------------------------------------------------------ Mini-Modelle
+def build_tiny_models(models_dir: str = MODELS_DIR, hidden_size: int = 128, layers: int = 4) -> str:
+    """
+    Erzeugt pro Modell aus SpecializedNodes.NODE_MODELS ein Llama-Modell mit Zufallsgewichten
+    und einem auf 01_Quelle.txt trainierten BPE-Tokenizer (mit Chat-Template).
+    Liefert den Pfad zu einer passenden modelle.json. Bereits erzeugte Modelle werden wiederverwendet.
+    """
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers, trainers, decoders
+    from transformers import PreTrainedTokenizerFast, LlamaConfig, LlamaForCausalLM
+    from nodes import SpecializedNodes
+
+    tokenizer_dir = os.path.join(models_dir, "_tokenizer")
+    if not os.path.exists(os.path.join(tokenizer_dir, "tokenizer.json")):
+        bpe = Tokenizer(models.BPE(unk_token="<unk>"))
+        bpe.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+        bpe.decoder = decoders.ByteLevel()
+        trainer = trainers.BpeTrainer(vocab_size=1000, special_tokens=["<unk>", "<s>", "</s>", "<pad>"],
+                                      initial_alphabet=pre_tokenizers.ByteLevel.alphabet())
+        with open(SOURCE_PATH, "r", encoding="utf-8") as f:
+            bpe.train_from_iterator([f.read()], trainer)
+        tokenizer = PreTrainedTokenizerFast(tokenizer_object=bpe, bos_token="<s>", eos_token="</s>",
+                                            unk_token="<unk>", pad_token="<pad>",
+                                            model_input_names=["input_ids", "attention_mask"])
+        tokenizer.chat_template = (
+            "{% for m in messages %}<s>{{ m['role'] }}\n{{ m['content'] }}</s>\n{% endfor %}"
+            "{% if add_generation_prompt %}<s>assistant\n{% endif %}"
+        )
+        tokenizer.save_pretrained(tokenizer_dir)
+    tokenizer = PreTrainedTokenizerFast.from_pretrained(tokenizer_dir)
+
+    entries = []
+    for seed, name in enumerate(SpecializedNodes.NODE_MODELS.values()):
+        path = os.path.join(models_dir, name.replace("/", "__"))
+        if not os.path.exists(os.path.join(path, "config.json")):
+            torch.manual_seed(seed)
+            config = LlamaConfig(vocab_size=len(tokenizer), hidden_size=hidden_size,
+                                 intermediate_size=hidden_size * 2, num_hidden_layers=layers,
+                                 num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=8192,
+                                 bos_token_id=tokenizer.bos_token_id, eos_token_id=tokenizer.eos_token_id,
+                                 pad_token_id=tokenizer.pad_token_id)
+            LlamaForCausalLM(config).save_pretrained(path)
+            tokenizer.save_pretrained(path)
+            print(f"[{get_ts()}] [BENCH] Mini-Modell erzeugt: {name} -> {path}")
+        # Festes Profil statt "auto": Messwerte bleiben vergleichbar, egal welche CPU-Flags der Host hat
+        entries.append({"name": name, "path": path, "profile": "fp32"})
+
+    json_path = os.path.join(models_dir, "modelle.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2)
+    return json_path
+
+# ------------------------------------------------------------------ Worker (eigener Prozess pro Fall)
+def _bench_source(source_chars: int) -> str:
+    with open(SOURCE_PATH, "r", encoding="utf-8") as f:
+        return f.read()[:source_chars]
+
+def _make_nodes(json_path: str, max_new_tokens: int):
+    from nodes import SpecializedNodes
+    from model_manager import LocalModelManager
+    from workflow_logger import WorkflowLogger
+
+    manager = LocalModelManager(json_path, quantize=False)
+    nodes = SpecializedNodes(manager, WorkflowLogger(), interface=None)
+    nodes.stream_console = False
+    # Feste Tokenzahl + Greedy: jede Wiederholung decodiert exakt gleich viel
+    nodes.generation_overrides = {"max_new_tokens": max_new_tokens, "min_new_tokens": max_new_tokens,
+                                  "do_sample": False}
+    return manager, nodes
+
+def _metrics_from_state(metrics: list) -> dict:
+    """Verdichtet die Node-Metriken eines Trials (bei Graphen: Summe bzw. Mittel über die Nodes)."""
+    def values(key):
+        return [m[key] for m in metrics if m.get(key) is not None]
+    decode = values("decode_tps")
+    return {
+        "tokenize_sec": round(sum(values("tokenize_sec")), 4),
+        "prefill_sec": round(sum(values("ttft_sec")), 4) if values("ttft_sec") else None,
+        "decode_tps": round(statistics.mean(decode), 2) if decode else None,
+    }
+
+def _run_node_trial(json_path, func_name, source, max_new_tokens):
+    from nodes import SpecializedNodes
+    manager, nodes = _make_nodes(json_path, max_new_tokens)
+
+    start = time.perf_counter()
+    manager.load_by_name(SpecializedNodes.NODE_MODELS[func_name])
+    manager.release_thread_models()
+    load_sec = time.perf_counter() - start
+
+    # Vorgänger-Ausgaben als Platzhalter, damit Fan-in-Nodes realistische Prompts bekommen
+    results = {model_name: {"answer": source[:2000]} for model_name in SpecializedNodes.NODE_MODELS.values()}
+    results.pop(SpecializedNodes.NODE_MODELS[func_name])
+    state = {"portfolio_items": source, "results": results, "metrics": []}
+
+    start = time.perf_counter()
+    delta = getattr(nodes, func_name)(state)
+    duration = time.perf_counter() - start
+    return {"load_sec": round(load_sec, 4), "duration_sec": round(duration, 4),
+            **_metrics_from_state(delta["metrics"])}
+
+def _run_graph_trial(json_path, graph_name, source, max_new_tokens):
+    from langgraph.graph import StateGraph, START, END
+    from nodes import SpecializedNodes
+    from state_schema import WorkflowState
+    manager, nodes = _make_nodes(json_path, max_new_tokens)
+
+    # Gemeinsames Schema wie in den Workflows: Deltas der Nodes über die Reducer zusammenführen
+    workflow = StateGraph(WorkflowState)
+    previous = [START]
+    func_names = []
+    for step in GRAPHS[graph_name]:
+        step = step if isinstance(step, tuple) else (step,)
+        for func_name in step:
+            workflow.add_node(func_name, getattr(nodes, func_name))
+            for source_node in previous:
+                workflow.add_edge(source_node, func_name)
+            func_names.append(func_name)
+        previous = list(step)
+    for source_node in previous:
+        workflow.add_edge(source_node, END)
+    graph = workflow.compile()
+
+    start = time.perf_counter()
+    for func_name in func_names:
+        manager.load_by_name(SpecializedNodes.NODE_MODELS[func_name])
+    manager.release_thread_models()
+    load_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    final_state = graph.invoke({"portfolio_items": source, "metrics": []})
+    duration = time.perf_counter() - start
+    return {"load_sec": round(load_sec, 4), "duration_sec": round(duration, 4),
+            **_metrics_from_state(final_state["metrics"])}
+
+def run_worker(case: str, trials: int, max_new_tokens: int, source_chars: int, json_path: str) -> dict:
+    kind, name = case.split(":", 1)
+    source = _bench_source(source_chars)
+
+    # torch/transformers werden lazy importiert - getrennt messen, sonst landet es im ersten Laden
+    start = time.perf_counter()
+    import transformers
+    transformers.AutoModelForCausalLM
+    import_sec = time.perf_counter() - start
+    runner = _run_node_trial if kind == "node" else _run_graph_trial
+
+    samples = [runner(json_path, name, source, max_new_tokens) for _ in range(trials)]
+    from resource_sampler import process_peak_rss_mb
+    result = {"trials": trials, "import_sec": round(import_sec, 4), "peak_rss_mb": round(process_peak_rss_mb(), 1)}
+    for key in samples[0]:
+        values = [s[key] for s in samples if s[key] is not None]
+        result[key] = round(statistics.median(values), 4) if values else None
+    return result
+
+# ------------------------------------------------------------------ State-Update-Overhead
+def _full_state_node(model_key: str):
+    """Früheres Protokoll: ganzen State kopieren und metrics neu zusammensetzen (State als ior-dict)."""
+    def node(state):
+        new_state = state.copy()
+        new_state[model_key] = {"answer": "x"}
+        new_state["metrics"] = state.get("metrics", []) + [{"model": model_key}]
+        return new_state
+    return node
+
+def _delta_node(model_key: str):
+    """Aktuelles Protokoll: nur das Delta, Reducer aus WorkflowState."""
+    from state_schema import node_delta
+    def node(state):
+        return node_delta(model_key, {"answer": "x"}, {"model": model_key})
+    return node
+
+def _state_graph(protocol: str, n_nodes: int):
+    from langgraph.graph import StateGraph, START, END
+    from state_schema import WorkflowState
+    full = protocol == "full_state"
+    workflow = StateGraph(Annotated[dict, operator.ior] if full else WorkflowState)
+    previous = START
+    for i in range(n_nodes):
+        node_id = f"node_{i}"
+        workflow.add_node(node_id, (_full_state_node if full else _delta_node)(f"model_{i}"))
+        workflow.add_edge(previous, node_id)
+        previous = node_id
+    workflow.add_edge(previous, END)
+    return workflow.compile()
+
+def measure_state_updates(sizes: list, n_nodes: int = 8, repeats: int = 7) -> list:
+    """
+    Overhead pro Node für die State-Übergabe (Dummy-Nodes ohne Inferenz), abhängig von der State-Größe
+    (Anzahl vorhandener Ergebnisse und Metrik-Einträge). graph_us: graph.invoke / Nodes (inkl. LangGraph),
+    update_us: nur Node-Rückgabe + Zusammenführen, wie es der Reducer tut.
+    """
+    from state_schema import apply_delta
+    rows = []
+    for size in sizes:
+        metrics = [{"model": f"m{i}", "duration_sec": 0.1} for i in range(size)]
+        results = {f"m{i}": {"answer": "x" * 200} for i in range(size)}
+        for protocol in ("full_state", "delta"):
+            if protocol == "full_state":
+                state = {"portfolio_items": "x" * 1000, "metrics": metrics, **results}
+                node, merge = _full_state_node("model_x"), operator.ior
+            else:
+                state = {"portfolio_items": "x" * 1000, "metrics": metrics, "results": results}
+                node, merge = _delta_node("model_x"), apply_delta
+            graph = _state_graph(protocol, n_nodes)
+            graph.invoke(state) # Aufwärmen
+            graph_times, update_times = [], []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                graph.invoke(state)
+                graph_times.append((time.perf_counter() - start) / n_nodes)
+                start = time.perf_counter()
+                merge(dict(state), node(state))
+                update_times.append(time.perf_counter() - start)
+            rows.append({"size": size, "protocol": protocol,
+                         "graph_us": round(statistics.median(graph_times) * 1e6, 1),
+                         "update_us": round(statistics.median(update_times) * 1e6, 1)})
+    return rows
+
+def cmd_state(args):
+    rows = measure_state_updates(args.sizes, args.nodes, args.repeats)
+    print(f"[{get_ts()}] [BENCH] State-Update pro Node ({args.nodes} Nodes, Median aus {args.repeats})")
+    print(f"{'Einträge':>9} | {'Protokoll':<10} | {'Graph µs/Node':>13} | {'Update µs':>9}")
+    for row in rows:
+        print(f"{row['size']:>9} | {row['protocol']:<10} | {row['graph_us']:>13} | {row['update_us']:>9}")
+
+# ------------------------------------------------------------------ Ergebnisse & Vergleich
+def git_revision() -> dict:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BASE_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+        return {"git_rev": rev, "git_dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"git_rev": "unknown", "git_dirty": None}
+
+def load_runs() -> list:
+    if not os.path.exists(RESULTS_PATH):
+        return []
+    with open(RESULTS_PATH, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def compare(run: dict, baseline: dict, threshold: float, min_abs: float = 0.005) -> list:
+    """
+    Liefert die Regressionen von run gegenüber baseline. Kleine absolute Unterschiede
+    (min_abs) werden ignoriert - bei Mini-Modellen liegen viele Zeiten im Millisekundenbereich.
+    """
+    regressions = []
+    for case, base_metrics in baseline["cases"].items():
+        current = run["cases"].get(case)
+        if not current or "error" in current or "error" in base_metrics:
+            continue
+        for metric, lower_is_better in METRICS.items():
+            base, new = base_metrics.get(metric), current.get(metric)
+            if base is None or new is None or base == 0:
+                continue
+            change = (new - base) / base
+            worse = change > threshold if lower_is_better else change < -threshold
+            status = "REGRESSION" if worse and abs(new - base) >= min_abs else "ok"
+            print(f"[{get_ts()}] [BENCH] {case:<32} {metric:<13} {base:>10} -> {new:>10} ({change:+.1%}) {status}")
+            if status == "REGRESSION":
+                regressions.append((case, metric, base, new, change))
+    return regressions
+
+def cmd_run(args):
+    json_path = build_tiny_models()
+    cases = args.cases or all_cases()
+    run = {
+        "run_id": datetime.now().strftime("%Y%m%d-%H%M%S"),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        **git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "trials": args.trials,
+        "max_new_tokens": args.max_new_tokens,
+        "source_chars": args.source_chars,
+        "cases": {},
+    }
+    for case in cases:
+        argv = [sys.executable, os.path.abspath(__file__), "_worker", case, "--trials", str(args.trials),
+                "--max-new-tokens", str(args.max_new_tokens), "--source-chars", str(args.source_chars),
+                "--models-json", json_path]
+        # Eigener Prozess pro Fall: kalter Start und eigener Peak-RSS
+        proc = subprocess.run(argv, cwd=BASE_DIR, capture_output=True, text=True,
+                              env={**os.environ, "CUDA_VISIBLE_DEVICES": ""})
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("BENCH_RESULT ")]
+        if proc.returncode != 0 or not lines:
+            error = (proc.stderr.strip().splitlines() or ["unbekannter Fehler"])[-1]
+            run["cases"][case] = {"error": error}
+            print(f"[{get_ts()}] [BENCH] {case:<32} FEHLER: {error}")
+            continue
+        result = json.loads(lines[-1][len("BENCH_RESULT "):])
+        run["cases"][case] = result
+        print(f"[{get_ts()}] [BENCH] {case:<32} Laden {result['load_sec']:.3f}s | Tokenisieren {result['tokenize_sec']:.4f}s | "
+              f"Prefill {result['prefill_sec']}s | Decode {result['decode_tps']} t/s | Peak {result['peak_rss_mb']:.0f} MB")
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+    print(f"[{get_ts()}] [BENCH] Run {run['run_id']} ({run['git_rev']}{'+dirty' if run['git_dirty'] else ''}) -> {RESULTS_PATH}")
+
+    if args.gate:
+        args.run_id = run["run_id"]
+        cmd_compare(args)
+
+def cmd_baseline(args):
+    runs = load_runs()
+    if not runs:
+        raise SystemExit("[BENCH] Noch keine Ergebnisse - erst 'run' ausführen.")
+    run = next((r for r in runs if r["run_id"] == args.run_id), None) if args.run_id else runs[-1]
+    if run is None:
+        raise SystemExit(f"[BENCH] Run {args.run_id} nicht gefunden.")
+    with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+    print(f"[{get_ts()}] [BENCH] Baseline = Run {run['run_id']} ({run['git_rev']}) -> {BASELINE_PATH}")
+
+def cmd_compare(args):
+    if not os.path.exists(args.baseline):
+        raise SystemExit(f"[BENCH] Keine Baseline unter {args.baseline} - erst 'baseline' ausführen.")
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    runs = load_runs()
+    run = next((r for r in runs if r["run_id"] == args.run_id), None) if args.run_id else (runs[-1] if runs else None)
+    if run is None:
+        raise SystemExit("[BENCH] Kein Run zum Vergleichen gefunden.")
+
+    print(f"[{get_ts()}] [BENCH] Vergleich {run['run_id']} ({run['git_rev']}) gegen Baseline "
+          f"{baseline['run_id']} ({baseline['git_rev']}), Schwelle {args.threshold:.0%}")
+    regressions = compare(run, baseline, args.threshold)
+    if regressions:
+        print(f"[{get_ts()}] [BENCH] {len(regressions)} Regression(en) über {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"[{get_ts()}] [BENCH] Keine Regression.")
+
+# --- EXECUTION ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CPU-Benchmarks für alle Nodes und Graphen mit Mini-Modellen.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Benchmarks ausführen und speichern")
+    run_parser.add_argument("--cases", nargs="*", help="z.B. node:qwen_3_1_7b_node graph:chain (Standard: alle)")
+    run_parser.add_argument("--trials", type=int, default=3)
+    run_parser.add_argument("--max-new-tokens", type=int, default=32)
+    run_parser.add_argument("--source-chars", type=int, default=6000, help="Länge der Quelle (Zeichen)")
+    run_parser.add_argument("--gate", action="store_true", help="Direkt gegen die Baseline prüfen")
+    run_parser.add_argument("--threshold", type=float, default=0.2)
+    run_parser.add_argument("--baseline", default=BASELINE_PATH)
+    run_parser.set_defaults(func=cmd_run)
+
+    baseline_parser = sub.add_parser("baseline", help="Einen Run (Standard: letzter) als Baseline speichern")
+    baseline_parser.add_argument("--run-id")
+    baseline_parser.set_defaults(func=cmd_baseline)
+
+    compare_parser = sub.add_parser("compare", help="Run gegen Baseline prüfen (Exit-Code 1 bei Regression)")
+    compare_parser.add_argument("--run-id", help="Standard: letzter Run")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="erlaubte relative Verschlechterung")
+    compare_parser.add_argument("--baseline", default=BASELINE_PATH)
+    compare_parser.set_defaults(func=cmd_compare)
+
+    state_parser = sub.add_parser("state", help="State-Update-Overhead pro Node: Delta vs. kopierter State")
+    state_parser.add_argument("--sizes", nargs="*", type=int, default=[0, 100, 1000, 10000],
+                              help="Anzahl vorhandener Ergebnisse/Metrik-Einträge im State")
+    state_parser.add_argument("--nodes", type=int, default=8)
+    state_parser.add_argument("--repeats", type=int, default=7)
+    state_parser.set_defaults(func=cmd_state)
+
+    worker_parser = sub.add_parser("_worker")
+    worker_parser.add_argument("case")
+    worker_parser.add_argument("--trials", type=int, default=3)
+    worker_parser.add_argument("--max-new-tokens", type=int, default=32)
+    worker_parser.add_argument("--source-chars", type=int, default=6000)
+    worker_parser.add_argument("--models-json", required=True)
+
+    args = parser.parse_args(argv)
+    if args.command == "_worker":
+        result = run_worker(args.case, args.trials, args.max_new_tokens, args.source_chars, args.models_json)
+        print("BENCH_RESULT " + json.dumps(result))
+        return
+    if args.command == "run" and args.gate:
+        args.run_id = None
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
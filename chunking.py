@@ -0,0 +1,40 @@
+def split_by_tokens(tokenizer, text: str, chunk_tokens: int, overlap: int) -> list:
+    """
+    Teilt einen Text nach Tokens des Ziel-Tokenizers in überlappende Abschnitte.
+    Geschnitten wird über die Zeichen-Offsets der Tokens, damit der Text exakt erhalten bleibt.
+    """
+    if overlap >= chunk_tokens:
+        raise ValueError(f"Overlap ({overlap}) muss kleiner als die Chunk-Größe ({chunk_tokens}) sein")
+
+    encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    offsets = encoding["offset_mapping"]
+    if len(offsets) <= chunk_tokens:
+        return [text]
+
+    chunks = []
+    start = 0
+    step = chunk_tokens - overlap
+    while start < len(offsets):
+        end = min(start + chunk_tokens, len(offsets))
+        chunks.append(text[offsets[start][0]:offsets[end - 1][1]])
+        if end == len(offsets):
+            break
+        start += step
+    return chunks
+
+def count_tokens(tokenizer, text: str) -> int:
+    return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+def group_for_reduce(tokenizer, partials: list, max_tokens: int) -> list:
+    """Fasst Teilergebnisse zu Gruppen zusammen, die jeweils in ein Reduce-Prompt passen."""
+    groups, current, current_tokens = [], [], 0
+    for partial in partials:
+        tokens = count_tokens(tokenizer, partial)
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(partial)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
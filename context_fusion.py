@@ -0,0 +1,167 @@
+import re
+import time
+from chunking import count_tokens
+from stopping import SENTENCE_END
+
+# Einheiten für Auswahl und Dedup: Sätze und Zeilen (Listenpunkte bleiben ganz)
+UNIT_BOUNDARY = re.compile(SENTENCE_END.pattern + r"|\n+")
+WORD = re.compile(r"\w+")
+STRATEGIES = ("truncate", "extractive")
+
+def split_units(text: str) -> list:
+    """Teilt in Sätze/Zeilen; Trennzeichen bleiben am Ende der Einheit (''.join ergibt den Text)."""
+    units, start = [], 0
+    for match in UNIT_BOUNDARY.finditer(text):
+        if text[start:match.end()].strip():
+            units.append(text[start:match.end()])
+        start = match.end()
+    if text[start:].strip():
+        units.append(text[start:])
+    return units
+
+def _words(unit: str) -> list:
+    return WORD.findall(unit.lower())
+
+def _dedup(contributions: list, similarity: float) -> int:
+    """
+    Entfernt doppelte Einheiten über alle Beiträge hinweg (exakt nach Normalisierung oder
+    Wort-Jaccard >= similarity). Frühere Beiträge haben Vorrang. Liefert die Zahl entfernter Einheiten.
+    """
+    seen_exact, seen_sets, removed = set(), [], 0
+    for contribution in contributions:
+        kept = []
+        for unit in contribution["units"]:
+            words = _words(unit)
+            key = " ".join(words)
+            word_set = set(words)
+            duplicate = not key or key in seen_exact or (len(word_set) >= 5 and any(
+                len(word_set & other) / len(word_set | other) >= similarity for other in seen_sets))
+            if duplicate:
+                removed += 1
+                continue
+            seen_exact.add(key)
+            if len(word_set) >= 5:
+                seen_sets.append(word_set)
+            kept.append(unit)
+        contribution["units"] = kept
+    return removed
+
+def _allocate(needs: list, weights: list, budget: int) -> list:
+    """Budget nach Gewichten verteilen; was ein Beitrag nicht braucht, geht an die übrigen (Water-Filling)."""
+    allocation = [0] * len(needs)
+    open_ids = [i for i, need in enumerate(needs) if need > 0]
+    remaining = budget
+    while open_ids and remaining > 0:
+        total_weight = sum(weights[i] for i in open_ids)
+        shares = {i: int(remaining * weights[i] / total_weight) for i in open_ids}
+        satisfied = [i for i in open_ids if needs[i] - allocation[i] <= shares[i]]
+        if not satisfied:
+            for i in open_ids:
+                allocation[i] += shares[i]
+            break
+        for i in satisfied:
+            remaining -= needs[i] - allocation[i]
+            allocation[i] = needs[i]
+            open_ids.remove(i)
+    return allocation
+
+def _truncate_text(tokenizer, text: str, max_tokens: int) -> str:
+    """Schneidet über die Zeichen-Offsets der Tokens (wie split_by_tokens)."""
+    if max_tokens <= 0:
+        return ""
+    offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+    if len(offsets) <= max_tokens:
+        return text
+    return text[:offsets[max_tokens - 1][1]]
+
+def _fit(tokenizer, units: list, unit_tokens: list, budget: int, strategy: str, scores: list) -> list:
+    """Einheiten (in Originalreihenfolge), die zusammen ins Budget passen."""
+    if sum(unit_tokens) <= budget:
+        return units
+    if strategy == "truncate":
+        kept, used = [], 0
+        for unit, tokens in zip(units, unit_tokens):
+            if used + tokens > budget:
+                kept.append(_truncate_text(tokenizer, unit, budget - used))
+                break
+            kept.append(unit)
+            used += tokens
+        return [unit for unit in kept if unit]
+    # extractive: wichtigste Einheiten zuerst wählen, kleinere füllen Lücken, Ausgabe in Originalreihenfolge
+    chosen, used = set(), 0
+    for i in sorted(range(len(units)), key=lambda i: -scores[i]):
+        if used + unit_tokens[i] <= budget:
+            chosen.add(i)
+            used += unit_tokens[i]
+    if not chosen and units: # schon der wichtigste Satz ist zu lang -> wenigstens dessen Anfang
+        best = max(range(len(units)), key=lambda i: scores[i])
+        return [unit for unit in [_truncate_text(tokenizer, units[best], budget)] if unit]
+    return [units[i] for i in sorted(chosen)]
+
+def _scores(units_per_contribution: list) -> list:
+    """
+    Zentralität wie bei SumBasic: Ø Häufigkeit der Wörter einer Einheit über alle Beiträge.
+    Die erste Einheit eines Beitrags (meist die Kernaussage) bekommt einen Bonus.
+    """
+    frequency, total = {}, 0
+    for units in units_per_contribution:
+        for unit in units:
+            for word in _words(unit):
+                if len(word) > 3: # Füllwörter grob ausblenden
+                    frequency[word] = frequency.get(word, 0) + 1
+                    total += 1
+    result = []
+    for units in units_per_contribution:
+        scores = []
+        for position, unit in enumerate(units):
+            words = [w for w in _words(unit) if len(w) > 3]
+            score = sum(frequency[w] for w in words) / (len(words) * max(total, 1)) if words else 0.0
+            scores.append(score * (1.5 if position == 0 else 1.0))
+        result.append(scores)
+    return result
+
+def fuse_contributions(tokenizer, contributions: list, budget_tokens: int, strategy: str = "extractive",
+                       dedup: bool = True, weights: dict = None, similarity: float = 0.8) -> tuple:
+    """
+    Führt Beiträge vorgelagerter Nodes [(Label oder None, Text), ...] zu einem Kontext zusammen, der mit dem
+    Tokenizer des Zielmodells gemessen ins Budget passt: erst Dedup, dann pro Beitrag ein Token-Budget
+    (nach Gewicht, ungenutztes wird umverteilt), dann Kürzen (truncate) oder Auswahl (extractive).
+    Liefert (Kontext, Kennzahlen).
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unbekannte Fusions-Strategie '{strategy}' (erlaubt: {', '.join(STRATEGIES)})")
+    start = time.perf_counter()
+    items = [{"label": label, "units": split_units(text or "")} for label, text in contributions]
+    input_tokens = sum(count_tokens(tokenizer, text or "") for _, text in contributions)
+    duplicates = _dedup(items, similarity) if dedup else 0
+
+    headers = [f"{item['label']}:\n" if item["label"] else "" for item in items] # Label None = ohne Überschrift
+    available = max(0, budget_tokens - sum(count_tokens(tokenizer, h) for h in headers) - len(items))
+    for item in items:
+        item["tokens"] = ([len(ids) for ids in tokenizer(item["units"], add_special_tokens=False)["input_ids"]]
+                          if item["units"] else [])
+    weight_list = [(weights or {}).get(item["label"], 1.0) for item in items]
+    allocation = _allocate([sum(item["tokens"]) for item in items], weight_list, available)
+    scores = _scores([item["units"] for item in items])
+
+    sections, kept_units, total_units = [], 0, 0
+    for header, item, budget, item_scores in zip(headers, items, allocation, scores):
+        kept = _fit(tokenizer, item["units"], item["tokens"], budget, strategy, item_scores)
+        kept_units += len(kept)
+        total_units += len(item["units"])
+        sections.append(header + "".join(kept).strip())
+    fused = "\n\n".join(sections)
+
+    fused_tokens = count_tokens(tokenizer, fused)
+    if fused_tokens > budget_tokens: # Token-Grenzen beim Zusammenfügen können minimal abweichen
+        fused = _truncate_text(tokenizer, fused, budget_tokens)
+        fused_tokens = count_tokens(tokenizer, fused)
+    return fused, {
+        "fusion_strategy": strategy,
+        "fusion_input_tokens": input_tokens,
+        "fusion_tokens": fused_tokens,
+        "fusion_budget": budget_tokens,
+        "fusion_duplicates": duplicates,
+        "fusion_units_dropped": total_units - kept_units,
+        "fusion_sec": round(time.perf_counter() - start, 4),
+    }
@@ -0,0 +1,157 @@
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+_STOP = object()
+
+class PartialExport(Exception):
+    """Handler hat die ersten `completed` Datensätze geschrieben, beim nächsten ist `cause` aufgetreten."""
+
+    def __init__(self, completed: int, cause: Exception):
+        super().__init__(str(cause))
+        self.completed = completed
+        self.cause = cause
+
+class WriteBehindExporter:
+    """
+    Schreibt Exporte (Tagebuch, SQLite, Berichte, Traces) in einem Hintergrund-Thread.
+    submit() legt einen Datensatz in eine begrenzte Queue und kehrt sofort zurück; ist die Queue voll,
+    wartet der Aufrufer (Backpressure), statt unbegrenzt Speicher zu belegen.
+    Der Worker sammelt bis zu batch_size Datensätze (oder wartet max_wait_sec auf weitere) und übergibt
+    sie pro Art gebündelt an den registrierten Handler: handler(list_of_payloads).
+    Schlägt ein Batch fehl, wird nur wiederholt, was noch nicht geschrieben ist: Handler melden ihren
+    Fortschritt per PartialExport, einzeln wiederholt wird nur bei retry_each (atomar/idempotent).
+    Beim Beenden des Interpreters wird die Queue per atexit noch vollständig geschrieben.
+    """
+
+    def __init__(self, max_queue: int = 64, batch_size: int = 16, max_wait_sec: float = 0.05):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.max_wait_sec = max_wait_sec
+        self.handlers = {}
+        self.retry_each = set() # Arten, deren Handler einen Batch ganz oder gar nicht schreiben
+        self.lock = threading.Lock()
+        self.stats = {"submitted": 0, "written": 0, "batches": 0, "errors": 0,
+                      "blocked": 0, "blocked_sec": 0.0, "max_depth": 0}
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def register(self, kind: str, handler, retry_each: bool = False):
+        """
+        handler(payloads: list) schreibt alle Datensätze einer Art auf einmal.
+        retry_each=True nur, wenn ein fehlgeschlagener Aufruf nichts halb geschrieben hinterlässt
+        (eine Transaktion oder idempotentes Überschreiben) - dann wird jeder Datensatz einzeln wiederholt.
+        """
+        self.handlers[kind] = handler
+        if retry_each:
+            self.retry_each.add(kind)
+
+    def submit(self, kind: str, payload, timeout: float = None):
+        if kind not in self.handlers:
+            raise KeyError(f"Kein Export-Handler für '{kind}'")
+        with self.lock:
+            closed = self.closed
+            if closed:
+                self.stats["submitted"] += 1
+        if closed:
+            # Nach close() (z.B. im atexit) direkt schreiben, damit nichts verloren geht
+            self._write(kind, [payload])
+            return
+        try:
+            self.queue.put_nowait((kind, payload))
+        except queue.Full:
+            start = time.perf_counter()
+            print(f"[{get_ts()}] [EXPORT] Queue voll ({self.queue.maxsize}) - warte auf den Writer...")
+            self.queue.put((kind, payload), timeout=timeout)
+            with self.lock:
+                self.stats["blocked"] += 1
+                self.stats["blocked_sec"] += time.perf_counter() - start
+        with self.lock:
+            self.stats["submitted"] += 1
+            self.stats["max_depth"] = max(self.stats["max_depth"], self.queue.qsize())
+
+    def _collect(self) -> list:
+        """Blockiert auf den ersten Datensatz, sammelt dann kurz weitere für einen Batch."""
+        batch = [self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait_sec
+        while len(batch) < self.batch_size and batch[-1] is not _STOP:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            stop = batch[-1] is _STOP
+            records = batch[:-1] if stop else batch
+            grouped = {} # Reihenfolge der Arten bleibt erhalten (dict)
+            for kind, payload in records:
+                grouped.setdefault(kind, []).append(payload)
+            for kind, payloads in grouped.items():
+                self._write(kind, payloads)
+            with self.lock:
+                self.stats["batches"] += 1 if records else 0
+            for _ in batch:
+                self.queue.task_done()
+            if stop:
+                return
+
+    def _write(self, kind: str, payloads: list):
+        try:
+            self.handlers[kind](payloads)
+            with self.lock:
+                self.stats["written"] += len(payloads)
+        except PartialExport as e:
+            # Bereits geschriebene Datensätze nicht wiederholen, den fehlerhaften überspringen, Rest weiter
+            with self.lock:
+                self.stats["written"] += e.completed
+                self.stats["errors"] += 1
+            print(f"[{get_ts()}] [EXPORT] ⚠️ {kind}: Datensatz {e.completed + 1}/{len(payloads)} nicht geschrieben: {e.cause}")
+            rest = payloads[e.completed + 1:]
+            if rest:
+                self._write(kind, rest)
+        except Exception as e:
+            if len(payloads) > 1 and kind in self.retry_each:
+                # Ein fehlerhafter Datensatz soll nicht den ganzen Batch kosten -> einzeln wiederholen
+                for payload in payloads:
+                    self._write(kind, [payload])
+                return
+            with self.lock:
+                self.stats["errors"] += len(payloads)
+            print(f"[{get_ts()}] [EXPORT] ⚠️ {kind}: {len(payloads)} Datensätze nicht geschrieben: {e}")
+
+    def flush(self):
+        """Wartet, bis alles bisher Eingereichte geschrieben ist."""
+        if not self.closed:
+            self.queue.join()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True # ab jetzt schreibt submit() selbst
+        self.queue.put(_STOP)
+        self.thread.join()
+        # Was ein gleichzeitiges submit() noch nach _STOP eingereiht hat, direkt schreiben
+        while True:
+            try:
+                kind, payload = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            self._write(kind, [payload])
+            self.queue.task_done()
+        s = self.stats
+        if s["submitted"]:
+            print(f"[{get_ts()}] [EXPORT] {s['written']}/{s['submitted']} Datensätze in {s['batches']} Batches "
+                  f"geschrieben | Fehler: {s['errors']} | max. Queue: {s['max_depth']} | "
+                  f"Backpressure: {s['blocked']}x ({s['blocked_sec']:.2f}s)")
@@ -0,0 +1,461 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import threading
+import http.client
+from collections import deque
+from urllib.parse import urlparse
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from lazy_imports import lazy_import
+
+torch = lazy_import("torch")
+set_seed = lazy_import("transformers", "set_seed")
+AutoTokenizer = lazy_import("transformers", "AutoTokenizer")
+AutoConfig = lazy_import("transformers", "AutoConfig")
+GenerationConfig = lazy_import("transformers", "GenerationConfig")
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+ENV_VAR = "WORKFLOW_DAEMON" # z.B. WORKFLOW_DAEMON=http://127.0.0.1:8765 -> Skripte nutzen den Daemon
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))]
+
+# ================================================================== Server
+class InferenceDaemon:
+    """
+    Langlebiger Prozess, dem die Modelle gehören (ein LocalModelManager inkl. Gewichte-Cache).
+    Skripte verbinden sich per HTTP auf localhost; warme Modelle überleben so zwischen den Aufrufen.
+    generate() läuft höchstens max_concurrent-mal gleichzeitig, weitere Anfragen warten (Queue).
+    """
+
+    def __init__(self, json_path: str = "modelle.json", max_concurrent: int = 1, **manager_kwargs):
+        from model_manager import LocalModelManager
+
+        self.manager = LocalModelManager(json_path, **manager_kwargs)
+        self.manager.enable_weight_cache()
+        self.slots = threading.Semaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.waiting = 0
+        self.active = 0
+        self.max_waiting = 0
+        self.counts = {}
+        self.latency = {} # op -> deque[(queue_sec, service_sec)]
+        self.generated_tokens = 0
+
+    # ------------------------------------------------------------------ Statistik
+    def _record(self, op: str, queue_sec: float, service_sec: float):
+        with self.lock:
+            self.counts[op] = self.counts.get(op, 0) + 1
+            self.latency.setdefault(op, deque(maxlen=1000)).append((queue_sec, service_sec))
+
+    def stats(self) -> dict:
+        with self.lock:
+            latency = {}
+            for op, samples in self.latency.items():
+                queue = [q * 1000 for q, _ in samples]
+                total = [(q + s) * 1000 for q, s in samples]
+                latency[op] = {"n": self.counts[op],
+                               "queue_p50_ms": round(_percentile(queue, 50), 1),
+                               "queue_p95_ms": round(_percentile(queue, 95), 1),
+                               "total_p50_ms": round(_percentile(total, 50), 1),
+                               "total_p95_ms": round(_percentile(total, 95), 1),
+                               "total_max_ms": round(max(total), 1)}
+            return {"uptime_sec": round(time.time() - self.started, 1), "queue_depth": self.waiting,
+                    "max_queue_depth": self.max_waiting, "active": self.active,
+                    "max_concurrent": self.max_concurrent, "generated_tokens": self.generated_tokens,
+                    "resident": self.resident(), "latency": latency, "cache": self.manager.get_cache_stats()}
+
+    def resident(self) -> list:
+        return [name for name in self.manager.model_lookup if self.manager.is_resident(name)]
+
+    # ------------------------------------------------------------------ Operationen
+    def load(self, model_name: str) -> dict:
+        start = time.perf_counter()
+        try:
+            model, _ = self.manager.load_by_name(model_name)
+            info = {"dtype": str(model.dtype).replace("torch.", ""), "device": str(model.device),
+                    "load_info": self.manager.pop_load_info(), "prefetch_info": self.manager.pop_prefetch_info()}
+        finally:
+            self.manager.release_thread_models()
+        self._record("load", 0.0, time.perf_counter() - start)
+        return info
+
+    def tokenize(self, model_name: str, text: str) -> dict:
+        start = time.perf_counter()
+        ids = self.manager.load_tokenizer(model_name)(text)["input_ids"]
+        self._record("tokenize", 0.0, time.perf_counter() - start)
+        return {"input_ids": ids}
+
+    def generate(self, request: dict, emit):
+        """emit(frame) schickt Zwischenstände (Streamer-Aufrufe) an den Client."""
+        arrived = time.perf_counter()
+        with self.lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+        self.slots.acquire()
+        with self.lock:
+            self.waiting -= 1
+            self.active += 1
+        started = time.perf_counter()
+        try:
+            model, tokenizer = self.manager.load_by_name(request["model"])
+            input_ids = torch.tensor(request["input_ids"], device=model.device)
+            inputs = {"input_ids": input_ids}
+            if request.get("attention_mask") is not None:
+                inputs["attention_mask"] = torch.tensor(request["attention_mask"], device=model.device)
+            streamer = _FrameStreamer(emit) if request.get("stream") else None
+            params = dict(request.get("params", {}))
+            budget = None
+            if request.get("stopping") is not None:
+                # Stopp-Regeln der Node laufen hier im Generate-Loop (mit dem Tokenizer des Daemons)
+                from stopping import GenerationBudget
+                budget = GenerationBudget.from_spec(request["stopping"], tokenizer, input_ids.shape[1])
+                params["stopping_criteria"] = [budget]
+            if request.get("seed") is not None:
+                set_seed(request["seed"])
+            with torch.no_grad():
+                outputs = model.generate(**inputs, **params, streamer=streamer)
+            generated = int(outputs.shape[0] * (outputs.shape[1] - input_ids.shape[1]))
+            with self.lock:
+                self.generated_tokens += generated
+        finally:
+            self.manager.release_thread_models()
+            with self.lock:
+                self.active -= 1
+            self.slots.release()
+        service = time.perf_counter() - started
+        self._record("generate", started - arrived, service)
+        return {"sequences": outputs.tolist(), "queue_sec": round(started - arrived, 4),
+                "generate_sec": round(service, 4), "load_info": self.manager.pop_load_info(),
+                "stop_reasons": budget.reasons if budget is not None else None}
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, fmt, *args): # keine Zeile pro Anfrage auf der Konsole
+                pass
+
+            def _json(self, payload: dict, status: int = 200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self._json({"ok": True, "pid": os.getpid()})
+                elif self.path == "/stats":
+                    self._json(daemon.stats())
+                elif self.path == "/resident":
+                    self._json({"resident": daemon.resident()})
+                else:
+                    self._json({"error": f"unbekannt: {self.path}"}, 404)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                try:
+                    if self.path == "/generate":
+                        self._generate(request)
+                    elif self.path == "/load":
+                        self._json(daemon.load(request["model"]))
+                    elif self.path == "/prefetch":
+                        daemon.manager.prefetch(request["model"])
+                        self._json({"ok": True})
+                    elif self.path == "/wait_resident":
+                        self._json({"resident": daemon.manager.wait_resident(request["model"], request["timeout"])})
+                    elif self.path == "/profile":
+                        self._json({"profile": daemon.manager.profile_for(request["model"])})
+                    elif self.path == "/tokenize":
+                        self._json(daemon.tokenize(request["model"], request["text"]))
+                    elif self.path == "/unload":
+                        daemon.manager.unload()
+                        self._json({"ok": True})
+                    elif self.path == "/shutdown":
+                        self._json({"ok": True})
+                        threading.Thread(target=server.shutdown, daemon=True).start()
+                    else:
+                        self._json({"error": f"unbekannt: {self.path}"}, 404)
+                except Exception as e:
+                    if self.path != "/generate":
+                        self._json({"error": f"{type(e).__name__}: {e}"}, 500)
+
+            def _generate(self, request: dict):
+                # Antwort als NDJSON-Stream (chunked): Streamer-Frames, am Ende das Ergebnis
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def emit(frame: dict):
+                    data = (json.dumps(frame) + "\n").encode("utf-8")
+                    self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                    self.wfile.flush()
+
+                try:
+                    emit({"done": True, **daemon.generate(request, emit)})
+                except Exception as e:
+                    emit({"error": f"{type(e).__name__}: {e}"})
+                self.wfile.write(b"0\r\n\r\n")
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        print(f"[{get_ts()}] [DAEMON] Bereit auf http://{host}:{port} (PID {os.getpid()}, "
+              f"{self.max_concurrent} gleichzeitige Generierung(en))")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            print(f"[{get_ts()}] [DAEMON] Beendet | {self.stats()['latency']}")
+
+class _FrameStreamer:
+    """Leitet die Streamer-Aufrufe von generate() 1:1 an den Client weiter."""
+
+    def __init__(self, emit):
+        self.emit = emit
+
+    def put(self, value):
+        self.emit({"put": value.tolist()})
+
+    def end(self):
+        self.emit({"end": True})
+
+# ================================================================== Client
+class _Connection:
+    def __init__(self, url: str):
+        parsed = urlparse(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self._local = threading.local() # eine HTTP-Verbindung pro Thread (parallele Nodes)
+
+    def _conn(self):
+        if getattr(self._local, "conn", None) is None:
+            self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=3600)
+        return self._local.conn
+
+    def request(self, method: str, path: str, payload: dict = None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body else {}
+        for attempt in range(2): # eine abgelaufene Keep-Alive-Verbindung einmal neu aufbauen
+            conn = self._conn()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                return conn.getresponse()
+            except (ConnectionError, http.client.HTTPException):
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+    def call(self, method: str, path: str, payload: dict = None) -> dict:
+        response = self.request(method, path, payload)
+        result = json.loads(response.read() or b"{}")
+        if response.status != 200:
+            raise RuntimeError(f"Daemon {path}: {result.get('error', response.status)}")
+        return result
+
+class RemoteModel:
+    """
+    Stellvertreter für ein Modell im Daemon. Unterstützt, was SpecializedNodes braucht:
+    generate() (inkl. Streamer und GenerationBudget als Stopp-Kriterium), device, dtype, config und
+    generation_config (beide werden lokal gelesen).
+    """
+
+    def __init__(self, manager, model_name: str, info: dict):
+        self.manager = manager
+        self.model_name = model_name
+        self.device = torch.device("cpu") # Eingaben werden lokal gebaut und als Listen verschickt
+        self.dtype = getattr(torch, info.get("dtype", "float32"))
+        self._config = None
+        self._generation_config = None
+
+    @property
+    def config(self):
+        if self._config is None:
+            self._config = AutoConfig.from_pretrained(
+                self.manager.model_lookup[self.model_name],
+                trust_remote_code=self.manager.profile_for(self.model_name)["trust_remote_code"])
+        return self._config
+
+    @property
+    def generation_config(self):
+        if self._generation_config is None:
+            try:
+                self._generation_config = GenerationConfig.from_pretrained(self.manager.model_lookup[self.model_name])
+            except OSError: # ohne generation_config.json: Standardwerte aus config.json
+                self._generation_config = GenerationConfig.from_model_config(self.config)
+        return self._generation_config
+
+    def __call__(self, *args, **kwargs):
+        raise NotImplementedError("Forward-Pässe (z.B. Präfix-KV) laufen nicht über den Daemon")
+
+    def generate(self, input_ids=None, attention_mask=None, streamer=None, past_key_values=None, **params):
+        if past_key_values is not None:
+            raise NotImplementedError("KV-Caches lassen sich nicht an den Daemon übergeben")
+        # Seed aus dem lokalen RNG ziehen: set_seed() der Node macht so auch das Sampling im Daemon reproduzierbar
+        seed = int(torch.randint(0, 2**31 - 1, (1,)).item())
+        # Stopp-Kriterien sind Python-Objekte -> GenerationBudget als JSON-Spezifikation, der Daemon baut es neu
+        criteria = params.pop("stopping_criteria", None) or []
+        if len(criteria) > 1 or any(not hasattr(c, "spec") for c in criteria):
+            raise NotImplementedError("Über den Daemon wird nur ein GenerationBudget als Stopp-Kriterium unterstützt")
+        budget = criteria[0] if criteria else None
+        request = {"model": self.model_name, "input_ids": input_ids.tolist(), "params": params, "seed": seed,
+                   "attention_mask": attention_mask.tolist() if attention_mask is not None else None,
+                   "stream": streamer is not None, "stopping": budget.spec() if budget is not None else None}
+        response = self.manager.connection.request("POST", "/generate", request)
+        result = None
+        for line in response: # http.client setzt die Chunks wieder zusammen
+            frame = json.loads(line)
+            if "put" in frame:
+                streamer.put(torch.tensor(frame["put"]))
+            elif frame.get("end"):
+                streamer.end()
+            elif "error" in frame:
+                raise RuntimeError(f"Daemon generate: {frame['error']}")
+            elif frame.get("done"):
+                result = frame
+        if result is None:
+            raise RuntimeError("Daemon generate: Verbindung ohne Ergebnis beendet")
+        self.manager._note_remote(result)
+        if budget is not None and result.get("stop_reasons") is not None:
+            budget.reasons = result["stop_reasons"] # für outcomes() auf Client-Seite
+        return torch.tensor(result["sequences"])
+
+class RemoteModelManager:
+    """
+    Drop-in für LocalModelManager: Modelle leben im InferenceDaemon, Tokenizer lokal (leichtgewichtig,
+    gebraucht für Prompt-Bau, Streaming und Dekodieren). SpecializedNodes funktioniert unverändert;
+    nur der Präfix-KV-Cache bleibt aus (KV-Tensoren bleiben im Daemon-Prozess).
+    """
+
+    remote = True
+
+    def __init__(self, json_path: str = "modelle.json", url: str = None):
+        self.url = url or os.environ.get(ENV_VAR) or DEFAULT_URL
+        self.connection = _Connection(self.url)
+        with open(json_path, 'r', encoding='utf-8') as f:
+            self.model_data = json.load(f)
+        self.model_lookup = {m['name']: m['path'] for m in self.model_data}
+        self.model_entries = {m['name']: m for m in self.model_data}
+        self._tokenizers = {}
+        self._tokenizer_lock = threading.Lock()
+        self._profiles = {} # model_name -> Profil aus dem Daemon, siehe profile_for()
+        self._held = threading.local()
+        health = self.connection.call("GET", "/health")
+        print(f"[{get_ts()}] [DAEMON] Verbunden mit {self.url} (PID {health['pid']})")
+
+    def enable_weight_cache(self, *args, **kwargs):
+        """Der Gewichte-Cache gehört dem Daemon."""
+        return None
+
+    def load_by_name(self, model_name: str):
+        if model_name not in self.model_lookup:
+            raise ValueError(f"Modell '{model_name}' nicht in der JSON gefunden!")
+        info = self.connection.call("POST", "/load", {"model": model_name})
+        self._held.load_info = info.get("load_info")
+        self._held.prefetch_info = info.get("prefetch_info")
+        return RemoteModel(self, model_name, info), self.load_tokenizer(model_name)
+
+    async def aload_by_name(self, model_name: str):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.load_by_name, model_name)
+
+    def load_tokenizer(self, model_name: str):
+        model_path = self.model_lookup[model_name]
+        trust_remote_code = self.profile_for(model_name)["trust_remote_code"]
+        with self._tokenizer_lock:
+            if model_path not in self._tokenizers:
+                self._tokenizers[model_path] = AutoTokenizer.from_pretrained(model_path,
+                                                                             trust_remote_code=trust_remote_code)
+            return self._tokenizers[model_path]
+
+    def profile_for(self, model_name: str) -> dict:
+        """Lade-Profil, wie es der Daemon aufgelöst hat (Gerät und Budget kennt nur er)."""
+        if model_name not in self._profiles:
+            self._profiles[model_name] = self.connection.call("POST", "/profile", {"model": model_name})["profile"]
+        return self._profiles[model_name]
+
+    def tokenize(self, model_name: str, text: str) -> list:
+        """Tokenisieren im Daemon (für Clients ohne lokalen Tokenizer)."""
+        return self.connection.call("POST", "/tokenize", {"model": model_name, "text": text})["input_ids"]
+
+    def _note_remote(self, result: dict):
+        if result.get("load_info"):
+            self._held.load_info = result["load_info"]
+        self._held.daemon_info = {"daemon_queue_sec": result["queue_sec"],
+                                  "daemon_generate_sec": result["generate_sec"]}
+
+    def prefetch(self, model_name: str):
+        if model_name in self.model_lookup:
+            self.connection.call("POST", "/prefetch", {"model": model_name})
+
+    def is_resident(self, model_name: str) -> bool:
+        return model_name in self.connection.call("GET", "/resident")["resident"]
+
+    def wait_resident(self, model_name: str, timeout: float) -> bool:
+        """Eine blockierende Anfrage statt Polling - der Daemon antwortet, sobald das Modell resident ist."""
+        return self.connection.call("POST", "/wait_resident", {"model": model_name, "timeout": timeout})["resident"]
+
+    def release_thread_models(self):
+        """Der Daemon gibt Modelle nach jeder Anfrage selbst frei."""
+
+    def get_cache_stats(self) -> dict:
+        return self.connection.call("GET", "/stats")["cache"]
+
+    def stats(self) -> dict:
+        return self.connection.call("GET", "/stats")
+
+    def pop_prefetch_info(self):
+        info = getattr(self._held, "prefetch_info", None)
+        self._held.prefetch_info = None
+        return info
+
+    def pop_load_info(self):
+        # Lade-Infos plus Warte-/Rechenzeit im Daemon (Queue-Tiefe sichtbar machen)
+        info = {**(getattr(self._held, "load_info", None) or {}), **(getattr(self._held, "daemon_info", None) or {})}
+        self._held.load_info = self._held.daemon_info = None
+        return info or None
+
+    def unload(self):
+        self.connection.call("POST", "/unload")
+
+# --- EXECUTION ---
+# Aufruf: python inference_daemon.py serve [--port 8765] [--concurrency 1]
+#         python inference_daemon.py stats | stop
+# Skripte nutzen den Daemon, wenn WORKFLOW_DAEMON gesetzt ist (siehe model_manager.create_manager).
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokaler Inferenz-Daemon: Modelle bleiben zwischen Skript-Aufrufen warm.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_parser = sub.add_parser("serve", help="Daemon starten (blockiert)")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--models", default="modelle.json")
+    serve_parser.add_argument("--concurrency", type=int, default=1, help="Gleichzeitige generate()-Aufrufe")
+    for name, text in (("stats", "Queue-Tiefe, Latenzen und residente Modelle"), ("stop", "Daemon beenden")):
+        p = sub.add_parser(name, help=text)
+        p.add_argument("--url", default=os.environ.get(ENV_VAR, DEFAULT_URL))
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        InferenceDaemon(args.models, max_concurrent=args.concurrency).serve(args.host, args.port)
+    else:
+        connection = _Connection(args.url)
+        if args.command == "stats":
+            print(json.dumps(connection.call("GET", "/stats"), indent=2))
+        else:
+            connection.call("POST", "/shutdown")
+            print(f"[{get_ts()}] [DAEMON] Stop an {args.url} gesendet")
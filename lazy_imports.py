@@ -0,0 +1,44 @@
+import sys
+import importlib
+import threading
+
+HEAVY_MODULES = ("torch", "transformers")
+
+class LazyImport:
+    """
+    Platzhalter für ein Modul (oder ein Attribut daraus), der erst beim ersten Zugriff
+    importiert. So kosten torch/transformers nur dann Startzeit, wenn wirklich ein Modell
+    gebraucht wird - z.B. nicht für 'graph' oder 'history' im CLI.
+    """
+
+    def __init__(self, module_name: str, attr: str = None):
+        self._module_name = module_name
+        self._attr = attr
+        self._target = None
+        self._lock = threading.Lock()
+
+    def _resolve(self):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    module = importlib.import_module(self._module_name)
+                    self._target = getattr(module, self._attr) if self._attr else module
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        state = "geladen" if self._target is not None else "nicht geladen"
+        target = f"{self._module_name}.{self._attr}" if self._attr else self._module_name
+        return f"<LazyImport {target} ({state})>"
+
+def lazy_import(module_name: str, attr: str = None) -> LazyImport:
+    return LazyImport(module_name, attr)
+
+def loaded_heavy_modules() -> list:
+    """Welche der schweren Abhängigkeiten im aktuellen Prozess bereits importiert sind."""
+    return [name for name in HEAVY_MODULES if name in sys.modules]
@@ -0,0 +1,262 @@
+import gc
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from lazy_imports import lazy_import
+torch = lazy_import("torch")
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+TIER_DEVICE = "device"
+TIER_HOST = "host"
+TIER_DISK = "disk"
+
+class ModelCache:
+    """
+    Mehrstufiger LRU-Cache für geladene Modelle.
+    Stufen: Device (GPU) -> Host-RAM -> Disk-Snapshot. Wird ein Budget überschritten,
+    wird das am längsten ungenutzte Modell eine Stufe nach unten verschoben.
+    Die Disk-Stufe schreibt nichts selbst: snapshot_writer liefert den Pfad eines Artefakts
+    (beim LocalModelManager der Gewichte-Cache), snapshot_loader lädt es zurück.
+    """
+
+    def __init__(self, device_budget_gb=None, host_budget_gb=8.0, disk_budget_gb=40.0,
+                 snapshot_writer=None, snapshot_loader=None):
+        self.lock = threading.RLock()
+        # 🔵 Device und Budgets werden erst beim ersten Zugriff bestimmt (torch.cuda würde sonst
+        # torch schon beim Anlegen des Managers importieren)
+        self._requested_budgets = (device_budget_gb, host_budget_gb, disk_budget_gb)
+        self._device = None
+        self._budgets = None
+
+        # Callbacks vom LocalModelManager: (model_path, entry) -> Artefakt-Pfad oder None (nicht speicherbar)
+        # und (Artefakt-Pfad, entry) -> (model, tokenizer)
+        self.snapshot_writer = snapshot_writer
+        self.snapshot_loader = snapshot_loader
+
+        # model_path -> Eintrag; Reihenfolge = LRU (vorne alt, hinten frisch)
+        self.entries = OrderedDict()
+        self.stats = {
+            "hits_device": 0,
+            "hits_host": 0,
+            "hits_disk": 0,
+            "misses": 0,
+            "demotions": 0,
+            "evictions": 0,
+        }
+
+    @property
+    def device(self) -> str:
+        if self._device is None:
+            self._resolve_budgets()
+        return self._device
+
+    @property
+    def budgets(self) -> dict:
+        if self._budgets is None:
+            self._resolve_budgets()
+        return self._budgets
+
+    def _resolve_budgets(self):
+        device_budget_gb, host_budget_gb, disk_budget_gb = self._requested_budgets
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+
+        # Ohne GPU sind Device und Host derselbe Speicher -> Host-Stufe entfällt
+        if device_budget_gb is None:
+            if device == "cuda":
+                _, total = torch.cuda.mem_get_info()
+                device_budget_gb = total / 1024**3 * 0.9
+            else:
+                device_budget_gb = host_budget_gb
+        self._budgets = {
+            TIER_DEVICE: device_budget_gb,
+            TIER_HOST: host_budget_gb if device == "cuda" else 0.0,
+            TIER_DISK: disk_budget_gb,
+        }
+        self._device = device
+
+    # ------------------------------------------------------------------ Abfragen
+
+    def get(self, model_path: str):
+        """Liefert (model, tokenizer) oder None. Treffer werden auf die Device-Stufe befördert."""
+        with self.lock:
+            entry = self.entries.get(model_path)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            self.entries.move_to_end(model_path)
+            tier = entry["tier"]
+
+            if entry["tier"] == TIER_HOST:
+                self._make_room(TIER_DEVICE, entry["size_gb"], keep=model_path)
+                start = time.time()
+                entry["model"].to(self.device)
+                entry["tier"] = TIER_DEVICE
+                print(f"[{get_ts()}] [CACHE] PROMOTE host -> device: {entry['name']} ({time.time() - start:.2f}s)")
+
+            elif entry["tier"] == TIER_DISK:
+                self._make_room(TIER_DEVICE, entry["size_gb"], keep=model_path)
+                start = time.time()
+                try:
+                    entry["model"], entry["tokenizer"] = self.snapshot_loader(entry["snapshot"], entry)
+                except Exception as e:
+                    # Artefakt weg oder defekt (z.B. vom Budget des Gewichte-Caches gelöscht) -> neu laden
+                    print(f"[{get_ts()}] [CACHE] PROMOTE disk -> device fehlgeschlagen: {entry['name']} ({e})")
+                    self._evict(model_path)
+                    self.stats["misses"] += 1
+                    return None
+                entry["tier"] = TIER_DEVICE
+                print(f"[{get_ts()}] [CACHE] PROMOTE disk -> device: {entry['name']} ({time.time() - start:.2f}s)")
+
+            self.stats[f"hits_{tier}"] += 1
+            entry["busy"] += 1
+            return entry["model"], entry["tokenizer"]
+
+    def put(self, model_path: str, model_name: str, model, tokenizer, quantized: bool = False,
+            tier: str = TIER_DEVICE):
+        """Registriert ein frisch geladenes Modell auf der Device-Stufe (oder vorab im Host-RAM)."""
+        with self.lock:
+            # Vorab geladene Modelle rechnen noch nicht
+            busy = 0 if tier == TIER_HOST else 1
+            if tier == TIER_HOST and self.budgets[TIER_HOST] <= 0:
+                tier = TIER_DEVICE
+            size_gb = model.get_memory_footprint() / 1024**3
+            # Über mehrere Geräte verteilte Modelle (device_map) bleiben, wo sie sind
+            devices = set((getattr(model, "hf_device_map", None) or {}).values())
+            movable = not quantized and len(devices) <= 1
+            self._make_room(tier, size_gb, keep=model_path)
+            self.entries[model_path] = {
+                "name": model_name,
+                "model": model,
+                "tokenizer": tokenizer,
+                "tier": tier,
+                "size_gb": size_gb,
+                "movable": movable,
+                "snapshot": None,
+                "busy": busy,
+            }
+            self.entries.move_to_end(model_path)
+
+    def reserve(self, size_gb: float):
+        """Schafft vor einem Ladevorgang Platz auf der Device-Stufe."""
+        with self.lock:
+            self._make_room(TIER_DEVICE, size_gb)
+
+    def release(self, model_path: str):
+        """Markiert ein Modell als nicht mehr in Benutzung (darf wieder verdrängt werden)."""
+        with self.lock:
+            entry = self.entries.get(model_path)
+            if entry and entry["busy"] > 0:
+                entry["busy"] -= 1
+
+    def usage_gb(self, tier: str) -> float:
+        return sum(e["size_gb"] for e in self.entries.values() if e["tier"] == tier)
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+            for tier in (TIER_DEVICE, TIER_HOST, TIER_DISK):
+                stats[f"resident_{tier}"] = sum(1 for e in self.entries.values() if e["tier"] == tier)
+            return stats
+
+    # ------------------------------------------------------------------ Verdrängung
+
+    def _make_room(self, tier: str, needed_gb: float, keep: str = None):
+        budget = self.budgets[tier]
+        while self.usage_gb(tier) + needed_gb > budget:
+            victim = self._lru_victim(tier, keep)
+            if victim is None:
+                if self.usage_gb(tier) > 0:
+                    print(f"[{get_ts()}] [CACHE] WARNUNG: Budget '{tier}' ({budget:.2f} GB) überschritten, "
+                          f"alle Modelle in Benutzung")
+                return
+            self._demote(victim)
+
+    def _lru_victim(self, tier: str, keep: str = None):
+        for path, entry in self.entries.items():
+            if entry["tier"] == tier and path != keep and entry["busy"] == 0:
+                return path
+        return None
+
+    def _demote(self, model_path: str):
+        # Fehler beim Verschieben/Speichern dürfen den Ladevorgang, der Platz braucht, nicht abbrechen
+        try:
+            self._move_down(model_path)
+        except Exception as e:
+            entry = self.entries.get(model_path)
+            print(f"[{get_ts()}] [CACHE] DEMOTE fehlgeschlagen: {entry['name'] if entry else model_path} ({e}) "
+                  f"- wird verdrängt")
+            if entry is not None:
+                self._evict(model_path)
+            self._free_memory()
+
+    def _move_down(self, model_path: str):
+        entry = self.entries[model_path]
+        start = time.time()
+
+        if entry["tier"] == TIER_DEVICE:
+            # Quantisierte Modelle (bitsandbytes) lassen sich nicht per .to() verschieben
+            if self.budgets[TIER_HOST] > 0 and entry["movable"]:
+                self._make_room(TIER_HOST, entry["size_gb"], keep=model_path)
+                if self.usage_gb(TIER_HOST) + entry["size_gb"] <= self.budgets[TIER_HOST]:
+                    entry["model"].to("cpu")
+                    entry["tier"] = TIER_HOST
+                    self._after_demote(entry, "device -> host", start)
+                    return
+            if self._to_disk(model_path, entry):
+                self._after_demote(entry, "device -> disk", start)
+            else:
+                self._free_memory()
+
+        elif entry["tier"] == TIER_HOST:
+            if self._to_disk(model_path, entry):
+                self._after_demote(entry, "host -> disk", start)
+            else:
+                self._free_memory()
+
+        else:
+            self._evict(model_path)
+
+    def _to_disk(self, model_path: str, entry) -> bool:
+        """Gewichte freigeben, Artefakt bleibt auf Disk (Tokenizer bleibt im RAM). False = verdrängt."""
+        if entry["snapshot"] is None and self.snapshot_writer is not None:
+            entry["snapshot"] = self.snapshot_writer(model_path, entry)
+        if entry["snapshot"] is None:
+            self._evict(model_path) # nicht speicherbar -> ganz aus dem Cache
+            return False
+        self._make_room(TIER_DISK, entry["size_gb"], keep=model_path)
+        entry["model"] = None
+        entry["tier"] = TIER_DISK
+        return True
+
+    def _after_demote(self, entry, direction, start):
+        self.stats["demotions"] += 1
+        self._free_memory()
+        print(f"[{get_ts()}] [CACHE] DEMOTE {direction}: {entry['name']} ({time.time() - start:.2f}s)")
+
+    @staticmethod
+    def _free_memory():
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def _evict(self, model_path: str):
+        # Artefakte gehören dem Gewichte-Cache (eigenes Budget) und bleiben für spätere Ladevorgänge liegen
+        entry = self.entries.pop(model_path)
+        entry["model"] = None
+        self.stats["evictions"] += 1
+        print(f"[{get_ts()}] [CACHE] EVICT: {entry['name']}")
+
+    def clear(self):
+        """Entfernt alle Modelle aus allen Stufen (Artefakte im Gewichte-Cache bleiben)."""
+        with self.lock:
+            for entry in self.entries.values():
+                entry["model"] = None
+                entry["tokenizer"] = None
+            self.entries.clear()
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
@@ -1,10 +1,15 @@
 import json
 import os
-import torch
 import gc
 import time 
 from datetime import datetime 
-from transformers import AutoModelForCausalLM, AutoTokenizer, AutoProcessor, BitsAndBytesConfig, AutoModelForVision2Seq
+from lazy_imports import lazy_import
+torch = lazy_import("torch")
+AutoModelForCausalLM = lazy_import("transformers", "AutoModelForCausalLM")
+AutoTokenizer = lazy_import("transformers", "AutoTokenizer")
+AutoProcessor = lazy_import("transformers", "AutoProcessor")
+BitsAndBytesConfig = lazy_import("transformers", "BitsAndBytesConfig")
+AutoModelForVision2Seq = lazy_import("transformers", "AutoModelForVision2Seq")
 from console_feedback import ActivitySpinner
 
 def get_ts(): 
@@ -114,29 +119,54 @@ class LocalModelManager:
             torch.cuda.synchronize()
         import json
 import os
-import torch
 import gc
 import time
+import asyncio
 import threading # 🔵 NEU: Für Thread-Sicherheit
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime 
-from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
 from console_feedback import ActivitySpinner
+from model_cache import ModelCache, TIER_HOST, TIER_DEVICE, TIER_DISK
+import model_profiles
+from weight_cache import ConvertedWeightCache
 
 def get_ts(): 
     return datetime.now().strftime("%H:%M:%S.%f")[:-3] 
 
 class LocalModelManager:
-    def __init__(self, json_path: str):
+    def __init__(self, json_path: str, device_budget_gb: float = None, host_budget_gb: float = 8.0,
+                 disk_budget_gb: float = 40.0, quantize: bool = True):
         self.lock = threading.Lock() # 🔵 NEU: Das Schloss
+        self.quantize = quantize # False: nie bitsandbytes (z.B. CPU-Benchmarks)
         self.spinner = ActivitySpinner()
         self.active_path = None 
         self.model = None
         self.tokenizer = None
-        
+        # 🔵 NEU: Mehrere Modelle bleiben resident (GPU -> RAM -> Disk, LRU)
+        self.cache = ModelCache(
+            device_budget_gb=device_budget_gb,
+            host_budget_gb=host_budget_gb,
+            disk_budget_gb=disk_budget_gb,
+            snapshot_writer=self._write_snapshot,
+            snapshot_loader=self._load_snapshot
+        )
+        self._held = threading.local() # Pro Thread: welche Modelle gerade rechnen
+        self._prefetching = {} # model_path -> Event, solange ein Prefetch läuft
+        self._resident = threading.Condition() # meldet neu residente Modelle, siehe wait_resident()
+        self._staged = {}      # model_path -> Infos zum fertigen Prefetch
+        self._tokenizers = {}  # model_path -> Tokenizer ohne Modell (load_tokenizer)
+        self._loader = None    # ThreadPoolExecutor für aload_by_name
+        self.weight_cache = None # optional: ConvertedWeightCache, siehe enable_weight_cache()
+        self._disk_cache = None  # ConvertedWeightCache nur für die Disk-Stufe, solange weight_cache aus ist
+        self._draft_checks = {}  # (Zielmodell, Draft) -> None (kompatibel) oder Grund, siehe load_draft()
+        self._storing = {}       # model_path -> Event, solange das Artefakt im Hintergrund geschrieben wird
+
         with open(json_path, 'r', encoding='utf-8') as f:
             self.model_data = json.load(f)
         
         self.model_lookup = {m['name']: m['path'] for m in self.model_data}
+        self.model_entries = {m['name']: m for m in self.model_data}
+        self._profiles = {} # model_name -> (Bezeichnung, Profil, Schätzung), siehe model_profiles.py
 
     def _get_vram_info(self):
         if torch.cuda.is_available():
@@ -144,50 +174,78 @@ class LocalModelManager:
             return free / 1024**3, total / 1024**3 
         return 0, 0
 
+    def enable_weight_cache(self, max_gb: float = 40.0, cache_dir: str = None):
+        """🔵 NEU: Fertig konvertierte/quantisierte Gewichte auf Disk ablegen und beim nächsten Laden direkt mappen."""
+        self.weight_cache = ConvertedWeightCache(cache_dir=cache_dir, max_gb=max_gb)
+        return self.weight_cache
+
+    def _source_for(self, model_name: str, profile: dict):
+        """Gültiges Artefakt aus dem Gewichte-Cache (oder None -> aus dem Checkpoint konvertieren)."""
+        if self.weight_cache is None:
+            return None
+        return self.weight_cache.lookup(model_name, self.model_lookup[model_name],
+                                        self.model_entries[model_name], profile)
+
+    def profile_for(self, model_name: str) -> dict:
+        """
+        🔵 NEU: Lade-Profil aus modelle.json (dtype, Quantisierung, Attention, Gerät, Threads).
+        Ersetzt die Namens-Heuristik ("gemma"/"7b"/"8b" im Namen - traf auch Qwen3-1.7B).
+        'auto' (Standard) schätzt den Bedarf aus config.json gegen das Device-Budget des Caches.
+        """
+        if model_name not in self._profiles:
+            label, profile, estimate = model_profiles.resolve_profile(
+                self.model_entries[model_name], self.cache.device, self.cache.budgets[TIER_DEVICE],
+                allow_quantization=self.quantize)
+            self._profiles[model_name] = (label, profile, estimate)
+            note = f" | {estimate['note']}" if estimate["note"] else ""
+            print(f"[{get_ts()}] [PROFILE] {model_name}: {label} | ~{estimate['estimated_gb']:.2f} GB geschätzt "
+                  f"({estimate['params_b']:.2f} Mrd. Parameter, {estimate['estimate_source']}) | "
+                  f"Budget {estimate['budget_gb']:.1f} GB{note}")
+        return self._profiles[model_name][1]
+
     def load_by_name(self, model_name: str):
+        if model_name not in self.model_lookup:
+            raise ValueError(f"Modell '{model_name}' nicht in der JSON gefunden!")
+        model_path = self.model_lookup[model_name]
+
+        # 🔵 NEU: Läuft gerade ein Prefetch für dieses Modell, warten wir darauf (außerhalb des Locks)
+        start_wait = time.time()
+        pending = self._prefetching.get(model_path)
+        if pending is not None:
+            pending.wait()
+
         with self.lock: # 🔵 NEU: Nur eine KI darf gleichzeitig laden
-            if model_name not in self.model_lookup:
-                raise ValueError(f"Modell '{model_name}' nicht in der JSON gefunden!")
-            
-            model_path = self.model_lookup[model_name]
+            staged = self._staged.pop(model_path, None)
             
-            # Prüfen, ob das Modell bereits geladen ist
-            if self.active_path == model_path:
+            # Prüfen, ob das Modell bereits im Cache liegt (GPU, RAM oder Disk-Snapshot)
+            cached = self.cache.get(model_path)
+            if cached is not None:
+                self.model, self.tokenizer = cached
+                self.active_path = model_path
+                self._hold(model_path)
+                self._record_prefetch(staged, time.time() - start_wait)
+                self._notify_resident()
                 return self.model, self.tokenizer
-            
-            # Altes Modell entladen, falls vorhanden
-            if self.active_path is not None:
-                self.unload()
 
             print(f"[{get_ts()}] [VRAM] LOAD start: {model_path}") 
             self.spinner.start(f"Lade {model_name}...")
+            AutoModelForCausalLM.from_pretrained # lazy Import von transformers nicht in die Ladezeit einrechnen
             start_load = time.time() 
 
-            # Quantisierung: Strategisch für große Modelle oder Gemma
-            quant_config = None
-            if "gemma" in model_name.lower() or "7b" in model_name.lower() or "8b" in model_name.lower():
-                print(f"   [INFO] Aktiviere 4-Bit Quantisierung für {model_name}...")
-                quant_config = BitsAndBytesConfig(
-                    load_in_4bit=True,
-                    bnb_4bit_compute_dtype=torch.bfloat16,
-                    bnb_4bit_quant_type="nf4",
-                    bnb_4bit_use_double_quant=True
-                )
+            profile = self.profile_for(model_name)
             
             try:    
-                self.tokenizer = AutoTokenizer.from_pretrained(
+                # Bei quantisierten Modellen hat der Prefetch nur den Tokenizer vorbereitet
+                self.tokenizer = staged["tokenizer"] if staged else AutoTokenizer.from_pretrained(
                     model_path, 
-                    trust_remote_code=True
+                    trust_remote_code=profile["trust_remote_code"]
                 )
                     
-                self.model = AutoModelForCausalLM.from_pretrained(
-                    model_path, 
-                    quantization_config=quant_config,
-                    dtype="auto", # 🔵 Fix: dtype statt torch_dtype (vermeidet Warnung)
-                    device_map="auto",
-                    trust_remote_code=True
-                )
+                self.model, kind = self._build_model(model_name, model_path, profile)
                 self.active_path = model_path
+                self.cache.put(model_path, model_name, self.model, self.tokenizer,
+                               quantized=model_profiles.is_quantized(profile))
+                self._hold(model_path)
             except Exception as e:
                 print(f"❌ KRITISCHER LADEFEHLER: {str(e)}")
                 raise
@@ -197,16 +255,295 @@ class LocalModelManager:
             load_duration = time.time() - start_load 
             free_gb, total_gb = self._get_vram_info() 
             print(f"[{get_ts()}] [VRAM] LOAD finished in {load_duration:.2f}s | Occupied: {total_gb - free_gb:.2f} GB") 
-            return self.model, self.tokenizer 
+            label = self._profiles[model_name][0]
+            print(f"[{get_ts()}] [PROFILE] {model_name}: {label} geladen in {load_duration:.2f}s ({kind})")
+            self._held.load_info = {"load_profile": label, "load_sec": round(load_duration, 2),
+                                    "weight_cache": kind}
+            self._record_prefetch(staged, time.time() - start_wait)
+            model, tokenizer = self.model, self.tokenizer
+
+        self._notify_resident()
+        # Außerhalb des Locks: Serialisieren blockiert weder andere Ladevorgänge noch den Prefetch
+        self._finish_load(model, model_name, model_path, profile, kind, load_duration)
+        return model, tokenizer
+
+    def _build_model(self, model_name: str, model_path: str, profile: dict, host_only: bool = False):
+        """
+        🔵 NEU: Gemeinsamer Ladeweg für load_by_name und prefetch - Profil, Gewichte-Cache und
+        Nachbearbeitung (Threads, int8-dynamic) gelten für beide gleich. Liefert (Modell, warm/cold/off).
+        host_only: erst im Host-RAM anlegen (Prefetch), auf das Gerät beim ersten Zugriff.
+        """
+        # Warm = schon konvertiertes Artefakt mappen, kalt = Checkpoint parsen + konvertieren
+        artifact = self._source_for(model_name, profile)
+        kwargs = model_profiles.load_kwargs(profile)
+        if host_only:
+            kwargs.pop("device_map", None)
+            kwargs["low_cpu_mem_usage"] = True
+        model = None
+        if artifact is not None:
+            try:
+                model = self.weight_cache.load(artifact, kwargs)
+            except Exception as e:
+                # Defektes Artefakt (z.B. abgebrochener Schreibvorgang): verwerfen, neu aus dem Checkpoint
+                print(f"[{get_ts()}] [WCACHE] LOAD fehlgeschlagen für {model_name}: {e} - Artefakt verworfen")
+                self.weight_cache.discard(artifact)
+                artifact = None
+        if model is None:
+            model = AutoModelForCausalLM.from_pretrained(model_path, **kwargs)
+        model = model_profiles.apply_after_load(model, profile, prequantized=artifact is not None)
+        kind = "off" if self.weight_cache is None else ("warm" if artifact is not None else "cold")
+        return model, kind
+
+    def _finish_load(self, model, model_name: str, model_path: str, profile: dict, kind: str, load_sec: float):
+        """Ladezeit im Gewichte-Cache protokollieren, frisch konvertierte Gewichte ablegen (ohne Lock aufrufen)."""
+        if self.weight_cache is None:
+            return
+        self.weight_cache.record_load(model_name, self._profiles[model_name][0], kind, load_sec)
+        if kind == "cold":
+            self._store_in_background(model, model_name, model_path, profile)
+
+    def _store_in_background(self, model, model_name: str, model_path: str, profile: dict):
+        """Frisch konvertierte Gewichte im Hintergrund in den Gewichte-Cache schreiben (nicht im kritischen Pfad)."""
+        with self.lock:
+            if model_path in self._storing:
+                return
+            done = self._storing[model_path] = threading.Event()
+
+        def store():
+            try:
+                self.weight_cache.store(model, model_name, model_path, self.model_entries[model_name], profile)
+            finally:
+                done.set() # vor dem Lock: _write_snapshot wartet ggf. mit gehaltenem Lock darauf
+                with self.lock:
+                    self._storing.pop(model_path, None)
+        # Kein Daemon-Thread: beim Beenden wird ein laufender Schreibvorgang noch abgeschlossen
+        threading.Thread(target=store, name=f"weight-store-{model_name}").start()
+
+    async def aload_by_name(self, model_name: str):
+        """
+        🔵 NEU: load_by_name im Lade-Executor, ohne den Event-Loop zu blockieren.
+        Das Modell landet im Cache, wird aber nicht gehalten - die Node, die damit rechnet,
+        holt es in ihrem eigenen Thread per load_by_name (dann ein Cache-Treffer) und hält es dort.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._load_executor(), self._load_unheld, model_name)
+
+    def _load_executor(self):
+        # Eigener Thread fürs Laden: Laden stellt sich nicht hinter laufende generate()-Aufrufe an
+        if self._loader is None:
+            self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+        return self._loader
+
+    def _load_unheld(self, model_name: str):
+        try:
+            return self.load_by_name(model_name)
+        finally:
+            self.release_thread_models()
+
+    ############################### Prefetch (Host-RAM) ###########################################
+    def prefetch(self, model_name: str):
+        """
+        Bereitet ein Modell im Hintergrund im Host-RAM vor, während eine andere Node rechnet.
+        Quantisierte Modelle können erst auf der GPU quantisiert werden -> hier nur Tokenizer
+        laden und die Checkpoint-Dateien in den Page-Cache des Betriebssystems lesen.
+        """
+        model_path = self.model_lookup.get(model_name)
+        if model_path is None:
+            return
+        with self.lock:
+            if model_path in self._prefetching or model_path in self._staged or model_path in self.cache.entries:
+                return
+            done = threading.Event()
+            self._prefetching[model_path] = done
+
+        print(f"[{get_ts()}] [PREFETCH] START: {model_name}")
+        start = time.time()
+        staged = {"tokenizer": None, "load_sec": 0.0}
+        try:
+            profile = self.profile_for(model_name)
+            tokenizer = AutoTokenizer.from_pretrained(model_path, trust_remote_code=profile["trust_remote_code"])
+            if model_profiles.is_quantized(profile):
+                self._warm_page_cache(self._source_for(model_name, profile) or model_path)
+                staged["tokenizer"] = tokenizer
+                staged["load_sec"] = time.time() - start
+            else:
+                model, kind = self._build_model(model_name, model_path, profile, host_only=True)
+                with self.lock:
+                    self.cache.put(model_path, model_name, model, tokenizer, tier=TIER_HOST)
+                staged["load_sec"] = time.time() - start
+                self._finish_load(model, model_name, model_path, profile, kind, staged["load_sec"])
+            with self.lock:
+                self._staged[model_path] = staged
+            print(f"[{get_ts()}] [PREFETCH] READY: {model_name} in {staged['load_sec']:.2f}s")
+        except Exception as e:
+            print(f"[{get_ts()}] [PREFETCH] FEHLER bei {model_name}: {e}")
+        finally:
+            with self.lock:
+                self._prefetching.pop(model_path, None)
+            done.set()
+            self._notify_resident()
+
+    def _warm_page_cache(self, model_path: str, chunk_size: int = 16 * 1024**2):
+        if not os.path.isdir(model_path):
+            return
+        for file_name in os.listdir(model_path):
+            if file_name.endswith((".safetensors", ".bin")):
+                with open(os.path.join(model_path, file_name), "rb") as f:
+                    while f.read(chunk_size):
+                        pass
+
+    def _record_prefetch(self, staged, waited_sec: float):
+        """Merkt sich pro Thread, wie viel Ladezeit durch den Prefetch versteckt wurde."""
+        if staged is None:
+            self._held.prefetch_info = None
+            return
+        self._held.prefetch_info = {
+            "prefetch_load_sec": round(staged["load_sec"], 2),
+            "prefetch_exposed_sec": round(waited_sec, 2),
+            "prefetch_hidden_sec": round(max(0.0, staged["load_sec"] - waited_sec), 2),
+        }
+
+    def pop_prefetch_info(self):
+        info = getattr(self._held, "prefetch_info", None)
+        self._held.prefetch_info = None
+        return info
+
+    def pop_load_info(self):
+        """Profil und Ladezeit, falls der aktuelle Thread das Modell gerade frisch geladen hat."""
+        info = getattr(self._held, "load_info", None)
+        self._held.load_info = None
+        return info
+
+    def _artifact_store(self) -> ConvertedWeightCache:
+        """Disk-Stufe des ModelCache = Artefakte im Gewichte-Cache (gleiche Schlüssel, keine zweite Kopie)."""
+        if self.weight_cache is not None:
+            return self.weight_cache
+        if self._disk_cache is None:
+            self._disk_cache = ConvertedWeightCache(max_gb=self.cache.budgets[TIER_DISK])
+        return self._disk_cache
+
+    def _write_snapshot(self, model_path: str, entry: dict):
+        """Vorhandenes Artefakt nachschlagen, sonst jetzt schreiben. None = nicht speicherbar."""
+        pending = self._storing.get(model_path)
+        if pending is not None:
+            pending.wait() # Hintergrund-Schreibvorgang abwarten statt ein zweites Mal zu schreiben
+        store = self._artifact_store()
+        model_name = entry["name"]
+        profile = self.profile_for(model_name)
+        artifact = store.lookup(model_name, model_path, self.model_entries[model_name], profile)
+        if artifact is None:
+            artifact = store.store(entry["model"], model_name, model_path, self.model_entries[model_name], profile)
+        return artifact
+
+    def _load_snapshot(self, artifact: str, entry: dict):
+        """Lädt ein vom Cache auf Disk ausgelagertes Modell aus seinem Artefakt zurück (Tokenizer blieb im RAM)."""
+        profile = self.profile_for(entry["name"])
+        model = self._artifact_store().load(artifact, model_profiles.load_kwargs(profile))
+        return model_profiles.apply_after_load(model, profile, prequantized=True), entry["tokenizer"]
+
+    def _hold(self, model_path: str):
+        held = getattr(self._held, "paths", None)
+        if held is None:
+            held = self._held.paths = []
+        held.append(model_path)
+
+    def release_thread_models(self):
+        """Gibt alle Modelle frei, die der aktuelle Thread (Node) geladen hat."""
+        for path in getattr(self._held, "paths", []):
+            self.cache.release(path)
+        self._held.paths = []
+
+    def load_tokenizer(self, model_name: str):
+        """Nur den Tokenizer holen (z.B. für Cache-Schlüssel), ohne Modellgewichte zu laden."""
+        if model_name not in self.model_lookup:
+            raise ValueError(f"Modell '{model_name}' nicht in der JSON gefunden!")
+        model_path = self.model_lookup[model_name]
+        entry = self.cache.entries.get(model_path)
+        if entry is not None and entry["tokenizer"] is not None:
+            return entry["tokenizer"]
+        trust_remote_code = self.profile_for(model_name)["trust_remote_code"]
+        with self.lock:
+            if model_path not in self._tokenizers:
+                self._tokenizers[model_path] = AutoTokenizer.from_pretrained(model_path,
+                                                                             trust_remote_code=trust_remote_code)
+            return self._tokenizers[model_path]
+
+    ############################### Draft-Modelle (Assisted Generation) ###########################
+    def load_draft(self, model_name: str, draft_name: str):
+        """
+        🔵 NEU: Lädt das Draft-Modell für Speculative Decoding und hält es (wie das Zielmodell) für
+        den aktuellen Thread - beide bleiben so gemeinsam resident. Die Kompatibilität (gleicher
+        Tokenizer, gleiche Vokabulargröße, gleiches Gerät) wird einmal pro Paar geprüft.
+        Liefert das Draft-Modell oder None, wenn das Paar nicht zusammenpasst.
+        """
+        if draft_name not in self.model_lookup:
+            raise ValueError(f"Draft-Modell '{draft_name}' nicht in der JSON gefunden!")
+        key = (model_name, draft_name)
+        if key not in self._draft_checks:
+            reason = self._draft_incompatibility(model_name, draft_name)
+            self._draft_checks[key] = reason
+            status = f"nicht kompatibel ({reason})" if reason else "kompatibel"
+            print(f"[{get_ts()}] [SPEC] {model_name} + Draft {draft_name}: {status}")
+        if self._draft_checks[key]:
+            return None
+
+        draft, _ = self.load_by_name(draft_name)
+        target_path = self.model_lookup[model_name]
+        target = self.cache.entries.get(target_path, {}).get("model")
+        if target is not None and draft.device != target.device:
+            self._draft_checks[key] = f"Geräte verschieden ({target.device} / {draft.device})"
+            print(f"[{get_ts()}] [SPEC] {model_name} + Draft {draft_name}: {self._draft_checks[key]} - ohne Draft")
+            return None
+        return draft
+
+    def _draft_incompatibility(self, model_name: str, draft_name: str):
+        """Grund, warum das Paar nicht für Assisted Generation taugt (oder None). Lädt keine Gewichte."""
+        target_tok, draft_tok = self.load_tokenizer(model_name), self.load_tokenizer(draft_name)
+        if target_tok.get_vocab() != draft_tok.get_vocab():
+            return "unterschiedliche Tokenizer-Vokabulare"
+        for attr in ("bos_token_id", "eos_token_id", "pad_token_id"):
+            if getattr(target_tok, attr) != getattr(draft_tok, attr):
+                return f"{attr} verschieden"
+        # Logits werden Token für Token verglichen -> die Embedding-Matrix muss gleich groß sein
+        sizes = [self._config_vocab_size(self.model_lookup[name]) for name in (model_name, draft_name)]
+        if None not in sizes and sizes[0] != sizes[1]:
+            return f"vocab_size {sizes[0]} vs. {sizes[1]}"
+        return None
+
+    @staticmethod
+    def _config_vocab_size(model_path: str):
+        config_path = os.path.join(model_path, "config.json")
+        if not os.path.exists(config_path):
+            return None
+        with open(config_path, encoding="utf-8") as f:
+            config = json.load(f)
+        return (config.get("text_config") or config).get("vocab_size")
+
+    def is_resident(self, model_name: str) -> bool:
+        model_path = self.model_lookup.get(model_name)
+        return model_path in self.cache.entries and model_path not in self._prefetching
+
+    def _notify_resident(self):
+        with self._resident:
+            self._resident.notify_all()
+
+    def wait_resident(self, model_name: str, timeout: float) -> bool:
+        """Blockiert (ohne Polling), bis das Modell resident ist; False nach Ablauf von timeout."""
+        with self._resident:
+            return self._resident.wait_for(lambda: self.is_resident(model_name), timeout)
+
+    def get_cache_stats(self) -> dict:
+        return self.cache.get_stats()
 
     def unload(self):
-        if self.active_path is None: return      
+        """Leert alle Cache-Stufen so gründlich wie möglich."""
         print(f"[{get_ts()}] [VRAM] UNLOAD start") 
         start_unload = time.time() 
         
         self.model = None
         self.tokenizer = None
         self.active_path = None
+        self.cache.clear()
         
         gc.collect()
         if torch.cuda.is_available():
@@ -216,8 +553,11 @@ class LocalModelManager:
         unload_duration = time.time() - start_unload 
         free_gb, _ = self._get_vram_info() 
         print(f"[{get_ts()}] [VRAM] UNLOAD finished in {unload_duration:.2f}s | Free: {free_gb:.2f} GB")
-        unload_duration = time.time() - start_unload 
-        free_gb, total_gb = self._get_vram_info() 
-        
-        
-        print(f"[{get_ts()}] [VRAM] UNLOAD finished in {unload_duration:.2f}s | Free: {free_gb:.2f} GB") 
\ No newline at end of file
+
+# 🔵 NEU: Ist WORKFLOW_DAEMON gesetzt (z.B. http://127.0.0.1:8765), übernimmt der Inferenz-Daemon die Modelle
+def create_manager(json_path: str = "modelle.json", **kwargs):
+    daemon_url = os.environ.get("WORKFLOW_DAEMON")
+    if daemon_url:
+        from inference_daemon import RemoteModelManager
+        return RemoteModelManager(json_path, url=daemon_url)
+    return LocalModelManager(json_path, **kwargs)
@@ -0,0 +1,210 @@
+import os
+import sys
+import json
+from datetime import datetime
+from lazy_imports import lazy_import
+
+torch = lazy_import("torch")
+BitsAndBytesConfig = lazy_import("transformers", "BitsAndBytesConfig")
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+# Lade-Profile für modelle.json. Ein Eintrag kann so aussehen:
+#   {"name": "...", "path": "...", "profile": "auto"}                        (Standard)
+#   {"name": "...", "path": "...", "profile": "bnb-4bit"}                    (festes Preset)
+#   {"name": "...", "path": "...", "profile": {"base": "bf16", "attn_implementation": "sdpa", "threads": 8}}
+#   {"name": "...", "path": "...", "profile": "auto", "memory_budget_gb": 6}
+# "auto" schätzt den Speicherbedarf aus config.json und nimmt das schnellste Preset, das ins Budget passt.
+
+DEFAULTS = {
+    "dtype": "auto",             # auto | bfloat16 | float16 | float32
+    "quantization": None,        # None | bnb-4bit | bnb-8bit | int8-dynamic
+    "attn_implementation": None, # None (transformers wählt) | sdpa | eager | flash_attention_2
+    "device_map": "auto",        # auto | cpu | cuda:0 | ...
+    "threads": None,             # torch.set_num_threads, None = unverändert
+    "trust_remote_code": True,
+}
+
+PRESETS = {
+    "bf16": {"dtype": "bfloat16"},
+    "fp16": {"dtype": "float16"},
+    "fp32": {"dtype": "float32"},
+    "bnb-8bit": {"dtype": "float16", "quantization": "bnb-8bit"},
+    "bnb-4bit": {"dtype": "bfloat16", "quantization": "bnb-4bit"},
+    # CPU: in fp32 laden, danach Linear-Schichten dynamisch auf int8 quantisieren
+    "int8-dynamic": {"dtype": "float32", "quantization": "int8-dynamic", "device_map": "cpu"},
+}
+
+# Bytes pro Gewicht: (Embedding, übrige Gewichte) - Embeddings bleiben bei Quantisierung unangetastet
+BYTES_PER_WEIGHT = {
+    None: None, # -> aus dtype
+    "bnb-8bit": (2, 1.0),
+    "bnb-4bit": (2, 0.55), # nf4 + Quantisierungs-Konstanten
+    "int8-dynamic": (4, 1.0),
+}
+DTYPE_BYTES = {"bfloat16": 2, "float16": 2, "float32": 4, "auto": 2}
+OVERHEAD = 1.2 # Puffer für Aktivierungen, KV-Cache und Allokator
+
+def _cpu_has_fast_bf16() -> bool:
+    """bf16 lohnt sich auf der CPU nur mit AVX512-BF16 oder AMX (sonst langsamer als fp32)."""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+def auto_candidates(device: str, allow_quantization: bool = True) -> list:
+    """Presets in der Reihenfolge 'schnellstes zuerst' für das jeweilige Gerät."""
+    if device == "cuda":
+        candidates = ["bf16" if torch.cuda.is_bf16_supported() else "fp16", "bnb-4bit"]
+    else:
+        candidates = ["bf16", "fp32"] if _cpu_has_fast_bf16() else ["fp32", "bf16"]
+        candidates.append("int8-dynamic")
+    return [c for c in candidates if allow_quantization or PRESETS[c].get("quantization") is None]
+
+def estimate_parameters(model_path: str) -> dict:
+    """
+    Parameterzahl aus config.json (ohne Gewichte zu laden): Embedding, Attention (inkl. GQA),
+    gated MLP und LM-Head. Fällt auf die Größe der Checkpoint-Dateien zurück, wenn Felder fehlen.
+    """
+    config = {}
+    config_path = os.path.join(model_path, "config.json")
+    if os.path.exists(config_path):
+        with open(config_path, encoding="utf-8") as f:
+            config = json.load(f)
+    text = config.get("text_config") or config # z.B. Gemma 3n: Sprachteil verschachtelt
+    try:
+        h, layers, inter, vocab = (text["hidden_size"], text["num_hidden_layers"],
+                                   text["intermediate_size"], text["vocab_size"])
+    except KeyError:
+        return _estimate_from_files(model_path)
+    if isinstance(inter, list): # pro Schicht unterschiedlich
+        inter = sum(inter) / len(inter)
+    heads = text.get("num_attention_heads", 1)
+    kv_heads = text.get("num_key_value_heads") or heads
+    head_dim = text.get("head_dim") or h // heads
+    attention = h * heads * head_dim * 2 + h * kv_heads * head_dim * 2 # q, o + k, v
+    mlp = 3 * h * inter # gate, up, down
+    embedding = vocab * h
+    lm_head = 0 if config.get("tie_word_embeddings", text.get("tie_word_embeddings", True)) else vocab * h
+    return {"embedding": int(embedding), "other": int(layers * (attention + mlp + 2 * h) + h + lm_head),
+            "source": "config"}
+
+_HYBRID_ATTENTION = {"gemma2", "gemma3", "gemma3_text", "cohere2"}
+
+def context_window(model_path: str, default: int = 4096) -> int:
+    """Kontextlänge laut config.json (max_position_embeddings, bei reinem Sliding Window ggf. kleiner)."""
+    config_path = os.path.join(model_path, "config.json")
+    if not os.path.exists(config_path):
+        return default
+    with open(config_path, encoding="utf-8") as f:
+        config = json.load(f)
+    text = config.get("text_config") or config
+    window = int(text.get("max_position_embeddings") or default)
+    sliding = text.get("sliding_window")
+    # Qwen2 & Co. schalten das Fenster per use_sliding_window meist ab
+    if not sliding or not text.get("use_sliding_window", True):
+        return window
+    # Hybride Modelle (Gemma 2/3, Cohere2) haben globale Schichten, die den ganzen Kontext sehen
+    layer_types = text.get("layer_types")
+    if layer_types and any(t != "sliding_attention" for t in layer_types):
+        return window
+    if text.get("sliding_window_pattern") or text.get("model_type") in _HYBRID_ATTENTION:
+        return window
+    return min(window, int(sliding))
+
+def _estimate_from_files(model_path: str) -> dict:
+    total = 0
+    if os.path.isdir(model_path):
+        total = sum(os.path.getsize(os.path.join(model_path, f)) for f in os.listdir(model_path)
+                    if f.endswith((".safetensors", ".bin")))
+    # Checkpoints liegen meist in 16 Bit vor
+    return {"embedding": 0, "other": total // 2, "source": "files"}
+
+def estimate_footprint_gb(params: dict, profile: dict) -> float:
+    per_weight = BYTES_PER_WEIGHT.get(profile.get("quantization"))
+    if per_weight is None:
+        per_weight = (DTYPE_BYTES[profile["dtype"]],) * 2
+    return (params["embedding"] * per_weight[0] + params["other"] * per_weight[1]) * OVERHEAD / 1024**3
+
+def _expand(spec) -> tuple:
+    """'auto' | Preset-Name | dict (optional mit 'base') -> (Basis, Zusatz-Einstellungen)."""
+    if spec is None or isinstance(spec, str):
+        return spec or "auto", {}
+    spec = dict(spec)
+    return spec.pop("base", "auto"), spec
+
+def resolve_profile(entry: dict, device: str, budget_gb: float, allow_quantization: bool = True) -> tuple:
+    """
+    Liefert (Profilname, vollständiges Profil, Schätzung) für einen Eintrag aus modelle.json.
+    Die Schätzung enthält Parameterzahl, geschätzten Bedarf und das verwendete Budget.
+    """
+    base, overrides = _expand(entry.get("profile"))
+    budget_gb = entry.get("memory_budget_gb", budget_gb)
+    params = estimate_parameters(entry["path"])
+    note = None
+
+    if base == "auto":
+        candidates = auto_candidates(device, allow_quantization)
+        fitting = [c for c in candidates
+                   if estimate_footprint_gb(params, {**DEFAULTS, **PRESETS[c]}) <= budget_gb]
+        name = fitting[0] if fitting else candidates[-1]
+        if not fitting:
+            note = "passt in kein Budget - kleinstes Profil"
+        label = f"auto -> {name}"
+    else:
+        if base not in PRESETS:
+            raise ValueError(f"Unbekanntes Lade-Profil '{base}' (erlaubt: auto, {', '.join(PRESETS)})")
+        name = label = base
+        quantization = PRESETS[base].get("quantization")
+        if quantization and not allow_quantization:
+            note, name = "Quantisierung deaktiviert", "fp32" if device == "cpu" else "bf16"
+        elif quantization and quantization.startswith("bnb") and device != "cuda":
+            note, name = "bitsandbytes braucht CUDA", "int8-dynamic"
+        if note:
+            label = f"{base} -> {name}"
+
+    profile = {**DEFAULTS, **PRESETS[name], **overrides}
+    estimate = {
+        "params_b": round((params["embedding"] + params["other"]) / 1e9, 3),
+        "estimated_gb": round(estimate_footprint_gb(params, profile), 2),
+        "budget_gb": round(budget_gb, 2),
+        "estimate_source": params["source"],
+        "note": note,
+    }
+    return label, profile, estimate
+
+def load_kwargs(profile: dict) -> dict:
+    """from_pretrained-Argumente für ein Profil."""
+    kwargs = {
+        "dtype": profile["dtype"] if profile["dtype"] == "auto" else getattr(torch, profile["dtype"]),
+        "device_map": profile["device_map"],
+        "trust_remote_code": profile["trust_remote_code"],
+    }
+    if profile.get("attn_implementation"):
+        kwargs["attn_implementation"] = profile["attn_implementation"]
+    if profile["quantization"] == "bnb-4bit":
+        kwargs["quantization_config"] = BitsAndBytesConfig(
+            load_in_4bit=True,
+            bnb_4bit_compute_dtype=torch.bfloat16,
+            bnb_4bit_quant_type="nf4",
+            bnb_4bit_use_double_quant=True
+        )
+    elif profile["quantization"] == "bnb-8bit":
+        kwargs["quantization_config"] = BitsAndBytesConfig(load_in_8bit=True)
+    return kwargs
+
+def apply_after_load(model, profile: dict, prequantized: bool = False):
+    """Schritte nach from_pretrained: dynamische int8-Quantisierung (CPU) und Thread-Zahl."""
+    if profile.get("threads"):
+        torch.set_num_threads(profile["threads"])
+    if profile["quantization"] == "int8-dynamic" and not prequantized:
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+def is_quantized(profile: dict) -> bool:
+    return profile.get("quantization") is not None
@@ -0,0 +1,31 @@
+from typing import TypedDict, Optional
+
+THINK_OPEN, THINK_CLOSE = "<think>", "</think>"
+
+class NodeResult(TypedDict, total=False):
+    """Kompaktes Ergebnis einer Node im State: nur die Antwort wird an Folgeknoten weitergereicht."""
+    answer: str                # Antwort ohne Prompt und ohne Denkteil
+    reasoning: Optional[str]   # <think>-Block (nur für Bericht/Analyse, nicht für Folge-Prompts)
+    model: str
+    tokens: int                # generierte Tokens (inkl. Denkteil)
+    stop_reason: Optional[str]
+
+def split_reasoning(text: str) -> tuple:
+    """
+    Trennt Denkteil und Antwort: '<think>...</think>Antwort' -> ('Antwort', '...').
+    R1-Distills beginnen oft schon im Denkteil (öffnendes Tag steht im Prompt) -> alles vor
+    '</think>' ist Denkteil. Ein nicht abgeschlossener Denkteil bleibt komplett Denkteil.
+    """
+    if THINK_CLOSE in text:
+        reasoning, answer = text.split(THINK_CLOSE, 1)
+        return answer.strip(), reasoning.replace(THINK_OPEN, "", 1).strip() or None
+    if THINK_OPEN in text:
+        before, reasoning = text.split(THINK_OPEN, 1)
+        return before.strip(), reasoning.strip() or None
+    return text.strip(), None
+
+def answer_of(value) -> str:
+    """Antwort aus einem NodeResult (ältere States enthalten noch reine Strings)."""
+    if isinstance(value, dict):
+        return value.get("answer", "")
+    return value or ""
@@ -1,10 +1,27 @@
 from typing import Dict, Any
-import torch
+import os
+import json
 import time
+import asyncio
 import functools
+import threading
+import contextvars
 from datetime import datetime
 from console_feedback import ActivitySpinner
 from prompt_library import PortfolioPrompts
+from prompt_builder import PromptAssembler
+from chunking import split_by_tokens, group_for_reduce
+from lazy_imports import lazy_import
+from tracing import NULL_SPAN, new_run_id, current_run_id
+from stopping import GenerationBudget, plain_outcome
+from node_results import split_reasoning, answer_of
+from context_fusion import fuse_contributions
+from model_profiles import context_window
+from state_schema import node_delta, result_of
+
+# 🔵 NEU: torch/transformers erst laden, wenn wirklich generiert wird
+torch = lazy_import("torch")
+set_seed = lazy_import("transformers", "set_seed")
 
 def get_ts(): 
     return datetime.now().strftime("%H:%M:%S.%f")[:-3]
@@ -13,41 +30,798 @@ def log_node_performance(model_key: str):
     def decorator(func):
         @functools.wraps(func)
         def wrapper(self, state: Dict[str, Any]) -> Dict[str, Any]:
+            # 🔵 NEU: Batch-Modus - eine Liste von States wird gemeinsam generiert
+            if isinstance(state, list):
+                return self._run_batch(func.__name__, model_key, state)
+
             print(f"[{get_ts()}] [NODE] START: {func.__name__}")
             start_time = time.time()
-            
-            # Inferenz ausführen
-            response, token_count = func(self, state)
-            
-            # --- NEU: VORSCHAU DER ERSTEN 10 ZEILEN ---
-            lines = response.splitlines()
-            preview = "\n".join(lines[:10])
-            print(f"\n---  VORSCHAU ({model_key}) ---")
-            print(preview)
-            if len(lines) > 10:
-                print(f"... [+ {len(lines) - 10} weitere Zeilen]")
-            print("-" * 40 + "\n")
-            # ------------------------------------------
-
-            duration = time.time() - start_time
-            metrics = self.logger.log_step(model_key, duration, token_count)
-            
-            new_state = state.copy()
-            new_state[model_key] = response
-            new_state["metrics"] = state.get("metrics", []) + [metrics]
-            
-            return new_state
+            self._pop_step_metrics()
+            resources = self.resource_sampler.begin(func.__name__) if self.resource_sampler else None
+            try:
+                # 🔵 NEU: Ein Span pro Node, darunter die einzelnen Phasen (siehe tracing.py)
+                with self._span(f"node:{func.__name__}", model=model_key) as node_span:
+                    # 🔵 NEU: Antwort-Cache vor dem eigentlichen Node-Body prüfen
+                    with self._span("memo_lookup"):
+                        memo_key = self._memo_key(func.__name__, state)
+                        cached = self.response_cache.get(memo_key) if memo_key else None
+                    if cached is not None:
+                        response, token_count = cached
+                        self._note_step(response_cache="hit")
+                        print(f"[{get_ts()}] [MEMO] Treffer für {func.__name__} - keine Inferenz nötig")
+                    else:
+                        # 🔵 NEU: Nächstes Modell laut Graph im Hintergrund vorbereiten (bei Memo-Treffern
+                        # wird das aktuelle Modell nie geladen - dann gibt es nichts abzuwarten)
+                        if self.prefetcher is not None:
+                            self.prefetcher.node_started(func.__name__)
+                        # Inferenz ausführen
+                        try:
+                            response, token_count = func(self, state)
+                        finally:
+                            # 🔵 NEU: Modell darf wieder aus dem Cache verdrängt werden
+                            self.manager.release_thread_models()
+                        if memo_key:
+                            self.response_cache.put(memo_key, model_key, response, token_count)
+
+                    # 🔵 NEU: Kompaktes Ergebnis (Antwort getrennt vom Denkteil) statt Rohtext im State
+                    result, savings = self._make_result(func.__name__, model_key, response, token_count)
+
+                    # --- NEU: VORSCHAU DER ERSTEN 10 ZEILEN ---
+                    lines = result["answer"].splitlines()
+                    preview = "\n".join(lines[:10])
+                    print(f"\n---  VORSCHAU ({model_key}) ---")
+                    print(preview)
+                    if len(lines) > 10:
+                        print(f"... [+ {len(lines) - 10} weitere Zeilen]")
+                    print("-" * 40 + "\n")
+                    # ------------------------------------------
+
+                    # token_count = nur generierte Tokens (Prompt-Tokens stehen separat in prompt_tokens)
+                    duration = time.time() - start_time
+                    with self._span("state_update"):
+                        step_metrics = self._pop_step_metrics()
+                        if resources is not None:
+                            step_metrics.update(self.resource_sampler.end(resources))
+                        step_metrics.update(self._savings(savings, step_metrics))
+                        result["stop_reason"] = step_metrics.get("stop_reason")
+                        metrics = self.logger.log_step(model_key, duration, token_count,
+                                                       cache_stats=self.manager.get_cache_stats(),
+                                                       extra={**(self.manager.pop_prefetch_info() or {}),
+                                                              **(self.manager.pop_load_info() or {}),
+                                                              **step_metrics})
+                        # 🔵 NEU: Nur das Delta zurückgeben, die Reducer aus WorkflowState führen es zusammen
+                        delta = node_delta(model_key, result, metrics)
+                    node_span.set(generated_tokens=token_count, prompt_tokens=step_metrics.get("prompt_tokens"))
+            finally:
+                # Auch bei Fehlern (Memo-Lookup, Node, Ergebnis) Sampler stoppen; end() ist idempotent
+                if resources is not None:
+                    self.resource_sampler.end(resources)
+            return delta
+        wrapper.supports_batch = True
         return wrapper
     return decorator
 
+def async_node(func_name: str):
+    """
+    🔵 NEU: Async-Variante einer Node für graph.ainvoke(). Quelle lesen und Modell laden laufen in
+    Threads, die eigentliche Node (Tokenisieren + generate) im Executor - der Event-Loop bleibt frei
+    für andere Runs. Die Node selbst läuft komplett in einem Thread, damit Step-Metriken, Spans und
+    gehaltene Modelle (alles thread-lokal) zusammenbleiben.
+    """
+    async def anode(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        source = state.get("portfolio_items") if isinstance(state, dict) else None
+        if isinstance(source, str) and source:
+            text = await PortfolioPrompts.aread_source(source)
+            if text != source:
+                state = {**state, "portfolio_items": text}
+        model_name = self.NODE_MODELS.get(func_name)
+        if model_name is not None and not self.manager.is_resident(model_name):
+            await self.manager.aload_by_name(model_name)
+        loop = asyncio.get_running_loop()
+        # Delta ohne portfolio_items -> im State bleibt der Pfad, nicht der Dateiinhalt.
+        # Kontext mitnehmen: Spans und Messpunkte gehören so zum Run dieses Tasks (tracing.bind_run)
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor,
+                                          functools.partial(context.run, getattr(self, func_name), state))
+    anode.__name__ = f"a{func_name}"
+    return anode
+
+class _count_forwards:
+    """Zählt Forward-Pässe pro Modell (nur im aufrufenden Thread) während eines generate()-Aufrufs."""
+
+    def __init__(self, **models):
+        self.models = {name: model for name, model in models.items() if model is not None}
+        self.counts = {name: 0 for name in models}
+        self.handles = []
+
+    def __enter__(self):
+        if len(self.models) > 1: # ohne Draft gibt es nichts zu zählen
+            owner = threading.get_ident()
+            for name, model in self.models.items():
+                def hook(module, args, output, name=name):
+                    if threading.get_ident() == owner:
+                        self.counts[name] += 1
+                self.handles.append(model.register_forward_hook(hook))
+        return self.counts
+
+    def __exit__(self, *exc):
+        for handle in self.handles:
+            handle.remove()
+        return False
+
 class SpecializedNodes:
+    # Methodenname -> Modell aus modelle.json (für Prefetch & Co.)
+    NODE_MODELS = {
+        "llama_1b_test_node": "meta-llama/Llama-3.2-1B-Instruct",
+        "llama_3_2_3_b_node": "meta-llama/Llama-3.2-3B-Instruct",
+        "qwen_3_1_7b_node": "rd211/Qwen3-1.7B-Instruct",
+        "deepseek_r1_1_5b_node": "deepseek-ai/DeepSeek-R1-Distill-Qwen-1.5B",
+        "mistral_7b_node": "Mistral-7B-Instruct-v0.3",
+        "gemma_2b_node": "google/gemma-3n-E2B-it",
+    }
+    # 🔵 NEU: Node -> kleines Geschwistermodell als Draft für Speculative Decoding (siehe enable_speculative)
+    DRAFT_MODELS = {
+        "llama_3_2_3_b_node": "meta-llama/Llama-3.2-1B-Instruct",
+    }
+
     def __init__(self, manager, logger, interface):
         self.manager = manager
         self.logger = logger
         self.interface = interface
         self.spinner = ActivitySpinner()
+        self.prefetcher = None # optional: GraphPrefetcher, siehe enable_prefetch()
+        self.max_batch_size = 16 # Obergrenze für den Batch-Modus (list of states)
+        self.prefix_cache = None # optional: PrefixKVCache, siehe enable_prefix_cache()
+        self.prompt_assembler = PromptAssembler() # Chat-Template statt handgebauter Tags
+        # Token-Streaming: Konsole und optional Callback(label, text, stream_end) / Queue
+        self.stream_console = True
+        self.stream_callback = None
+        self.stream_queue = None
+        self.response_cache = None # optional: ResponseCache, siehe enable_response_cache()
+        self.generation_seed = None # fester Seed macht Sampling reproduzierbar (und cachebar)
+        self.generation_overrides = {} # überschreibt config['params'], z.B. feste Tokenzahl im Benchmark
+        self._step = threading.local() # Zusatz-Metriken der laufenden Node (pro Thread)
+        self.tracer = None # optional: Tracer, siehe enable_tracing()
+        self.resource_sampler = None # optional: ResourceSampler, siehe enable_resource_sampler()
+        self.executor = None # Executor der Async-Nodes (None = Standard-Executor des Event-Loops)
+        self.draft_models = {} # Zielmodell -> Draft-Modell, siehe enable_speculative()
+        self.assistant_params = {} # z.B. num_assistant_tokens (landet in der generation_config des Drafts)
+        self._plain_decode_tps = {} # Modell -> Decode-Raten ohne Draft (Basis für den Speedup)
+        self._fusions = {} # (Node, Beiträge) -> (Kontext, Kennzahlen); Prompt-Builder laufen pro Node mehrfach
+        # Ohne interface: Run-ID -> {"spans", "reasoning"} für einen Aufrufer, der selbst exportiert
+        # (z.B. run_pool-Worker -> Elternprozess). None = nicht sammeln
+        self.unsaved_exports = None
+
+    def enable_prefetch(self, graph):
+        """Aktiviert den Hintergrund-Prefetch anhand der Kanten des kompilierten Graphen."""
+        from prefetcher import GraphPrefetcher
+        self.prefetcher = GraphPrefetcher(graph, self.manager, self.NODE_MODELS)
+        return self.prefetcher
 
     
+    def enable_prefix_cache(self, max_gb: float = 2.0):
+        """Aktiviert die Wiederverwendung von KV-Caches für System-Prompt + Quelle."""
+        if getattr(self.manager, "remote", False):
+            # KV-Tensoren liegen im Daemon-Prozess und lassen sich nicht sinnvoll übergeben
+            print(f"[{get_ts()}] [PREFIX] Über den Inferenz-Daemon nicht verfügbar - bleibt aus")
+            return None
+        from prefix_cache import PrefixKVCache
+        self.prefix_cache = PrefixKVCache(max_gb=max_gb)
+        return self.prefix_cache
+
+    def enable_response_cache(self, max_mb: float = 256.0, bypass: bool = False):
+        """Aktiviert den persistenten Antwort-Cache (SQLite neben performance.db)."""
+        from response_cache import ResponseCache
+        base_dir = self.interface.dAbA_dir if self.interface else os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "dAbA")
+        self.response_cache = ResponseCache(os.path.join(base_dir, "response_cache.db"), max_mb=max_mb, bypass=bypass)
+        return self.response_cache
+
+    def enable_tracing(self, trace_dir: str = None):
+        """Aktiviert Spans pro Node-Phase; der Reporter exportiert sie am Ende des Runs."""
+        from tracing import Tracer
+        base_dir = self.interface.dAbA_dir if self.interface else os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "dAbA")
+        self.tracer = Tracer(trace_dir or os.path.join(base_dir, "traces"))
+        return self.tracer
+
+    def enable_resource_sampler(self, interval_sec: float = 0.1):
+        """Tastet RSS, CPU (pro Kern) und Gerätespeicher während jeder Node ab."""
+        from resource_sampler import ResourceSampler
+        self.resource_sampler = ResourceSampler(interval_sec=interval_sec)
+        return self.resource_sampler
+
+    def enable_speculative(self, drafts: dict = None, num_assistant_tokens: int = None):
+        """
+        🔵 NEU: Speculative (Assisted) Decoding - ein kleines Draft-Modell schlägt Tokens vor, das
+        Zielmodell prüft mehrere davon in einem Forward-Pass. drafts: Node -> Draft-Modell
+        (Standard: DRAFT_MODELS). Gilt nur für Einzel-Inferenz (Batch-Größe 1).
+        """
+        if getattr(self.manager, "remote", False):
+            print(f"[{get_ts()}] [SPEC] Über den Inferenz-Daemon nicht verfügbar - bleibt aus")
+            return None
+        for node, draft in (drafts if drafts is not None else self.DRAFT_MODELS).items():
+            target = self.NODE_MODELS[node]
+            if draft not in self.manager.model_lookup:
+                print(f"[{get_ts()}] [SPEC] {node}: Draft {draft} fehlt in modelle.json - übersprungen")
+                continue
+            self.draft_models[target] = draft
+            print(f"[{get_ts()}] [SPEC] {node}: {target} mit Draft {draft}")
+        if num_assistant_tokens:
+            self.assistant_params["num_assistant_tokens"] = num_assistant_tokens
+        return self.draft_models
+
+    def _span(self, name: str, **attrs):
+        return self.tracer.span(name, **attrs) if self.tracer is not None else NULL_SPAN
+
+    def _memo_key(self, func_name: str, state: Dict[str, Any]):
+        """Cache-Schlüssel aus Modellpfad, Prompt-Token-IDs, Parametern und Seed (None = nicht cachen)."""
+        if self.response_cache is None or func_name not in self.PROMPT_BUILDERS:
+            return None
+        prompt, config = getattr(self, self.PROMPT_BUILDERS[func_name])(state)
+        if not self.response_cache.is_cacheable(self._params(config), self.generation_seed):
+            self._note_step(response_cache="bypass")
+            return None
+        model_name = self.NODE_MODELS[func_name]
+        token_ids, _ = self._encode_prompt(self.manager.load_tokenizer(model_name), prompt, config)
+        self._note_step(response_cache="miss")
+        params = self._params(config)
+        if config.get("stopping"):
+            params = {**params, "stopping": config["stopping"]} # Stopp-Regeln verändern die Antwort
+        # Lade-Profil (dtype/Quantisierung) und Chunking-Einstellungen ändern die Antwort ebenfalls
+        params = {**params, "profile": self.manager.profile_for(model_name)}
+        if config.get("chunking"):
+            params["chunking"] = config["chunking"]
+        draft_name = self.draft_models.get(model_name)
+        if draft_name:
+            # Mit Sampling hängt die Antwort vom Draft und dessen Parametern ab
+            params = {**params, "draft": self.manager.model_lookup[draft_name],
+                      "assistant": dict(self.assistant_params)}
+        return self.response_cache.make_key(self.manager.model_lookup[model_name], token_ids,
+                                            params, self.generation_seed)
+
+    def _note_step(self, **values):
+        """Sammelt Metriken der laufenden Node; landen über den Decorator in log_step."""
+        if not hasattr(self._step, "metrics"):
+            self._step.metrics = {}
+        self._step.metrics.update(values)
+
+    def _add_step(self, **values):
+        """Wie _note_step, summiert aber (z.B. Prompt-Tokens über mehrere generate-Aufrufe einer Node)."""
+        if not hasattr(self._step, "metrics"):
+            self._step.metrics = {}
+        for key, value in values.items():
+            self._step.metrics[key] = self._step.metrics.get(key, 0) + value
+
+    def _params(self, config: dict) -> dict:
+        return {**config['params'], **self.generation_overrides}
+
+    def _pop_step_metrics(self) -> dict:
+        metrics = getattr(self._step, "metrics", {})
+        self._step.metrics = {}
+        return metrics
+
+    # ------------------------------------------------------------------ Prompt-Bausteine
+    # Methodenname -> Prompt-Builder (state -> (prompt, config)); Basis für Einzel- und Batch-Modus
+    PROMPT_BUILDERS = {
+        "llama_1b_test_node": "_llama_1b_test_prompt",
+        "llama_3_2_3_b_node": "_llama_3_2_3_b_prompt",
+        "qwen_3_1_7b_node": "_qwen_3_1_7b_prompt",
+        "deepseek_r1_1_5b_node": "_deepseek_r1_1_5b_prompt",
+        "mistral_7b_node": "_mistral_7b_prompt",
+        "gemma_2b_node": "_gemma_2b_prompt",
+    }
+
+    def _build_prompt(self, func_name: str, state: Dict[str, Any]):
+        with self._span("prompt_build"):
+            return getattr(self, self.PROMPT_BUILDERS[func_name])(state)
+
+    def _llama_1b_test_prompt(self, state: Dict[str, Any]):
+        config = PortfolioPrompts.get_analyst_config(state.get("portfolio_items"))
+        # Hier fügen wir die Einzelteile in das Format ein, das Llama versteht
+        prompt = (
+            f"<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n\n"
+            f"{config['system']}<|eot_id|>"
+            f"<|start_header_id|>user<|end_header_id|>\n\n"
+            f"{config['user']}<|eot_id|>"
+            f"<|start_header_id|>assistant<|end_header_id|>\n\n"
+        )
+        return prompt, config
+
+    def _llama_3_2_3_b_prompt(self, state: Dict[str, Any]):
+        config = PortfolioPrompts.get_analyst_config(state.get("portfolio_items"))
+        # Fallback ohne Chat-Template: Llama-3-Format (wie beim 1B-Test)
+        prompt = (
+            f"<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n\n"
+            f"{config['system']}<|eot_id|>"
+            f"<|start_header_id|>user<|end_header_id|>\n\n"
+            f"{config['user']}<|eot_id|>"
+            f"<|start_header_id|>assistant<|end_header_id|>\n\n"
+        )
+        return prompt, config
+
+    def _qwen_3_1_7b_prompt(self, state: Dict[str, Any]):
+        config = PortfolioPrompts.get_qwen_config(state.get("portfolio_items"))
+        prompt = f"<|im_start|>system\n{config['system']}<|im_end|>\n<|im_start|>user\n{config['user']}<|im_end|>\n<|im_start|>assistant\n"
+        return prompt, config
+
+    def _deepseek_r1_1_5b_prompt(self, state: Dict[str, Any]):
+        # Abgleich der Ergebnisse von Llama und Qwen (🔵 NEU: im Token-Budget des 1.5B-Modells)
+        llama_out = answer_of(result_of(state, 'meta-llama/Llama-3.2-3B-Instruct'))
+        qwen_out = answer_of(result_of(state, 'rd211/Qwen3-1.7B-Instruct'))
+        context = self._fuse_context("deepseek_r1_1_5b_node",
+                                     [("Historische Analyse", llama_out), ("Daten-Extraktion", qwen_out)],
+                                     PortfolioPrompts.get_deepseek_config)
+        config = PortfolioPrompts.get_deepseek_config(context)
+        prompt = f"<|thought|>\n{config['system']}\n{config['user']}"
+        return prompt, config
+
+    def _mistral_7b_prompt(self, state: Dict[str, Any]):
+        audit_data = answer_of(result_of(state, "deepseek-ai/DeepSeek-R1-Distill-Qwen-1.5B")) # nur das Fazit, ohne Denkteil
+        audit_data = self._fuse_context("mistral_7b_node", [(None, audit_data)], PortfolioPrompts.get_mistral_config)
+        config = PortfolioPrompts.get_mistral_config(audit_data)
+        prompt = f"<s>[INST] {config['system']}\n{config['user']} [/INST]"
+        return prompt, config
+
+    def _gemma_2b_prompt(self, state: Dict[str, Any]):
+        mistral_out = answer_of(result_of(state, 'Mistral-7B-Instruct-v0.3'))
+        config = PortfolioPrompts.get_gemma_config(mistral_out)
+        prompt = f"<start_of_turn>model\n{config['system']}<end_of_turn>\n<start_of_turn>user\n{config['user']}<end_of_turn>\n<start_of_turn>model\n"
+        return prompt, config
+
+    def _fuse_context(self, func_name: str, contributions: list, config_builder) -> str:
+        """
+        🔵 NEU: Kontext einer Fan-in-Node aus den Beiträgen vorgelagerter Nodes, gemessen mit dem Tokenizer
+        des Zielmodells. Budget = min(Fusions-Budget, Kontextfenster - Prompt-Gerüst - max_new_tokens).
+        Tokenanzahl und Dauer der Fusion landen in den Node-Metriken.
+        """
+        settings = PortfolioPrompts.get_fusion_config(func_name)
+        if not settings:
+            return "\n".join(f"{label}: {text}" if label else text for label, text in contributions)
+        key = (func_name, tuple(contributions))
+        cached = self._fusions.get(key)
+        if cached is None:
+            model_name = self.NODE_MODELS[func_name]
+            tokenizer = self.manager.load_tokenizer(model_name)
+            scaffold = config_builder("")
+            scaffold_tokens = len(tokenizer(f"{scaffold['system']}\n{scaffold['user']}")["input_ids"])
+            max_new = self._params(scaffold).get("max_new_tokens", 512)
+            window = context_window(self.manager.model_lookup[model_name])
+            budget = max(0, min(settings["budget_tokens"], window - scaffold_tokens - max_new))
+            cached = fuse_contributions(tokenizer, contributions, budget, strategy=settings.get("strategy", "extractive"),
+                                        dedup=settings.get("dedup", True), weights=settings.get("weights"))
+            if len(self._fusions) >= 32: # nur die letzten Fusionen merken
+                self._fusions.pop(next(iter(self._fusions)))
+            self._fusions[key] = cached
+            info = cached[1]
+            if info["fusion_tokens"] < info["fusion_input_tokens"]:
+                print(f"[{get_ts()}] [FUSION] {func_name}: {info['fusion_input_tokens']} -> {info['fusion_tokens']} "
+                      f"Tokens (Budget {info['fusion_budget']}, {info['fusion_strategy']}, "
+                      f"{info['fusion_duplicates']} Duplikate, {info['fusion_units_dropped']} Sätze verworfen)")
+        else:
+            # Treffer im Fusions-Memo: nichts gemessen, nur als gecacht markieren
+            cached = (cached[0], {**cached[1], "fusion_sec": 0.0, "fusion_cached": True})
+        context, info = cached
+        self._note_step(**info)
+        return context
+
+    # ------------------------------------------------------------------ Generierung
+    def _encode_prompt(self, tokenizer, prompt: str, config: dict):
+        """
+        Token-IDs des Prompts + Länge des wiederverwendbaren Präfixes (System + Quelle).
+        Mit Chat-Template: über den PromptAssembler (gecachte Fragmente), sonst der
+        handgebaute Prompt-String der Node als Fallback.
+        """
+        if self.prompt_assembler is not None and self.prompt_assembler.supports(tokenizer):
+            return self.prompt_assembler.assemble(tokenizer, config)
+
+        token_ids = tokenizer(prompt)["input_ids"]
+        shared = config.get("shared_prefix")
+        if not shared or shared not in prompt:
+            return token_ids, 0
+        end = prompt.index(shared) + len(shared)
+        prefix_ids = tokenizer(prompt[:end])["input_ids"]
+        # Token-Grenzen können am Übergang verschmelzen -> nur den identischen Teil nehmen
+        common = 0
+        for a, b in zip(prefix_ids, token_ids):
+            if a != b:
+                break
+            common += 1
+        return token_ids, common
+
+    def _generate(self, model_name: str, prompt: str, config: dict, spinner_msg: str):
+        """
+        Einzel-Inferenz (Batch-Größe 1): Laden, Tokenisieren, Generieren, Dekodieren.
+        Dekodiert werden nur die generierten Tokens - der Prompt (inkl. Quelle) landet nicht im State.
+        """
+        with self._span("model_acquire", model=model_name):
+            model, tokenizer = self.manager.load_by_name(model_name)
+        draft_name = self.draft_models.get(model_name)
+        draft = None
+        if draft_name is not None:
+            with self._span("draft_acquire", model=draft_name):
+                draft = self.manager.load_draft(model_name, draft_name)
+
+        start_tok = time.time()
+        with self._span("tokenize") as span:
+            token_ids, prefix_len = self._encode_prompt(tokenizer, prompt, config)
+            span.set(prompt_tokens=len(token_ids), prefix_tokens=prefix_len)
+        self._note_step(tokenize_sec=round(time.time() - start_tok, 4))
+        input_ids = torch.tensor([token_ids], device=model.device)
+        inputs = {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+
+        # 🔵 NEU: Tokens werden live gestreamt -> Spinner nur, wenn nichts auf die Konsole geht
+        from token_streaming import NodeStreamer # importiert transformers
+        streamer = NodeStreamer(tokenizer, model_name, console=self.stream_console,
+                                callback=self.stream_callback, queue=self.stream_queue)
+        if not self.stream_console:
+            self.spinner.start(spinner_msg)
+        else:
+            print(f"\n--- STREAM ({spinner_msg}) ---")
+        start_prefill = time.perf_counter()
+        try:
+            with torch.no_grad():
+                with self._span("prefix_kv"):
+                    # Mit Draft kein Präfix-KV: das Draft-Modell bräuchte einen eigenen, passenden Cache
+                    past_key_values = self._prefix_kv(model_name, model, inputs, prefix_len, reuse=draft is None)
+                if past_key_values is not None:
+                    inputs["past_key_values"] = past_key_values
+                if self.generation_seed is not None:
+                    set_seed(self.generation_seed)
+                params = self._params(config)
+                configured = params.get("max_new_tokens", 512)
+                # 🔵 NEU: Stopp-Regeln der Node (config["stopping"]) laufen im Generate-Loop mit
+                budget = GenerationBudget.from_config(config, tokenizer,
+                                                      [self._budget_input_tokens(tokenizer, config, token_ids)],
+                                                      input_ids.shape[1], configured)
+                if budget is not None:
+                    params.update(max_new_tokens=budget.max_new_tokens, stopping_criteria=[budget])
+                if draft is not None:
+                    # transformers liest num_assistant_tokens & Co. aus der generation_config des Drafts
+                    for key, value in self.assistant_params.items():
+                        setattr(draft.generation_config, key, value)
+                    params["assistant_model"] = draft
+                streamer.start_time = time.perf_counter()
+                with _count_forwards(target=model, draft=draft) as forwards:
+                    outputs = model.generate(**inputs, **params, streamer=streamer)
+        finally:
+            if not self.stream_console:
+                self.spinner.stop()
+        end_generate = time.perf_counter()
+        stream_metrics = streamer.metrics()
+        self._note_step(**stream_metrics)
+
+        # Prompt und generierte Tokens getrennt zählen (outputs enthält beides)
+        generated = outputs[0].shape[0] - input_ids.shape[1]
+        self._add_step(generated_tokens=generated)
+        eos = outputs[0][-1].item() in self._eos_ids(model, tokenizer)
+        outcome = (budget.outcomes([generated], [eos])[0] if budget is not None
+                   else plain_outcome(generated, eos, configured))
+        # Grund/Budget des letzten Aufrufs; gesparte Tokens summieren sich über alle Aufrufe der Node (Reduce)
+        self._note_step(stop_reason=outcome["stop_reason"], token_budget=outcome["token_budget"])
+        self._add_step(tokens_saved=outcome["tokens_saved"])
+        self._note_speculative(model_name, draft_name if draft is not None else None, generated, forwards,
+                               stream_metrics.get("decode_tps"))
+        if self.tracer is not None:
+            # Prefill = bis zum ersten Token, Decode = erstes bis letztes Token (Zeiten aus dem Streamer)
+            first_token = streamer.token_times[0] if streamer.token_times else end_generate
+            self.tracer.record("prefill", start_prefill, first_token, model=model_name,
+                               prompt_tokens=input_ids.shape[1])
+            self.tracer.record("decode", first_token, end_generate, model=model_name, generated_tokens=generated)
+
+        with self._span("detokenize"):
+            text = tokenizer.decode(outputs[0][input_ids.shape[1]:], skip_special_tokens=True)
+        # Was früher mit decode(outputs[0]) im State landete und jetzt wegfällt
+        self._note_step(stripped_prompt_bytes=len(prompt.encode("utf-8")), stripped_prompt_tokens=input_ids.shape[1])
+        return text, generated
+
+    @staticmethod
+    def _budget_input_tokens(tokenizer, config: dict, token_ids: list) -> int:
+        """Bezugsgröße des Token-Budgets: Eingabe der Vorgänger-Node (config["budget_input"]), sonst der Prompt."""
+        if config.get("budget_input") is None:
+            return len(token_ids)
+        return len(tokenizer(config["budget_input"], add_special_tokens=False)["input_ids"])
+
+    @staticmethod
+    def _eos_ids(model, tokenizer) -> set:
+        eos = model.generation_config.eos_token_id
+        ids = set(eos if isinstance(eos, (list, tuple)) else [eos]) if eos is not None else set()
+        if tokenizer.eos_token_id is not None:
+            ids.add(tokenizer.eos_token_id)
+        return ids
+
+    def _prefix_kv(self, model_name: str, model, inputs, prefix_len: int, reuse: bool = True):
+        """
+        Sucht einen gespeicherten KV-Cache für den längsten bekannten Präfix des Prompts.
+        Ohne Treffer wird der gemeinsame Präfix (System + Quelle) einmal vorab berechnet und abgelegt,
+        generate() muss dann nur noch den aufgabenspezifischen Rest prefillen.
+        """
+        token_ids = inputs["input_ids"][0].tolist()
+        if self.prefix_cache is None or not reuse:
+            self._add_step(prompt_tokens=len(token_ids), prefill_tokens=len(token_ids))
+            return None
+
+        past_key_values, reused = self.prefix_cache.lookup(model_name, token_ids)
+        # Mindestens ein Token muss für generate() übrig bleiben
+        prefix_len = min(prefix_len, len(token_ids) - 1)
+        if past_key_values is None and prefix_len >= self.prefix_cache.min_prefix_tokens:
+            out = model(input_ids=inputs["input_ids"][:, :prefix_len], use_cache=True)
+            self.prefix_cache.store(model_name, token_ids[:prefix_len], out.past_key_values)
+            past_key_values = out.past_key_values
+
+        self._add_step(prompt_tokens=len(token_ids), prefill_tokens=len(token_ids) - reused,
+                       prefill_tokens_skipped=reused)
+        return past_key_values
+
+    def _note_speculative(self, model_name: str, draft_name, generated: int, forwards: dict, decode_tps):
+        """
+        Annahmequote und Speedup des Drafts. Jeder Prüfschritt des Zielmodells (ein Forward-Pass)
+        liefert die angenommenen Draft-Tokens plus ein eigenes Token -> angenommen = generiert - Schritte;
+        vorgeschlagen = Forward-Pässe des Drafts (ein Token pro Pass).
+        Speedup = Decode-Rate mit Draft / Decode-Rate des Zielmodells ohne Draft.
+        """
+        if draft_name is None:
+            if decode_tps:
+                self._plain_decode_tps.setdefault(model_name, []).append(decode_tps)
+            return
+        steps, drafted = forwards["target"], forwards["draft"]
+        accepted = max(0, generated - steps)
+        values = {"spec_draft": draft_name, "spec_drafted": drafted, "spec_accepted": accepted,
+                  "spec_accept_rate": round(accepted / drafted, 3) if drafted else None,
+                  "spec_tokens_per_step": round(generated / steps, 2) if steps else None}
+        baseline = self._decode_baseline(model_name)
+        if baseline and decode_tps:
+            values["spec_speedup"] = round(decode_tps / baseline, 2)
+        self._note_step(**values)
+        rate = f"{values['spec_accept_rate']:.0%}" if drafted else "-"
+        speedup = (f"x{values['spec_speedup']:.2f} ggü. {baseline:.1f} t/s ohne Draft"
+                   if "spec_speedup" in values else "keine Basis ohne Draft")
+        print(f"[{get_ts()}] [SPEC] {model_name} + {draft_name}: {accepted}/{drafted} Draft-Tokens angenommen "
+              f"({rate}), {values['spec_tokens_per_step'] or 0:.2f} Tokens/Schritt | Decode {decode_tps or 0:.1f} t/s | "
+              f"{speedup}")
+
+    def _decode_baseline(self, model_name: str):
+        """Ø Decode-Rate ohne Draft: aus diesem Prozess, sonst aus der Run-Historie (performance.db)."""
+        if model_name not in self._plain_decode_tps and self.interface is not None:
+            rows = self.interface.store.speculative_stats(model=model_name)
+            plain = next((r for r in rows if r["draft"] is None), None)
+            self._plain_decode_tps[model_name] = [plain["decode_tps"]] if plain else []
+        values = self._plain_decode_tps.get(model_name)
+        return sum(values) / len(values) if values else None
+
+    # ------------------------------------------------------------------ Kompakte Ergebnisse
+    def _make_result(self, func_name: str, model_key: str, response: str, token_count: int) -> tuple:
+        """NodeResult (Antwort + separater Denkteil) und die Größe des Denkteils in Bytes/Tokens."""
+        answer, reasoning = split_reasoning(response)
+        result = {"answer": answer, "reasoning": reasoning, "model": model_key, "tokens": token_count}
+        savings = {"reasoning_bytes": 0, "reasoning_tokens": 0}
+        model_name = self.NODE_MODELS.get(func_name)
+        if reasoning and model_name:
+            savings["reasoning_bytes"] = len(reasoning.encode("utf-8"))
+            savings["reasoning_tokens"] = len(self.manager.load_tokenizer(model_name)(reasoning)["input_ids"])
+        return result, savings
+
+    @staticmethod
+    def _savings(savings: dict, step_metrics: dict) -> dict:
+        """
+        Ersparnis gegenüber dem früheren decode(outputs[0]) im State: Prompt (inkl. Quelle) und Denkteil.
+        prefill_tokens_saved gilt pro Folgeknoten, der die Antwort in seinen Prompt übernimmt.
+        """
+        prompt_bytes = step_metrics.pop("stripped_prompt_bytes", 0)
+        prompt_tokens = step_metrics.pop("stripped_prompt_tokens", 0)
+        return {"reasoning_tokens": savings["reasoning_tokens"],
+                "state_bytes_saved": prompt_bytes + savings["reasoning_bytes"],
+                "prefill_tokens_saved": prompt_tokens + savings["reasoning_tokens"]}
+
+    # ------------------------------------------------------------------ Batch-Modus
+    def _run_batch(self, func_name: str, model_key: str, states: list) -> list:
+        """
+        Führt eine Node für viele States aus: ein model.generate pro Micro-Batch. Liefert ein Delta pro State.
+        Node-Span und Ressourcen-Fenster umfassen den ganzen Batch; jedes Dokument bekommt dieselbe
+        Ressourcen-Zusammenfassung (einzeln messbar ist das bei gemeinsamem generate nicht).
+        """
+        print(f"[{get_ts()}] [NODE] START (Batch x{len(states)}): {func_name}")
+        start_time = time.time()
+        resources = self.resource_sampler.begin(func_name) if self.resource_sampler else None
+        try:
+            with self._span(f"node:{func_name}", model=model_key, batch_size=len(states)) as node_span:
+                if self.prefetcher is not None:
+                    self.prefetcher.node_started(func_name)
+
+                prompts, configs, fusions = [], [], []
+                for state in states:
+                    prompt, config = self._build_prompt(func_name, state)
+                    prompts.append(prompt)
+                    configs.append(config)
+                    # Fusions-Kennzahlen gehören zum jeweiligen Dokument
+                    fusions.append({k: v for k, v in self._pop_step_metrics().items() if k.startswith("fusion_")})
+
+                try:
+                    results = self._generate_batch(self.NODE_MODELS[func_name], prompts, configs)
+                finally:
+                    self.manager.release_thread_models()
+
+                duration = time.time() - start_time
+                resource_metrics = self.resource_sampler.end(resources) if resources is not None else {}
+                prefetch_info = {**(self.manager.pop_prefetch_info() or {}), **(self.manager.pop_load_info() or {})}
+                deltas = []
+                with self._span("state_update"):
+                    for state, prompt, fusion, (response, token_count, batch_size, _, prompt_tokens, outcome) in zip(
+                            states, prompts, fusions, results):
+                        result, savings = self._make_result(func_name, model_key, response, token_count)
+                        result["stop_reason"] = outcome["stop_reason"]
+                        stripped = {"stripped_prompt_bytes": len(prompt.encode("utf-8")),
+                                    "stripped_prompt_tokens": prompt_tokens}
+                        # Die Batch-Dauer wird gleichmäßig auf die Dokumente verteilt
+                        metrics = self.logger.log_step(model_key, duration / len(states), token_count,
+                                                       cache_stats=self.manager.get_cache_stats(),
+                                                       extra={**prefetch_info, "batch_size": batch_size,
+                                                              "prompt_tokens": prompt_tokens, **outcome, **fusion,
+                                                              **resource_metrics,
+                                                              **self._savings(savings, stripped)})
+                        deltas.append(node_delta(model_key, result, metrics))
+                node_span.set(generated_tokens=sum(r[1] for r in results),
+                              prompt_tokens=sum(r[4] for r in results))
+        finally:
+            if resources is not None:
+                self.resource_sampler.end(resources)
+        return deltas
+
+    def _generate_batch(self, model_name: str, prompts: list, configs: list) -> list:
+        """
+        Links gepaddete Micro-Batches, nach Länge sortiert (weniger Padding).
+        Ergebnis je Prompt: (Antwort, generierte Tokens, Micro-Batch-Größe, Micro-Batch-Dauer, Prompt-Tokens).
+        Dekodiert werden nur die generierten Tokens.
+        """
+        with self._span("model_acquire", model=model_name):
+            model, tokenizer = self.manager.load_by_name(model_name)
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+
+        eos_ids = self._eos_ids(model, tokenizer)
+        with self._span("tokenize", prompts=len(prompts)):
+            encoded = [self._encode_prompt(tokenizer, prompt, config)[0] for prompt, config in zip(prompts, configs)]
+        self._add_step(prompt_tokens=sum(len(ids) for ids in encoded))
+        # Gleiche Parameter und Stopp-Regeln landen im selben Micro-Batch (ein generate/GenerationBudget pro Micro-Batch)
+        rules = [json.dumps({"params": self._params(config), "stopping": config.get("stopping")}, sort_keys=True,
+                            default=str) for config in configs]
+        order = sorted(range(len(prompts)), key=lambda i: (rules[i], len(encoded[i])))
+        results = [None] * len(prompts)
+
+        position = 0
+        while position < len(order):
+            params = self._params(configs[order[position]])
+            configured = params.get("max_new_tokens", 512)
+            # Kandidaten nur aus der eigenen Regel-Gruppe; die Größe richtet sich nach deren längstem Prompt
+            candidates = [i for i in order[position:position + self.max_batch_size] if rules[i] == rules[order[position]]]
+            longest = max(len(encoded[i]) for i in candidates)
+            size = self._micro_batch_size(model, longest, configured)
+            chunk = candidates[:size]
+            position += len(chunk)
+
+            batch = tokenizer.pad({"input_ids": [encoded[i] for i in chunk]}, padding=True, return_tensors="pt")
+            batch = batch.to(model.device)
+            prompt_width = batch["input_ids"].shape[1]
+            # Stopp-Regeln des Micro-Batches; das Token-Budget richtet sich nach der Eingabe jeder Zeile
+            budget = GenerationBudget.from_config(
+                configs[chunk[0]], tokenizer,
+                [self._budget_input_tokens(tokenizer, configs[i], encoded[i]) for i in chunk], prompt_width, configured)
+            batch_params = dict(params)
+            if budget is not None:
+                batch_params.update(max_new_tokens=budget.max_new_tokens, stopping_criteria=[budget])
+            self.spinner.start(f"Batch {position}/{len(order)} ({len(chunk)} Dokumente)...")
+            start_batch = time.time()
+            try:
+                with torch.no_grad(), self._span("generate_batch", model=model_name, batch_size=len(chunk)):
+                    outputs = model.generate(**batch, **batch_params, pad_token_id=tokenizer.pad_token_id)
+            finally:
+                self.spinner.stop()
+            batch_sec = time.time() - start_batch
+
+            with self._span("detokenize", batch_size=len(chunk)):
+                generated = outputs[:, prompt_width:]
+                # Nur die generierten Tokens zählen (Padding am Ende nicht mitzählen)
+                counts = [int((row != tokenizer.pad_token_id).sum()) for row in generated]
+                eos = [any(t in eos_ids for t in row.tolist()) for row in generated]
+                outcomes = (budget.outcomes(counts, eos) if budget is not None
+                            else [plain_outcome(c, e, configured) for c, e in zip(counts, eos)])
+                for row, index, token_count, outcome in zip(generated, chunk, counts, outcomes):
+                    results[index] = (tokenizer.decode(row, skip_special_tokens=True), token_count, len(chunk),
+                                      batch_sec, len(encoded[index]), outcome)
+        return results
+
+    # ------------------------------------------------------------------ Map-Reduce (lange Quellen)
+    def _generate_source_task(self, func_name: str, state: Dict[str, Any], spinner_msg: str):
+        """
+        Nodes, die die Quelle lesen: passt die Quelle nicht in chunk_tokens (Config "chunking"),
+        wird die Aufgabe pro Abschnitt gebündelt ausgeführt (Map) und anschließend zusammengeführt
+        (Reduce: "concat" ohne Modell oder "prompt" über get_reduce_config, ggf. mehrstufig).
+        """
+        model_name = self.NODE_MODELS[func_name]
+        builder = getattr(self, self.PROMPT_BUILDERS[func_name])
+        prompt, config = self._build_prompt(func_name, state)
+        settings = config.get("chunking")
+        if not settings:
+            return self._generate(model_name, prompt, config, spinner_msg)
+
+        with self._span("chunk_split") as span:
+            tokenizer = self.manager.load_tokenizer(model_name)
+            source = PortfolioPrompts._read_source(state.get("portfolio_items"))
+            chunks = split_by_tokens(tokenizer, source, settings["chunk_tokens"], settings["overlap"])
+            span.set(chunks=len(chunks))
+        if len(chunks) == 1:
+            return self._generate(model_name, prompt, config, spinner_msg)
+
+        # --- MAP: ein Prompt pro Abschnitt, gebündelt generiert ---
+        print(f"[{get_ts()}] [CHUNK] {func_name}: Quelle in {len(chunks)} Abschnitte geteilt "
+              f"({settings['chunk_tokens']} Tokens, Overlap {settings['overlap']})")
+        chunk_prompts, chunk_configs = [], []
+        for chunk in chunks:
+            chunk_prompt, chunk_config = builder({**state, "portfolio_items": chunk})
+            chunk_prompts.append(chunk_prompt)
+            chunk_configs.append(chunk_config)
+        with self._span("map", chunks=len(chunks)):
+            results = self._generate_batch(model_name, chunk_prompts, chunk_configs)
+
+        chunk_sec = []
+        for i, (_, token_count, batch_size, batch_sec, _, outcome) in enumerate(results):
+            chunk_sec.append(round(batch_sec / batch_size, 2))
+            print(f"[{get_ts()}] [CHUNK] {i + 1}/{len(chunks)}: {token_count} Tokens | "
+                  f"{chunk_sec[-1]:.2f}s (Micro-Batch x{batch_size}) | Stopp: {outcome['stop_reason']}")
+        partials = [split_reasoning(r[0])[0] for r in results]
+        total_tokens = sum(r[1] for r in results)
+        self._add_step(generated_tokens=total_tokens, tokens_saved=sum(r[5]["tokens_saved"] for r in results))
+
+        # --- REDUCE ---
+        start_reduce = time.time()
+        task = config["user"][len(config.get("shared_prefix") or ""):]
+        with self._span("reduce", strategy=settings.get("reduce", "prompt"), partials=len(partials)):
+            if settings.get("reduce", "prompt") == "concat":
+                response = "\n\n".join(partials)
+            else:
+                # Zu viele Teilergebnisse für ein Prompt -> erst gruppenweise zusammenfassen
+                while True:
+                    groups = group_for_reduce(tokenizer, partials, settings["chunk_tokens"])
+                    if len(groups) >= len(partials):
+                        groups = [partials] # Keine Verdichtung möglich -> alles in einem Schritt
+                    reduced = []
+                    for group in groups:
+                        reduce_config = PortfolioPrompts.get_reduce_config(task, group)
+                        fallback = f"{reduce_config['system']}\n\n{reduce_config['user']}\n\n"
+                        text, token_count = self._generate(model_name, fallback, reduce_config,
+                                                           "Führe Teilergebnisse zusammen...")
+                        total_tokens += token_count
+                        reduced.append(text)
+                    if len(reduced) == 1:
+                        response = reduced[0]
+                        break
+                    partials = reduced
+
+        # Map-Reduce hat schon immer nur generierte Tokens dekodiert -> hier wird kein Prompt eingespart
+        self._note_step(stripped_prompt_bytes=0, stripped_prompt_tokens=0)
+        self._note_step(chunk_count=len(chunks), chunk_sec=chunk_sec,
+                        reduce_strategy=settings.get("reduce", "prompt"),
+                        reduce_sec=round(time.time() - start_reduce, 2))
+        return response, total_tokens
+
+    def _micro_batch_size(self, model, prompt_len: int, max_new_tokens: int) -> int:
+        """Schätzt, wie viele Sequenzen dieser Länge (KV-Cache) in den freien Speicher passen."""
+        cfg = model.config.get_text_config()
+        heads = cfg.num_attention_heads
+        kv_heads = getattr(cfg, "num_key_value_heads", None) or heads
+        head_dim = getattr(cfg, "head_dim", None) or cfg.hidden_size // heads
+        dtype_bytes = torch.finfo(model.dtype).bits // 8 if model.dtype.is_floating_point else 2
+        # Key + Value je Layer, Faktor 1.5 als Reserve für Aktivierungen und Logits
+        per_seq = 2 * cfg.num_hidden_layers * kv_heads * head_dim * dtype_bytes * (prompt_len + max_new_tokens) * 1.5
+
+        if model.device.type == "cuda":
+            free, _ = torch.cuda.mem_get_info(model.device)
+        else:
+            import psutil
+            free = psutil.virtual_memory().available
+        return max(1, min(self.max_batch_size, int(free * 0.8 // per_seq)))
+
     @log_node_performance("llama_out")
     def llama_1b_test_node(self, state: Dict[str, Any]):
         print(f"\n{'='*20} 🔍 DEBUG START {'='*20}")
@@ -56,155 +830,119 @@ class SpecializedNodes:
         source_path = state.get("portfolio_items")
         print(f"[STEP 1] Rohdaten aus State (portfolio_items): {source_path}")
 
-        # 2. Was macht die LIBRARY daraus?
-        # Hier wird die Methode in prompt_library.py aufgerufen
-        config = PortfolioPrompts.get_analyst_config(source_path)
+        # 2. + 3. Config aus der LIBRARY und finaler PROMPT (Das Llama-Template)
+        prompt, config = self._build_prompt("llama_1b_test_node", state)
         print(f"[STEP 2] Config von Library erhalten:")
         print(f"   -> System-Anweisung: {config['system']}")
         print(f"   -> User-Aufgabe (gekürzt): {config['user'][:100]}...")
         print(f"   -> KI-Parameter: {config['params']}")
-
-        # 3. Der finale PROMPT (Das Llama-Template)
-        # Hier fügen wir die Einzelteile in das Format ein, das Llama versteht
-        prompt = (
-            f"<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n\n"
-            f"{config['system']}<|eot_id|>"
-            f"<|start_header_id|>user<|end_header_id|>\n\n"
-            f"{config['user']}<|eot_id|>"
-            f"<|start_header_id|>assistant<|end_header_id|>\n\n"
-        )
         print(f"[STEP 3] Finaler Prompt-String bereit für GPU (Länge: {len(prompt)} Zeichen)")
 
         # 4. Laden und Inferenz
-        model_name = "meta-llama/Llama-3.2-1B-Instruct"
-        model, tokenizer = self.manager.load_by_name(model_name)
-        
-        inputs = tokenizer(prompt, return_tensors="pt").to("cuda")
-        
-        print(f"[STEP 4] Inferenz läuft auf RTX-Karte...")
-        self.spinner.start("Llama 1B arbeitet...")
-        with torch.no_grad():
-            outputs = model.generate(**inputs, **config['params'])
-        self.spinner.stop()
+        print(f"[STEP 4] Inferenz läuft...")
+        response, token_count = self._generate(
+            "meta-llama/Llama-3.2-1B-Instruct", prompt, config, "Llama 1B arbeitet..."
+        )
 
         # 5. Die ANTWORT
-        response = tokenizer.decode(outputs[0], skip_special_tokens=True)
-        token_count = outputs[0].shape[0]
-
         print(f"[STEP 5] KI-Antwort erhalten ({token_count} Tokens)")
         print(f"{'='*20} 🔍 DEBUG ENDE {'='*20}\n")
         
         # Die Rückgabe füllt automatisch das Feld 'llama_out' im State (wegen Decorator)
         return response, token_count
+
     # 1. ANALYST: Llama 3.2 3B (Historischer Kontext)
     @log_node_performance("meta-llama/Llama-3.2-3B-Instruct")
     def llama_3_2_3_b_node(self, state):
-        model_name = "meta-llama/Llama-3.2-3B-Instruct"
-        model, tokenizer = self.manager.load_by_name(model_name)
-        config = PortfolioPrompts.get_analyst_config(state.get("portfolio_items"))
-        
-        prompt = f"<|system|>\n{config['system']}\n<|user|>\n{config['user']}\n<|assistant|>"
-        inputs = tokenizer(prompt, return_tensors="pt").to("cuda")
-        
-        self.spinner.start("Llama analysiert historische Formen...")
-        with torch.no_grad():
-            outputs = model.generate(**inputs, **config['params'])
-        self.spinner.stop()
-        
-        return tokenizer.decode(outputs[0], skip_special_tokens=True), outputs[0].shape[0]
+        return self._generate_source_task("llama_3_2_3_b_node", state, "Llama analysiert historische Formen...")
 
     # 2. EXTRAKTOR: Qwen 1.7B (Daten & Prozentwerte)
     @log_node_performance("rd211/Qwen3-1.7B-Instruct")
     def qwen_3_1_7b_node(self, state: Dict[str, Any]):
-        model_name = "rd211/Qwen3-1.7B-Instruct"
-        model, tokenizer = self.manager.load_by_name(model_name)
-        
-        # Debugging für Quantisierung
-        print(f"DEBUG: Qwen Datentyp: {model.dtype}")
-        print(f"DEBUG: Qwen Speicher: {model.get_memory_footprint() / 1024**2:.2f} MB") 
-        
-        config = PortfolioPrompts.get_qwen_config(state.get("portfolio_items"))
-        prompt = f"<|im_start|>system\n{config['system']}<|im_end|>\n<|im_start|>user\n{config['user']}<|im_end|>\n<|im_start|>assistant\n"
-        inputs = tokenizer(prompt, return_tensors="pt").to("cuda")
-        
-        self.spinner.start("Qwen extrahiert Länder-Fakten...")
-        with torch.no_grad():
-            outputs = model.generate(**inputs, **config['params'])
-        self.spinner.stop()
-
-        return tokenizer.decode(outputs[0], skip_special_tokens=True), outputs[0].shape[0]
+        return self._generate_source_task("qwen_3_1_7b_node", state, "Qwen extrahiert Länder-Fakten...")
 
     # 3. REASONER: DeepSeek R1 7B (Ökonomischer Audit)
     @log_node_performance("deepseek-ai/DeepSeek-R1-Distill-Qwen-1.5B")
     def deepseek_r1_1_5b_node(self, state: Dict[str, Any]): # 🔵 Name exakt für den 1.5B Aufruf
-        model_name = "deepseek-ai/DeepSeek-R1-Distill-Qwen-1.5B"
-        model, tokenizer = self.manager.load_by_name(model_name)
-        
-        # Abgleich der Ergebnisse von Llama und Qwen
-        llama_out = state.get('meta-llama/Llama-3.2-3B-Instruct', '')
-        qwen_out = state.get('rd211/Qwen3-1.7B-Instruct', '')
-        context = f"Historische Analyse: {llama_out}\nDaten-Extraktion: {qwen_out}"
-        
-        config = PortfolioPrompts.get_deepseek_config(context)
-        prompt = f"<|thought|>\n{config['system']}\n{config['user']}"
-        inputs = tokenizer(prompt, return_tensors="pt").to("cuda")
-
-        self.spinner.start("DeepSeek 1.5B prüft die ökonomische Logik...")
-        with torch.no_grad():
-            outputs = model.generate(**inputs, **config['params'])
-        self.spinner.stop()
-        
-        return tokenizer.decode(outputs[0], skip_special_tokens=True), outputs[0].shape[0]
+        prompt, config = self._build_prompt("deepseek_r1_1_5b_node", state)
+        return self._generate("deepseek-ai/DeepSeek-R1-Distill-Qwen-1.5B", prompt, config,
+                              "DeepSeek 1.5B prüft die ökonomische Logik...")
 
     # 4. STRATEGE: Mistral 7B (Politik-Empfehlung)
     @log_node_performance("Mistral-7B-Instruct-v0.3")
     def mistral_7b_node(self, state: Dict[str, Any]):
-        model_name = "Mistral-7B-Instruct-v0.3"
-        model, tokenizer = self.manager.load_by_name(model_name)
-        
-        audit_data = state.get("deepseek-ai/DeepSeek-R1-Distill-Qwen-7B", "")
-        config = PortfolioPrompts.get_mistral_config(audit_data)
-        
-        prompt = f"<s>[INST] {config['system']}\n{config['user']} [/INST]"
-        inputs = tokenizer(prompt, return_tensors="pt").to("cuda")
-        
-        self.spinner.start("Mistral entwirft Strategie...")
-        with torch.no_grad():
-            outputs = model.generate(**inputs, **config['params'])
-        self.spinner.stop()
-        
-        return tokenizer.decode(outputs[0], skip_special_tokens=True), outputs[0].shape[0]
+        prompt, config = self._build_prompt("mistral_7b_node", state)
+        return self._generate("Mistral-7B-Instruct-v0.3", prompt, config,
+                              "Mistral entwirft Strategie...")
 
     # 5. FORMATIERER: Google Gemma (JSON-Struktur)
     @log_node_performance("google/gemma-3n-E2B-it")
     def gemma_2b_node(self, state: Dict[str, Any]):
-        model_name = "google/gemma-3n-E2B-it"
-        model, tokenizer = self.manager.load_by_name(model_name)
-        
-        mistral_out = state.get('Mistral-7B-Instruct-v0.3', '')
-        config = PortfolioPrompts.get_gemma_config(mistral_out)
-        
-        prompt = f"<start_of_turn>model\n{config['system']}<end_of_turn>\n<start_of_turn>user\n{config['user']}<end_of_turn>\n<start_of_turn>model\n"
-        inputs = tokenizer(prompt, return_tensors="pt").to("cuda")
-        
-        self.spinner.start("Gemma finalisiert JSON...")
-        with torch.no_grad():
-            outputs = model.generate(**inputs, **config['params'], )
-        self.spinner.stop()
-
-        return tokenizer.decode(outputs[0], skip_special_tokens=True), outputs[0].shape[0]
+        prompt, config = self._build_prompt("gemma_2b_node", state)
+        return self._generate("google/gemma-3n-E2B-it", prompt, config,
+                              "Gemma finalisiert JSON...")
 
     # 6. REPORTER (Export)
     def reporter_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
         print("\n--- Reporter: Exportiere Ergebnisse ---")
-        internal_keys = ['portfolio_items', 'metrics', 'report', 'report_complete']
         report_sections = ["# FINALES MIETREGULIERUNGS-DOSSIER\n"]
 
-        for key, value in state.items():
-            if key not in internal_keys and isinstance(value, str):
+        reasoning_sections = []
+
+        # 🔵 NEU: Ergebnisse stehen unter state["results"] (Modell -> NodeResult), siehe state_schema.py
+        for key, value in (state.get("results") or {}).items():
+            if isinstance(value, str) or (isinstance(value, dict) and "answer" in value):
                 clean_name = key.split('/')[-1]
-                report_sections.append(f"## 🔹 Modell: {clean_name}\n{value}\n\n---")
+                report_sections.append(f"## 🔹 Modell: {clean_name}\n{answer_of(value)}\n\n---")
+                if isinstance(value, dict) and value.get("reasoning"):
+                    reasoning_sections.append(f"## 💭 Denkprozess: {clean_name}\n{value['reasoning']}\n\n---")
 
         full_report = "\n".join(report_sections)
-        if self.interface: self.interface.save_all(state)
-        return {"report": full_report, "report_complete": True}
\ No newline at end of file
+        # Kompaktierung des States in diesem Run (Prompt/Quelle und Denkteile nicht weitergereicht)
+        metrics = state.get("metrics", [])
+        saved_kb = sum(m.get("state_bytes_saved", 0) for m in metrics) / 1024
+        saved_tokens = sum(m.get("prefill_tokens_saved", 0) for m in metrics)
+        print(f"[{get_ts()}] [STATE] Kompakter State: {saved_kb:.1f} KB weniger im State | "
+              f"{saved_tokens} Prefill-Tokens weniger pro Folgeknoten | "
+              f"{sum(m.get('reasoning_tokens', 0) for m in metrics)} Denk-Tokens abgetrennt")
+        # 🔵 NEU: Nur Spans und Ressourcen-Zeitreihe DIESES Runs abtrennen - parallele Runs (run_many)
+        # behalten ihre Einträge, bis ihr eigener Reporter läuft
+        run = current_run_id()
+        tracer = self.tracer.detach(run) if self.tracer is not None else None
+        run_id = tracer.run_id if tracer is not None else (run or new_run_id())
+        timeline = self.resource_sampler.take_timeline(run) if self.resource_sampler is not None else None
+        if timeline is not None and tracer is not None:
+            for sample in timeline:
+                tracer.counter("memory_mb", sample["t"], rss=sample["rss_mb"], device=sample["device_mb"] or 0)
+                tracer.counter("cpu_pct", sample["t"], process=sample["cpu_pct"])
+        # Denkprozesse als eigene Datei neben dem Bericht
+        reasoning = "# DENKPROZESSE\n\n" + "\n".join(reasoning_sections) if reasoning_sections else None
+        if self.interface:
+            # 🔵 NEU: Tagebuch, performance.db (inkl. Spans) und Bericht über den Write-Behind-Exporter
+            self.interface.save_all(state, spans=tracer.spans if tracer else None, run_uid=run_id,
+                                    report=full_report, reasoning=reasoning)
+        elif self.unsaved_exports is not None:
+            self.unsaved_exports[run_id] = {"spans": tracer.spans if tracer else None, "reasoning": reasoning}
+        base_dir = self.interface.dAbA_dir if self.interface else os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "dAbA")
+        exports = []
+        if timeline is not None:
+            sampler = self.resource_sampler
+            exports.append(lambda: sampler.export(os.path.join(base_dir, "traces"), run_id, timeline))
+        if tracer is not None:
+            exports.append(tracer.export)
+        for export in exports:
+            if self.interface:
+                self.interface.submit("task", export)
+            else:
+                export()
+        return {"report": full_report, "report_complete": True}
+
+    # 🔵 NEU: Async-Varianten für graph.ainvoke() (siehe async_node)
+    allama_1b_test_node = async_node("llama_1b_test_node")
+    allama_3_2_3_b_node = async_node("llama_3_2_3_b_node")
+    aqwen_3_1_7b_node = async_node("qwen_3_1_7b_node")
+    adeepseek_r1_1_5b_node = async_node("deepseek_r1_1_5b_node")
+    amistral_7b_node = async_node("mistral_7b_node")
+    agemma_2b_node = async_node("gemma_2b_node")
+    areporter_node = async_node("reporter_node")
\ No newline at end of file
@@ -0,0 +1,62 @@
+import threading
+from datetime import datetime
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+class GraphPrefetcher:
+    """
+    Liest die Topologie eines kompilierten StateGraph und lädt das Modell der nächsten
+    Node(s) im Hintergrund in den Host-RAM, während die aktuelle Node noch generiert.
+    """
+
+    def __init__(self, graph, manager, node_models: dict, wait_timeout: float = 600.0):
+        self.manager = manager
+        # Methodenname der Node (z.B. "qwen_3_1_7b_node") -> Modellname aus modelle.json
+        self.node_models = node_models
+        self.wait_timeout = wait_timeout
+
+        drawable = graph.get_graph()
+        # Graph-ID ("qwen317B") -> Methodenname; Kanten in beide Richtungen auflösen
+        self.func_names = {}
+        for node_id, node in drawable.nodes.items():
+            func = getattr(node.data, "func", None)
+            self.func_names[node_id] = getattr(func, "__name__", node_id)
+        self.successors = {node_id: [] for node_id in drawable.nodes}
+        for edge in drawable.edges:
+            self.successors[edge.source].append(edge.target)
+
+    def next_models(self, func_name: str) -> list:
+        """Modelle der direkten Nachfolger aller Graph-Nodes, die diese Methode ausführen."""
+        current = self.node_models.get(func_name)
+        models = []
+        for node_id, name in self.func_names.items():
+            if name != func_name:
+                continue
+            for target in self.successors.get(node_id, []):
+                model_name = self.node_models.get(self.func_names.get(target))
+                if model_name and model_name != current and model_name not in models:
+                    models.append(model_name)
+        return models
+
+    def node_started(self, func_name: str):
+        """
+        Hook aus log_node_performance (nur wenn die Node wirklich rechnet, nicht bei Antwort-Cache-Treffern):
+        startet den Hintergrund-Prefetch für die Nachfolger.
+        """
+        models = self.next_models(func_name)
+        if not models:
+            return
+        current = self.node_models.get(func_name)
+        worker = threading.Thread(target=self._stage, args=(current, models), daemon=True)
+        worker.start()
+
+    def _stage(self, current_model: str, models: list):
+        # Erst laden, wenn das Modell der aktuellen Node bereitsteht -> kein Wettlauf um die Platte.
+        # Der Manager meldet das selbst (kein Polling, beim Daemon eine einzige Anfrage)
+        if current_model and not self.manager.wait_resident(current_model, self.wait_timeout):
+            print(f"[{get_ts()}] [PREFETCH] Timeout beim Warten auf {current_model}")
+            return
+
+        for model_name in models:
+            self.manager.prefetch(model_name)
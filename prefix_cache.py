@@ -0,0 +1,82 @@
+import copy
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+def hash_ids(token_ids) -> str:
+    return hashlib.sha1(array("q", token_ids).tobytes()).hexdigest()
+
+def cache_nbytes(past_key_values) -> int:
+    """Speicherbedarf eines KV-Caches (DynamicCache) in Bytes."""
+    total = 0
+    for layer in getattr(past_key_values, "layers", []):
+        for tensor in (getattr(layer, "keys", None), getattr(layer, "values", None)):
+            if tensor is not None and hasattr(tensor, "nbytes"):
+                total += tensor.nbytes
+    return total
+
+class PrefixKVCache:
+    """
+    Speichert past_key_values für gemeinsame Prompt-Präfixe (System-Prompt + Quelle).
+    Schlüssel: (Modell, Länge, Hash der Token-IDs). Gesucht wird der längste passende Präfix,
+    verdrängt wird LRU, sobald das Speicherlimit überschritten ist.
+    """
+
+    def __init__(self, max_gb: float = 2.0, min_prefix_tokens: int = 32):
+        self.lock = threading.Lock()
+        self.max_bytes = int(max_gb * 1024**3)
+        self.min_prefix_tokens = min_prefix_tokens
+        self.entries = OrderedDict() # (model, length, hash) -> {"kv": ..., "nbytes": ...}
+        self.used_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "tokens_skipped": 0}
+
+    def lookup(self, model_id: str, token_ids: list):
+        """
+        Liefert (Kopie des KV-Caches, Präfixlänge) oder (None, 0).
+        Mindestens ein Token bleibt übrig, damit generate noch etwas zu prefillen hat.
+        """
+        with self.lock:
+            candidates = sorted(
+                (key for key in self.entries if key[0] == model_id and key[1] < len(token_ids)),
+                key=lambda key: key[1], reverse=True
+            )
+            for key in candidates:
+                if hash_ids(token_ids[:key[1]]) == key[2]:
+                    self.entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    self.stats["tokens_skipped"] += key[1]
+                    # generate() erweitert den Cache in-place -> immer mit einer Kopie arbeiten
+                    return copy.deepcopy(self.entries[key]["kv"]), key[1]
+            self.stats["misses"] += 1
+            return None, 0
+
+    def store(self, model_id: str, prefix_ids: list, past_key_values):
+        if len(prefix_ids) < self.min_prefix_tokens:
+            return
+        key = (model_id, len(prefix_ids), hash_ids(prefix_ids))
+        nbytes = cache_nbytes(past_key_values)
+        if nbytes > self.max_bytes:
+            print(f"[{get_ts()}] [PREFIX] Präfix ({nbytes / 1024**2:.0f} MB) größer als das Limit, nicht gespeichert")
+            return
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return
+            while self.entries and self.used_bytes + nbytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.used_bytes -= evicted["nbytes"]
+                self.stats["evictions"] += 1
+            self.entries[key] = {"kv": copy.deepcopy(past_key_values), "nbytes": nbytes}
+            self.used_bytes += nbytes
+        print(f"[{get_ts()}] [PREFIX] Gespeichert: {len(prefix_ids)} Tokens für {model_id} "
+              f"({nbytes / 1024**2:.1f} MB, gesamt {self.used_bytes / 1024**2:.1f} MB)")
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.used_bytes = 0
@@ -0,0 +1,89 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+class PromptAssembler:
+    """
+    Baut Prompts über das Chat-Template des jeweiligen Tokenizers statt über handgeschriebene
+    Tags. Das Template wird einmal mit Platzhaltern gerendert und in statische Fragmente
+    zerlegt; Token-IDs von Fragmenten, System-Prompt und Quelle werden pro Tokenizer gecacht
+    und beim nächsten Aufruf nur noch aneinandergehängt.
+    """
+
+    SYSTEM_SLOT = "<<<SYSTEM_SLOT>>>"
+    USER_SLOT = "<<<USER_SLOT>>>"
+
+    def __init__(self, max_entries: int = 256):
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        self.templates = {}         # tokenizer_key -> (head, mid, tail)
+        self.ids = OrderedDict()    # (tokenizer_key, sha1(text)) -> Token-IDs
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def supports(tokenizer) -> bool:
+        return getattr(tokenizer, "chat_template", None) is not None
+
+    @staticmethod
+    def _tokenizer_key(tokenizer) -> str:
+        return f"{type(tokenizer).__name__}:{tokenizer.name_or_path}:{len(tokenizer)}"
+
+    def _template(self, tokenizer, key: str):
+        if key in self.templates:
+            return self.templates[key]
+
+        messages = [
+            {"role": "system", "content": self.SYSTEM_SLOT},
+            {"role": "user", "content": self.USER_SLOT},
+        ]
+        try:
+            text = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+        except Exception:
+            text = ""
+        # Templates ohne System-Rolle (z.B. Gemma, ältere Mistral): System in die User-Nachricht
+        if self.SYSTEM_SLOT not in text:
+            merged = [{"role": "user", "content": f"{self.SYSTEM_SLOT}\n\n{self.USER_SLOT}"}]
+            text = tokenizer.apply_chat_template(merged, tokenize=False, add_generation_prompt=True)
+
+        head, rest = text.split(self.SYSTEM_SLOT, 1)
+        mid, tail = rest.split(self.USER_SLOT, 1)
+        self.templates[key] = (head, mid, tail)
+        return self.templates[key]
+
+    def _encode(self, tokenizer, key: str, text: str) -> list:
+        if not text:
+            return []
+        cache_key = (key, hashlib.sha1(text.encode("utf-8")).hexdigest())
+        with self.lock:
+            if cache_key in self.ids:
+                self.ids.move_to_end(cache_key)
+                self.stats["hits"] += 1
+                return self.ids[cache_key]
+        # Special Tokens (BOS etc.) stehen bereits im gerenderten Template
+        token_ids = tokenizer(text, add_special_tokens=False)["input_ids"]
+        with self.lock:
+            self.stats["misses"] += 1
+            self.ids[cache_key] = token_ids
+            while len(self.ids) > self.max_entries:
+                self.ids.popitem(last=False)
+        return token_ids
+
+    def assemble(self, tokenizer, config: dict):
+        """
+        Liefert (token_ids, prefix_len). prefix_len = Länge von Template-Kopf + System + Quelle
+        (0, falls die Config keinen shared_prefix hat) - passt direkt zum Prefix-KV-Cache.
+        """
+        key = self._tokenizer_key(tokenizer)
+        head, mid, tail = self._template(tokenizer, key)
+
+        user = config["user"]
+        shared = config.get("shared_prefix") or ""
+        if not shared or not user.startswith(shared):
+            shared = ""
+
+        prefix_ids = (self._encode(tokenizer, key, head)
+                      + self._encode(tokenizer, key, config["system"])
+                      + self._encode(tokenizer, key, mid)
+                      + self._encode(tokenizer, key, shared))
+        suffix_ids = self._encode(tokenizer, key, user[len(shared):]) + self._encode(tokenizer, key, tail)
+        return prefix_ids + suffix_ids, (len(prefix_ids) if shared else 0)
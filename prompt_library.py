@@ -1,4 +1,5 @@
 import os
+import asyncio
 
 class PortfolioPrompts:
     """Zentrale Bibliothek für die Analyse von Mietregulierungen."""
@@ -21,27 +22,43 @@ class PortfolioPrompts:
                 return f"[Fehler beim Lesen der Datei: {e}]"
         return str(source)
 
+    @classmethod
+    async def aread_source(cls, source: str) -> str:
+        """Wie _read_source, aber die Datei wird in einem Thread gelesen (blockiert den Event-Loop nicht)."""
+        if isinstance(source, str) and os.path.exists(source):
+            return await asyncio.to_thread(cls._read_source, source)
+        return cls._read_source(source)
+
     # --- CONFIGS FÜR DIE NODES (Synchronisiert mit nodes.py) ---
 
     @classmethod
     def get_analyst_config(cls, source: str):
         content = cls._read_source(source)
+        # Quelle vor der Aufgabe -> System + Quelle bilden einen wiederverwendbaren Präfix (KV-Cache)
+        shared_prefix = f"Quelle: {content}\n\n"
         return {
             "system": "Du bist ein Experte für Wohnungspolitik und Mietrecht.",
-            "user": f"Aufgabe 1: Analysiere die Formen der Mietregulierung. Erkläre den Unterschied "
-                    f"zwischen 'strict price ceilings', 'vacancy control' und 'vacancy decontrol'.\n\n"
-                    f"Quelle: {content}",
+            "user": f"{shared_prefix}"
+                    f"Aufgabe 1: Analysiere die Formen der Mietregulierung. Erkläre den Unterschied "
+                    f"zwischen 'strict price ceilings', 'vacancy control' und 'vacancy decontrol'.",
+            "shared_prefix": shared_prefix,
+            # Map-Reduce für lange Quellen: Abschnitte à chunk_tokens, Teilanalysen per Prompt zusammenführen
+            "chunking": {"chunk_tokens": 6000, "overlap": 300, "reduce": "prompt"},
             "params": {"temperature": 0.3, "max_new_tokens": 500, "do_sample": True}
         }
 
     @classmethod
     def get_qwen_config(cls, source: str):
         content = cls._read_source(source)
+        shared_prefix = f"Quelle: {content}\n\n"
         return {
             "system": "Du bist ein präziser Daten-Extraktor.",
-            "user": f"Aufgabe 2: Erstelle eine Liste aller Länder/Städte und deren spezifische "
-                    f"Prozentsätze für Mieterhöhungen (z.B. China 5%, Frankreich 3.5%).\n\n"
-                    f"Quelle: {content}",
+            "user": f"{shared_prefix}"
+                    f"Aufgabe 2: Erstelle eine Liste aller Länder/Städte und deren spezifische "
+                    f"Prozentsätze für Mieterhöhungen (z.B. China 5%, Frankreich 3.5%).",
+            "shared_prefix": shared_prefix,
+            # Listen lassen sich direkt aneinanderhängen -> Reduce ohne Modellaufruf
+            "chunking": {"chunk_tokens": 4000, "overlap": 200, "reduce": "concat"},
             "params": {"temperature": 0.05, "max_new_tokens": 400, "do_sample": True}
         }
 
@@ -51,7 +68,12 @@ class PortfolioPrompts:
             "system": "Du bist ein ökonomischer Auditor.",
             "user": f"Bewerte die ökonomischen Auswirkungen von Mietkontrollen und den Konsens "
                     f"unter Ökonomen basierend auf diesen Daten:\n{text}",
-            "params": {"temperature": 0.6, "max_new_tokens": 600, "do_sample": True}
+            "params": {"temperature": 0.6, "max_new_tokens": 600, "do_sample": True},
+            # Erst nach dem Denkteil zählen: Fazit in wenigen Sätzen, danach nicht weiterschreiben
+            "stopping": {"after": "</think>", "max_sentences": 10, "stop_strings": ["\n\n\n"],
+                         "budget": {"per_input_token": 0.8, "min": 256}},
+            # Budget skaliert mit den Vorgänger-Ergebnissen, nicht mit dem ganzen Prompt
+            "budget_input": text
         }
 
     @classmethod
@@ -61,4 +83,46 @@ class PortfolioPrompts:
             "user": f"Entwirf eine Empfehlung für eine ausgewogene Wohnungspolitik unter Nutzung "
                     f"der im Text genannten Alternativen.\n\nAudit: {audit_insight}",
             "params": {"temperature": 0.4, "max_new_tokens": 500, "do_sample": True}
-        }
\ No newline at end of file
+        }
+
+    @classmethod
+    def get_gemma_config(cls, recommendation: str):
+        return {
+            "system": "Du bist ein präziser Formatierer. Antworte ausschließlich mit gültigem JSON.",
+            "user": f"Überführe die folgende Politik-Empfehlung in ein JSON-Objekt mit den Feldern "
+                    f"\"titel\", \"massnahmen\" (Liste), \"risiken\" (Liste) und \"fazit\".\n\n"
+                    f"Empfehlung: {recommendation}",
+            "params": {"temperature": 0.1, "max_new_tokens": 500, "do_sample": True},
+            # Nach der schließenden Klammer ist die Antwort fertig; JSON ist etwa so lang wie die Vorlage
+            "stopping": {"json": True, "budget": {"per_input_token": 1.2, "min": 128}},
+            "budget_input": recommendation
+        }
+
+    @classmethod
+    def get_fusion_config(cls, node_name: str):
+        """
+        Token-Budget für den Kontext aus vorgelagerten Nodes (gemessen mit dem Tokenizer des Zielmodells).
+        strategy: "extractive" (zentrale Sätze wählen) oder "truncate" (vorne beginnen, hinten kürzen);
+        weights: Anteil der Beiträge am Budget (ungenutztes Budget geht an die übrigen).
+        """
+        settings = {
+            # Llama und Qwen fassen dieselbe Quelle zusammen -> viele Überschneidungen
+            "deepseek_r1_1_5b_node": {"budget_tokens": 1200, "strategy": "extractive", "dedup": True,
+                                      "weights": {"Historische Analyse": 1.0, "Daten-Extraktion": 1.0}},
+            # Nur das Audit-Fazit; Anfang und Reihenfolge zählen -> kürzen statt auswählen
+            "mistral_7b_node": {"budget_tokens": 1000, "strategy": "truncate", "dedup": True},
+        }
+        return settings.get(node_name)
+
+    @classmethod
+    def get_reduce_config(cls, task: str, partials: list):
+        """Führt die Teilergebnisse einer abschnittsweise bearbeiteten Aufgabe zusammen."""
+        joined = "\n\n".join(f"[Abschnitt {i + 1}]\n{p}" for i, p in enumerate(partials))
+        return {
+            "system": "Du fasst Teilergebnisse sorgfältig zu einem Gesamtergebnis zusammen.",
+            "user": f"Die folgende Aufgabe wurde abschnittsweise auf einer langen Quelle bearbeitet:\n{task}\n\n"
+                    f"Teilergebnisse:\n{joined}\n\n"
+                    f"Führe die Teilergebnisse zu einer einzigen, widerspruchsfreien Antwort zusammen "
+                    f"und entferne Dopplungen.",
+            "params": {"temperature": 0.2, "max_new_tokens": 600, "do_sample": True}
+        }
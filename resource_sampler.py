@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import threading
+from datetime import datetime
+import psutil
+from tracing import current_run_id
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+def process_peak_rss_mb() -> float:
+    """Höchster RSS des Prozesses seit Start (Windows: peak_wset, sonst getrusage)."""
+    info = psutil.Process().memory_info()
+    if hasattr(info, "peak_wset"):
+        return info.peak_wset / 1024**2
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024 # macOS: Bytes, Linux: KB
+
+def device_memory_mb():
+    """
+    Belegter Gerätespeicher in MB (CUDA oder Apple MPS), sonst None.
+    Fragt nur nach, wenn torch ohnehin schon geladen ist - der Sampler soll torch nicht importieren.
+    """
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return None
+    try:
+        if torch.cuda.is_available():
+            return sum(torch.cuda.memory_allocated(i) for i in range(torch.cuda.device_count())) / 1024**2
+        mps = getattr(torch, "mps", None)
+        if mps is not None and torch.backends.mps.is_available():
+            return mps.current_allocated_memory() / 1024**2
+    except AttributeError:
+        pass # torch wird gerade erst (in einem anderen Thread) importiert
+    return None
+
+class ResourceSampler:
+    """
+    Hintergrund-Thread, der während laufender Nodes RSS, CPU-Last (Prozess + pro Kern) und
+    Gerätespeicher abtastet. Solange keine Node läuft, schläft der Thread.
+    begin()/end() klammern eine Node und liefern Peak/Durchschnitt ihres Zeitfensters.
+    Jeder Messpunkt merkt sich, welche Runs (tracing.bind_run) gerade Nodes offen hatten -
+    take_timeline(run) liefert nur die Punkte dieses Runs, parallele Runs behalten ihre.
+    """
+
+    def __init__(self, interval_sec: float = 0.1, max_samples: int = 100_000):
+        self.interval_sec = interval_sec
+        self.max_samples = max_samples
+        self.process = psutil.Process()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.active = 0
+        self.timeline = [] # [{"t": perf_counter, "rss_mb", "cpu_pct", "cpu_cores", "device_mb", "runs"}]
+        self.open_runs = {} # Run-ID -> Zahl offener begin()-Fenster
+        self.open_starts = {} # id(token) -> Start des Fensters (Messpunkte davor werden nicht mehr gebraucht)
+        self.thread = None
+        # Erster Aufruf von cpu_percent liefert 0.0 -> einmal initialisieren
+        self.process.cpu_percent(None)
+        psutil.cpu_percent(None, percpu=True)
+
+    def _sample(self):
+        sample = {
+            "t": time.perf_counter(),
+            "rss_mb": round(self.process.memory_info().rss / 1024**2, 1),
+            "cpu_pct": self.process.cpu_percent(None),
+            "cpu_cores": psutil.cpu_percent(None, percpu=True),
+            "device_mb": device_memory_mb(),
+        }
+        with self.lock:
+            sample["runs"] = tuple(self.open_runs)
+            if len(self.timeline) < self.max_samples:
+                self.timeline.append(sample)
+        return sample
+
+    def _run(self):
+        while True:
+            if self.active == 0:
+                self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+            try:
+                self._sample()
+            except Exception as e:
+                print(f"[{get_ts()}] [RES] Messung fehlgeschlagen: {e}")
+            time.sleep(self.interval_sec)
+
+    def begin(self, label: str) -> dict:
+        run = current_run_id()
+        with self.lock:
+            self.active += 1
+            self.open_runs[run] = self.open_runs.get(run, 0) + 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+        first = self._sample() # auch sehr kurze Nodes haben so mindestens zwei Messpunkte
+        token = {"label": label, "start": first["t"], "run": run}
+        with self.lock:
+            self.open_starts[id(token)] = first["t"]
+        return token
+
+    def end(self, token: dict) -> dict:
+        if token.get("done"):
+            return {}
+        token["done"] = True
+        last = self._sample()
+        with self.lock:
+            self.active = max(0, self.active - 1)
+            self.open_starts.pop(id(token), None)
+            remaining = self.open_runs.get(token["run"], 0) - 1
+            if remaining > 0:
+                self.open_runs[token["run"]] = remaining
+            else:
+                self.open_runs.pop(token["run"], None)
+            window = [s for s in self.timeline if token["start"] <= s["t"] <= last["t"]]
+        return self.summarize(window)
+
+    @staticmethod
+    def summarize(window: list) -> dict:
+        if not window:
+            return {}
+        rss = [s["rss_mb"] for s in window]
+        cpu = [s["cpu_pct"] for s in window[1:]] or [window[0]["cpu_pct"]] # erster Wert: Zeit vor der Node
+        cores = [s["cpu_cores"] for s in window[1:]] or [window[0]["cpu_cores"]]
+        device = [s["device_mb"] for s in window if s["device_mb"] is not None]
+        summary = {
+            "rss_peak_mb": max(rss),
+            "rss_avg_mb": round(sum(rss) / len(rss), 1),
+            "process_peak_rss_mb": round(process_peak_rss_mb(), 1),
+            "cpu_avg_pct": round(sum(cpu) / len(cpu), 1),
+            "cpu_cores_avg_pct": [round(sum(core) / len(cores), 1) for core in zip(*cores)],
+            "resource_samples": len(window),
+        }
+        if device:
+            summary["device_peak_mb"] = round(max(device), 1)
+            summary["device_avg_mb"] = round(sum(device) / len(device), 1)
+        return summary
+
+    def export(self, out_dir: str, run_id: str, timeline: list = None) -> str:
+        """Schreibt die Zeitreihe des Runs als JSONL (Zeit relativ zur ersten Messung)."""
+        os.makedirs(out_dir, exist_ok=True)
+        path = os.path.join(out_dir, f"{run_id}.resources.jsonl")
+        if timeline is None:
+            with self.lock:
+                timeline = [self._public(s) for s in self.timeline]
+        origin = timeline[0]["t"] if timeline else 0.0
+        with open(path, "w", encoding="utf-8") as f:
+            for sample in timeline:
+                f.write(json.dumps({**sample, "t": round(sample["t"] - origin, 4)}) + "\n")
+        print(f"[{get_ts()}] [RES] {len(timeline)} Messpunkte -> {path}")
+        return path
+
+    def reset(self):
+        with self.lock:
+            self.timeline = []
+
+    @staticmethod
+    def _public(sample: dict) -> dict:
+        return {k: v for k, v in sample.items() if k != "runs"}
+
+    def take_timeline(self, run: str = None) -> list:
+        """
+        Liefert die Messpunkte eines Runs (None = ohne Run-ID) für den Export im Hintergrund.
+        Entfernt werden nur Punkte, die kein anderer Run und kein noch offenes Fenster mehr braucht.
+        """
+        with self.lock:
+            timeline = [self._public(s) for s in self.timeline if run in s["runs"]]
+            oldest_open = min(self.open_starts.values(), default=float("inf"))
+            kept = []
+            for sample in self.timeline:
+                if run in sample["runs"]:
+                    sample["runs"] = tuple(r for r in sample["runs"] if r != run)
+                if sample["runs"] or sample["t"] >= oldest_open:
+                    kept.append(sample)
+            self.timeline = kept
+        return timeline
@@ -0,0 +1,89 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from datetime import datetime
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+# Bei Änderungen an der Bedeutung gespeicherter Werte erhöhen (alte Einträge werden nicht mehr getroffen)
+# 2: token_count zählt nur noch generierte Tokens
+# 3: Antworten enthalten nur noch generierte Tokens (ohne Prompt)
+# 4: Schlüssel enthält Lade-Profil und Chunking-Einstellungen
+KEY_VERSION = 4
+
+class ResponseCache:
+    """
+    Persistenter, inhaltsadressierter Cache für Node-Antworten (SQLite neben performance.db).
+    Schlüssel: Modellpfad + exakte Prompt-Token-IDs + Generierungsparameter + Seed.
+    Sampling ohne festen Seed ist nicht deterministisch und wird deshalb nie gecacht.
+    """
+
+    def __init__(self, db_path: str, max_mb: float = 256.0, bypass: bool = False):
+        self.db_path = db_path
+        self.max_bytes = int(max_mb * 1024**2)
+        self.bypass = bypass # True: immer neu generieren (z.B. bewusst neue Samples ziehen)
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._init_db()
+
+    def _init_db(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS responses
+                           (key TEXT PRIMARY KEY,
+                            model TEXT,
+                            response TEXT,
+                            token_count INTEGER,
+                            size_bytes INTEGER,
+                            created REAL,
+                            last_used REAL)''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+
+    @staticmethod
+    def make_key(model_path: str, token_ids: list, params: dict, seed) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"v{KEY_VERSION}".encode("utf-8"))
+        digest.update(model_path.encode("utf-8"))
+        digest.update(array("q", token_ids).tobytes())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(str(seed).encode("utf-8"))
+        return digest.hexdigest()
+
+    def is_cacheable(self, params: dict, seed) -> bool:
+        if self.bypass:
+            return False
+        return not params.get("do_sample", False) or seed is not None
+
+    def get(self, key: str):
+        """Liefert (response, token_count) oder None."""
+        with self.lock, sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("SELECT response, token_count FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row
+
+    def put(self, key: str, model: str, response: str, token_count: int):
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        with self.lock, sqlite3.connect(self.db_path) as conn:
+            conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (key, model, response, int(token_count), size, now, now))
+            self._evict(conn)
+
+    def _evict(self, conn):
+        """LRU: älteste Einträge löschen, bis die Größenobergrenze wieder eingehalten ist."""
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        removed = 0
+        for key, size in conn.execute("SELECT key, size_bytes FROM responses ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            removed += 1
+        print(f"[{get_ts()}] [MEMO] {removed} Einträge verdrängt (Limit {self.max_bytes / 1024**2:.0f} MB)")
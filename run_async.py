@@ -0,0 +1,74 @@
+import os
+import glob
+import time
+import asyncio
+import argparse
+import importlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from tracing import bind_run
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+WORKFLOWS = {"main": "run_workflow", "simple": "04_simple"}
+
+async def run_many(graph, initial_states: list, concurrency: int = 2) -> list:
+    """
+    Führt viele Workflow-Instanzen per graph.ainvoke() gleichzeitig aus, höchstens `concurrency` davon
+    zur selben Zeit. Liefert die End-States in Eingabereihenfolge (Exceptions werden als Ergebnis geliefert).
+    """
+    limit = asyncio.Semaphore(concurrency)
+    timings = [None] * len(initial_states)
+
+    async def one(index: int, state: dict):
+        async with limit:
+            bind_run() # eigene Run-ID pro Task: Tracer/Sampler trennen die Einträge gleichzeitiger Runs
+            start = time.perf_counter()
+            print(f"[{get_ts()}] [ASYNC] Run {index + 1}/{len(initial_states)} gestartet")
+            try:
+                return await graph.ainvoke(state)
+            finally:
+                timings[index] = time.perf_counter() - start
+                print(f"[{get_ts()}] [ASYNC] Run {index + 1} fertig nach {timings[index]:.2f}s")
+
+    wall_start = time.perf_counter()
+    results = await asyncio.gather(*(one(i, s) for i, s in enumerate(initial_states)), return_exceptions=True)
+    wall = time.perf_counter() - wall_start
+    busy = sum(t for t in timings if t is not None)
+    # Überlappung > 1: Runs haben sich gegenseitig nicht blockiert (I/O, Laden, Export liefen parallel)
+    print(f"[{get_ts()}] [ASYNC] {len(initial_states)} Runs in {wall:.2f}s | Summe Einzelzeiten {busy:.2f}s | "
+          f"Überlappung x{busy / wall if wall else 0:.2f}")
+    return results
+
+# --- EXECUTION ---
+# Aufruf: python run_async.py <datei|ordner> [...] [--concurrency 2] [--workflow main|simple] [--repeat 1]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Viele Workflow-Instanzen gleichzeitig per asyncio ausführen.")
+    parser.add_argument("sources", nargs="*", help="Quelldateien oder Ordner (Standard: DEFAULT_PORTFOLIO)")
+    parser.add_argument("--pattern", default="*.txt", help="Dateimuster innerhalb von Ordnern")
+    parser.add_argument("--concurrency", type=int, default=2, help="Maximal gleichzeitig laufende Runs")
+    parser.add_argument("--workflow", choices=sorted(WORKFLOWS), default="main")
+    parser.add_argument("--repeat", type=int, default=1, help="Jede Quelle n-mal ausführen")
+    args = parser.parse_args()
+
+    from prompt_library import PortfolioPrompts
+
+    sources = []
+    for source in args.sources or [PortfolioPrompts.DEFAULT_PORTFOLIO]:
+        sources += sorted(glob.glob(os.path.join(source, args.pattern))) if os.path.isdir(source) else [source]
+    sources = sources * args.repeat
+
+    graph, nodes = importlib.import_module(WORKFLOWS[args.workflow]).build_workflow(use_async=True)
+    # Generierende Nodes teilen sich so viele Threads, wie Runs gleichzeitig laufen dürfen
+    nodes.executor = ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="node")
+
+    initial_states = [{"portfolio_items": source, "metrics": []} for source in sources]
+    final_states = asyncio.run(run_many(graph, initial_states, args.concurrency))
+
+    for source, final_state in zip(sources, final_states):
+        if isinstance(final_state, BaseException):
+            print(f"[{get_ts()}] [ASYNC] {os.path.basename(str(source))}: FEHLER {final_state!r}")
+        else:
+            report = final_state.get("report", "Fehler: Kein Bericht generiert.")
+            print(f"[{get_ts()}] [ASYNC] {os.path.basename(str(source))}: {len(report)} Zeichen Bericht")
@@ -0,0 +1,35 @@
+import os
+import glob
+import argparse
+from datetime import datetime
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+# --- EXECUTION ---
+# Aufruf: python run_batch.py <ordner> [--pattern "*.txt"] [--max-batch 16]
+# Jede Datei im Ordner wird ein eigener Run; die Nodes generieren gebündelt (Batch-Modus).
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analysiert einen ganzen Ordner von Quellen im Batch-Modus.")
+    parser.add_argument("folder", help="Ordner mit den Quelldokumenten")
+    parser.add_argument("--pattern", default="*.txt", help="Dateimuster innerhalb des Ordners")
+    parser.add_argument("--max-batch", type=int, default=16, help="Obergrenze der Micro-Batch-Größe")
+    args = parser.parse_args()
+
+    sources = sorted(glob.glob(os.path.join(args.folder, args.pattern)))
+    if not sources:
+        raise SystemExit(f"Keine Dateien für '{args.pattern}' in {args.folder} gefunden.")
+
+    from run_workflow import build_workflow
+    from run_queue import ModelAffinityQueue
+
+    graph, nodes = build_workflow()
+    nodes.max_batch_size = args.max_batch
+    print(f"[{get_ts()}] [BATCH] {len(sources)} Dokumente aus {args.folder}")
+
+    initial_states = [{"portfolio_items": source, "metrics": []} for source in sources]
+    final_states = ModelAffinityQueue(graph, nodes).run(initial_states, batched=True)
+
+    for source, final_state in zip(sources, final_states):
+        report = final_state.get("report", "Fehler: Kein Bericht generiert.")
+        print(f"[{get_ts()}] [BATCH] {os.path.basename(source)}: {len(report)} Zeichen Bericht")
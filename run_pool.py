@@ -0,0 +1,175 @@
+import os
+import json
+import glob
+import time
+import argparse
+import importlib
+import multiprocessing as mp
+from datetime import datetime
+import psutil
+from tracing import bind_run
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+WORKFLOWS = {"main": "run_workflow", "simple": "04_simple"}
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+# --- WORKER (eigener Prozess, eigener LocalModelManager) ---
+_worker = {}
+
+def _available_cpus() -> list:
+    try:
+        return sorted(psutil.Process().cpu_affinity())
+    except AttributeError: # macOS kennt keine CPU-Affinität
+        return list(range(os.cpu_count() or 1))
+
+def _init_worker(workflow: str, threads: int, pin: bool, use_cache: bool, slot_counter):
+    with slot_counter.get_lock():
+        slot = slot_counter.value
+        slot_counter.value += 1
+
+    # Threads festlegen, bevor torch (lazy) zum ersten Mal geladen wird
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    cpus = None
+    if pin:
+        available = _available_cpus()
+        start = (slot * threads) % len(available)
+        cpus = [available[(start + i) % len(available)] for i in range(threads)]
+        try:
+            psutil.Process().cpu_affinity(cpus)
+        except (AttributeError, OSError) as e:
+            print(f"[{get_ts()}] [POOL] Worker {slot}: CPU-Affinität nicht gesetzt ({e})")
+            cpus = None
+
+    import torch
+    torch.set_num_threads(threads)
+
+    graph, nodes = importlib.import_module(WORKFLOWS[workflow]).build_workflow()
+    # Export übernimmt der Elternprozess gesammelt (eine WorkflowInterface); Traces schreibt der Worker selbst.
+    # Spans und Denkprozesse sammelt der Reporter dafür pro Run-ID
+    nodes.interface = None
+    nodes.unsaved_exports = {}
+    if not use_cache:
+        nodes.response_cache = None
+    _worker.update(graph=graph, nodes=nodes, slot=slot, cpus=cpus)
+    print(f"[{get_ts()}] [POOL] Worker {slot} (PID {os.getpid()}) bereit | {threads} Threads | CPUs {cpus or 'frei'}")
+
+def _run_job(job: tuple) -> tuple:
+    index, state = job
+    start = time.perf_counter()
+    run_id = bind_run() # gleiche ID für Trace-Dateien (Worker) und performance.db (Elternprozess)
+    final_state = _worker["graph"].invoke(state)
+    export = _worker["nodes"].unsaved_exports.pop(run_id, {})
+    return index, dict(final_state), time.perf_counter() - start, _worker["slot"], run_id, export
+
+# --- ELTERNPROZESS ---
+class ProcessPoolRunner:
+    """
+    Verteilt viele Workflow-Runs auf mehrere Prozesse. Jeder Worker baut seinen eigenen Graphen
+    (eigener LocalModelManager, eigene Modelle im RAM), bekommt eine feste Zahl Threads und optional
+    einen eigenen Satz CPU-Kerne. Die End-States kommen zurück und werden hier gesammelt exportiert.
+    """
+
+    def __init__(self, workflow: str = "main", workers: int = 2, threads_per_worker: int = None,
+                 pin: bool = True, use_cache: bool = True, interface=None):
+        self.workflow = workflow
+        self.workers = workers
+        self.threads = threads_per_worker or max(1, len(_available_cpus()) // workers)
+        self.pin = pin
+        self.use_cache = use_cache
+        self.interface = interface
+
+    def run(self, initial_states: list) -> tuple:
+        """Liefert (End-States in Eingabereihenfolge, Kennzahlen des Durchlaufs)."""
+        ctx = mp.get_context("spawn") # kein fork: torch/Threads im Elternprozess sollen nicht mitkopiert werden
+        slot_counter = ctx.Value("i", 0)
+        results = [None] * len(initial_states)
+        job_times = []
+        print(f"[{get_ts()}] [POOL] {len(initial_states)} Runs auf {self.workers} Worker x {self.threads} Threads")
+
+        wall_start = time.perf_counter()
+        first_done = None
+        with ctx.Pool(self.workers, initializer=_init_worker,
+                      initargs=(self.workflow, self.threads, self.pin, self.use_cache, slot_counter)) as pool:
+            for index, final_state, job_sec, slot, run_id, export in pool.imap_unordered(
+                    _run_job, enumerate(initial_states)):
+                first_done = first_done or time.perf_counter()
+                results[index] = final_state
+                job_times.append(job_sec)
+                print(f"[{get_ts()}] [POOL] Run {index + 1}/{len(initial_states)} fertig (Worker {slot}, {job_sec:.2f}s)")
+                if self.interface is not None:
+                    self.interface.save_all(final_state, spans=export.get("spans"), run_uid=run_id,
+                                            report=final_state.get("report"), reasoning=export.get("reasoning"))
+        wall = time.perf_counter() - wall_start
+
+        summary = {
+            "workers": self.workers,
+            "threads_per_worker": self.threads,
+            "runs": len(initial_states),
+            "wall_sec": round(wall, 2),
+            "runs_per_min": round(len(initial_states) / wall * 60, 2),
+            "job_avg_sec": round(sum(job_times) / len(job_times), 2) if job_times else None,
+            "first_result_sec": round(first_done - wall_start, 2) if first_done else None, # inkl. Start + Laden
+        }
+        if self.interface is not None:
+            self.interface.flush()
+        return results, summary
+
+def scaling_report(summaries: list) -> list:
+    """Speedup und Effizienz relativ zum Lauf mit den wenigsten Workern."""
+    base = min(summaries, key=lambda s: s["workers"])
+    print(f"\n{'Worker':>6} {'Threads':>7} {'Wall s':>8} {'Runs/min':>9} {'Speedup':>8} {'Effizienz':>9}")
+    for s in sorted(summaries, key=lambda s: s["workers"]):
+        s["speedup"] = round(s["runs_per_min"] / base["runs_per_min"], 2)
+        s["efficiency"] = round(s["speedup"] / (s["workers"] / base["workers"]), 2)
+        print(f"{s['workers']:>6} {s['threads_per_worker']:>7} {s['wall_sec']:>8.2f} {s['runs_per_min']:>9.2f} "
+              f"{s['speedup']:>7.2f}x {s['efficiency']:>8.0%}")
+    return summaries
+
+# --- EXECUTION ---
+# Aufruf: python run_pool.py [quellen...] [--workers 4] [--threads 2] [--repeat 8] [--scaling 1,2,4]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Viele Workflow-Runs parallel in mehreren Prozessen ausführen.")
+    parser.add_argument("sources", nargs="*", help="Quelldateien oder Ordner (Standard: DEFAULT_PORTFOLIO)")
+    parser.add_argument("--pattern", default="*.txt", help="Dateimuster innerhalb von Ordnern")
+    parser.add_argument("--workflow", choices=sorted(WORKFLOWS), default="main")
+    parser.add_argument("--workers", type=int, default=2, help="Anzahl Worker-Prozesse")
+    parser.add_argument("--threads", type=int, help="Threads pro Worker (Standard: Kerne / Worker)")
+    parser.add_argument("--repeat", type=int, default=1, help="Jede Quelle n-mal ausführen")
+    parser.add_argument("--no-pin", action="store_true", help="Keine CPU-Affinität setzen")
+    parser.add_argument("--no-cache", action="store_true", help="Antwort-Cache in den Workern abschalten")
+    parser.add_argument("--scaling", help="Kommagetrennte Worker-Zahlen, z.B. 1,2,4 (ohne Export, nur Messung)")
+    args = parser.parse_args()
+
+    from prompt_library import PortfolioPrompts
+
+    sources = []
+    for source in args.sources or [PortfolioPrompts.DEFAULT_PORTFOLIO]:
+        sources += sorted(glob.glob(os.path.join(source, args.pattern))) if os.path.isdir(source) else [source]
+    initial_states = [{"portfolio_items": source, "metrics": []} for source in sources * args.repeat]
+
+    if args.scaling:
+        summaries = []
+        for workers in (int(w) for w in args.scaling.split(",")):
+            runner = ProcessPoolRunner(args.workflow, workers, args.threads, pin=not args.no_pin,
+                                       use_cache=not args.no_cache)
+            summaries.append(runner.run(initial_states)[1])
+        scaling_report(summaries)
+        out_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dAbA", "pool_scaling.jsonl")
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        with open(out_path, "a", encoding="utf-8") as f:
+            stamp = datetime.now().isoformat(timespec="seconds")
+            for s in summaries:
+                f.write(json.dumps({"timestamp": stamp, "cpus": len(_available_cpus()), **s}) + "\n")
+        print(f"[{get_ts()}] [POOL] Skalierung -> {out_path}")
+    else:
+        from workflow_interface import WorkflowInterface
+
+        interface = WorkflowInterface()
+        interface.enable_write_behind()
+        runner = ProcessPoolRunner(args.workflow, args.workers, args.threads, pin=not args.no_pin,
+                                   use_cache=not args.no_cache, interface=interface)
+        final_states, summary = runner.run(initial_states)
+        print(f"[{get_ts()}] [POOL] {summary}")
@@ -0,0 +1,165 @@
+import sys
+import time
+from datetime import datetime
+from langgraph.graph import START, END
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+class ModelAffinityQueue:
+    """
+    Führt viele Workflow-Runs Stufe für Stufe aus statt Run für Run:
+    Modell laden -> dieselbe Node für alle N States ausführen -> nächstes Modell.
+    Die Stufen entsprechen den Supersteps von LangGraph (Fan-in wartet auf alle Vorgänger),
+    Reducer aus dem State-Schema (z.B. operator.add für metrics) werden wie bei invoke angewendet.
+    """
+
+    def __init__(self, graph, nodes):
+        self.graph = graph
+        self.node_models = nodes.NODE_MODELS
+        self.last_report = {}
+
+        drawable = graph.get_graph()
+        self.funcs = {}
+        self.successors = {node_id: [] for node_id in drawable.nodes}
+        for node_id, node in drawable.nodes.items():
+            if node_id not in (START, END):
+                self.funcs[node_id] = node.data.func
+        for edge in drawable.edges:
+            if edge.conditional:
+                raise ValueError(f"Bedingte Kante {edge.source} -> {edge.target} wird von der Queue nicht unterstützt")
+            self.successors[edge.source].append(edge.target)
+
+        # Reducer je State-Key (BinaryOperatorAggregate), "__root__" bei Annotated[dict, operator.ior]
+        self.reducers = {}
+        self.known_keys = set()
+        for key, channel in graph.channels.items():
+            if (key.startswith("__") and key != "__root__") or key.startswith("branch:"):
+                continue
+            self.known_keys.add(key)
+            if hasattr(channel, "operator"):
+                self.reducers[key] = channel.operator
+
+    def _model_of(self, node_id: str):
+        return self.node_models.get(getattr(self.funcs[node_id], "__name__", node_id))
+
+    def supersteps(self) -> list:
+        """Stufen wie bei LangGraph: Nachfolger aller Nodes einer Stufe bilden die nächste Stufe."""
+        steps = []
+        current = [t for t in self.successors[START] if t != END]
+        while current:
+            steps.append(current)
+            following = []
+            for node_id in current:
+                for target in self.successors[node_id]:
+                    if target != END and target not in following:
+                        following.append(target)
+            current = following
+            if len(steps) > len(self.funcs) * 4:
+                raise ValueError("Graph enthält einen Zyklus - Queue unterstützt nur DAGs")
+        return steps
+
+    def _order_by_affinity(self, step: list, loaded_model):
+        """Innerhalb einer Stufe zuerst die Node mit dem bereits geladenen Modell, dann gruppiert."""
+        ordered = []
+        remaining = list(step)
+        while remaining:
+            match = next((n for n in remaining if self._model_of(n) == loaded_model), None)
+            node_id = match or remaining[0]
+            ordered.append(node_id)
+            remaining.remove(node_id)
+            loaded_model = self._model_of(node_id) or loaded_model
+        return ordered
+
+    def _apply(self, state: dict, update: dict) -> dict:
+        if "__root__" in self.reducers:
+            return self.reducers["__root__"](dict(state), update)
+        new_state = dict(state)
+        for key, value in update.items():
+            if key not in self.known_keys:
+                continue # LangGraph verwirft Keys außerhalb des Schemas ebenso
+            if key in self.reducers and key in new_state:
+                new_state[key] = self.reducers[key](new_state[key], value)
+            else:
+                new_state[key] = value
+        return new_state
+
+    @staticmethod
+    def _count_swaps(models: list) -> int:
+        swaps, loaded = 0, None
+        for model_name in models:
+            if model_name and model_name != loaded:
+                swaps += 1
+                loaded = model_name
+        return swaps
+
+    def run(self, initial_states: list, batched: bool = False) -> list:
+        """batched=True: Nodes mit Batch-Unterstützung bekommen alle States einer Stufe als Liste."""
+        steps = self.supersteps()
+        states = [self._apply({}, dict(s)) for s in initial_states]
+        n_runs = len(states)
+        print(f"[{get_ts()}] [QUEUE] START: {n_runs} Runs in {len(steps)} Stufen")
+        start_total = time.time()
+
+        # Naiv: jeder Run läuft den Graphen komplett durch, das Modell wechselt pro Node
+        naive_order = []
+        loaded = None
+        for step in steps:
+            for node_id in self._order_by_affinity(step, loaded):
+                naive_order.append(self._model_of(node_id))
+                loaded = self._model_of(node_id) or loaded
+        naive_swaps = self._count_swaps(naive_order * n_runs)
+
+        queued_order = []
+        loaded = None
+        for step_index, step in enumerate(steps):
+            updates = [[] for _ in range(n_runs)]
+            for node_id in self._order_by_affinity(step, loaded):
+                model_name = self._model_of(node_id)
+                queued_order.append(model_name)
+                loaded = model_name or loaded
+                print(f"[{get_ts()}] [QUEUE] Stufe {step_index + 1}: {node_id} ({model_name or 'ohne Modell'}) x {n_runs}")
+                func = self.funcs[node_id]
+                # Alle Nodes einer Stufe sehen denselben Eingangs-State (wie ein Superstep)
+                if batched and getattr(func, "supports_batch", False):
+                    results = func(states)
+                else:
+                    results = [func(state) for state in states]
+                for run_index, update in enumerate(results):
+                    if update:
+                        updates[run_index].append(update)
+            for run_index in range(n_runs):
+                for update in updates[run_index]:
+                    states[run_index] = self._apply(states[run_index], update)
+
+        queued_swaps = self._count_swaps(queued_order)
+        duration = time.time() - start_total
+        self.last_report = {
+            "runs": n_runs,
+            "duration_sec": round(duration, 2),
+            "naive_swaps": naive_swaps,
+            "queued_swaps": queued_swaps,
+            "swaps_saved": naive_swaps - queued_swaps,
+        }
+        print(f"[{get_ts()}] [QUEUE] FERTIG in {duration:.2f}s | Modellwechsel: naiv {naive_swaps} -> "
+              f"Queue {queued_swaps} (gespart: {naive_swaps - queued_swaps})")
+        return states
+
+# --- EXECUTION ---
+# Aufruf: python run_queue.py quelle1.txt quelle2.txt ...
+if __name__ == "__main__":
+    from run_workflow import build_workflow
+    from prompt_library import PortfolioPrompts
+
+    graph, nodes = build_workflow()
+    sources = sys.argv[1:] or [PortfolioPrompts.DEFAULT_PORTFOLIO]
+    initial_states = [{"portfolio_items": source, "metrics": []} for source in sources]
+
+    queue = ModelAffinityQueue(graph, nodes)
+    final_states = queue.run(initial_states)
+
+    for source, final_state in zip(sources, final_states):
+        print("\n" + "="*50)
+        print(f" RUN: {source}")
+        print("="*50)
+        print(final_state.get("report", "Fehler: Kein Bericht generiert."))
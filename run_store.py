@@ -0,0 +1,305 @@
+import os
+import json
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_uid       TEXT UNIQUE,
+    started_at    TEXT,               -- ISO-Zeitstempel (Altbestand: Originalwert)
+    summary       TEXT,
+    total_sec     REAL,
+    node_count    INTEGER,
+    legacy_source TEXT,               -- NULL oder 'history' / 'workflow_results.runs'
+    legacy_id     INTEGER,
+    UNIQUE (legacy_source, legacy_id)
+);
+CREATE TABLE IF NOT EXISTS node_steps (
+    id               INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id           INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    seq              INTEGER NOT NULL,
+    model            TEXT NOT NULL,
+    duration_sec     REAL,
+    generated_tokens INTEGER,
+    prompt_tokens    INTEGER,
+    speed_tps        REAL,
+    ttft_sec         REAL,
+    decode_tps       REAL,
+    vram_mb          REAL,
+    rss_peak_mb      REAL,
+    cpu_avg_pct      REAL,
+    extra            TEXT                -- restliche Metriken als JSON
+);
+CREATE TABLE IF NOT EXISTS spans (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id    INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    span_id   INTEGER,
+    parent_id INTEGER,
+    name      TEXT NOT NULL,
+    start_ms  REAL,
+    dur_ms    REAL,
+    tid       INTEGER,
+    attrs     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started_at ON runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_node_steps_model_run ON node_steps(model, run_id);
+CREATE INDEX IF NOT EXISTS idx_node_steps_run ON node_steps(run_id);
+CREATE INDEX IF NOT EXISTS idx_spans_run_name ON spans(run_id, name);
+"""
+
+# Spalten von node_steps, die direkt aus den log_step-Metriken kommen (alles andere -> extra)
+STEP_COLUMNS = {
+    "duration_sec": "duration_sec",
+    "tokens": "generated_tokens",
+    "prompt_tokens": "prompt_tokens",
+    "speed_tps": "speed_tps",
+    "ttft_sec": "ttft_sec",
+    "decode_tps": "decode_tps",
+    "vram_mb": "vram_mb",
+    "rss_peak_mb": "rss_peak_mb",
+    "cpu_avg_pct": "cpu_avg_pct",
+}
+# Für Aggregationen freigegebene Kennzahlen (werden in SQL eingesetzt -> Whitelist)
+QUERY_METRICS = set(STEP_COLUMNS.values())
+PERCENTILES = (50, 90, 95, 99)
+
+class RunStore:
+    """
+    Normalisierte Ablage der Run-Historie: runs -> node_steps / spans.
+    WAL-Modus (Lesen während geschrieben wird), ein kleiner Pool langlebiger Verbindungen und
+    ein Insert pro Run in einer Transaktion (executemany). Aggregate und Perzentile rechnet SQLite.
+    """
+
+    def __init__(self, db_path: str, pool_size: int = 4):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.pool = queue.LifoQueue(maxsize=pool_size)
+        self.pool_size = pool_size
+        self.created = 0
+        self.lock = threading.Lock()
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL") # im WAL-Modus sicher genug, deutlich schneller
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Verbindung aus dem Pool; commit bei Erfolg, rollback bei Fehler."""
+        try:
+            conn = self.pool.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                can_create = self.created < self.pool_size
+                if can_create:
+                    self.created += 1
+            conn = self._connect() if can_create else self.pool.get()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                break
+        self.created = 0
+
+    # ------------------------------------------------------------------ Schreiben
+    @staticmethod
+    def _step_row(seq: int, metrics: dict) -> tuple:
+        extra = {k: v for k, v in metrics.items() if k not in STEP_COLUMNS and k != "model"}
+        values = [metrics.get(key) for key in STEP_COLUMNS]
+        return (seq, metrics.get("model", "?"), *values, json.dumps(extra, default=str) if extra else None)
+
+    def record_run(self, metrics: list, summary: str = None, run_uid: str = None, spans: list = None,
+                   started_at: str = None, legacy: tuple = (None, None)) -> int:
+        """Speichert einen Run samt Node-Schritten und Spans in einer Transaktion; liefert runs.id."""
+        with self.connection() as conn:
+            return self._insert_run(conn, metrics, summary, run_uid, spans, started_at, legacy)
+
+    def record_runs(self, runs: list) -> list:
+        """Mehrere Runs (dicts mit den Argumenten von record_run) in einer gemeinsamen Transaktion."""
+        with self.connection() as conn:
+            return [self._insert_run(conn, **run) for run in runs]
+
+    def _insert_run(self, conn, metrics: list, summary: str = None, run_uid: str = None, spans: list = None,
+                    started_at: str = None, legacy: tuple = (None, None)) -> int:
+        started_at = started_at or datetime.now().isoformat(timespec="milliseconds")
+        total = sum(m.get("duration_sec") or 0 for m in metrics)
+        step_columns = ", ".join(STEP_COLUMNS.values())
+        placeholders = ", ".join("?" for _ in STEP_COLUMNS)
+        cursor = conn.execute(
+            "INSERT INTO runs (run_uid, started_at, summary, total_sec, node_count, legacy_source, legacy_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (run_uid, started_at, summary, round(total, 3), len(metrics), *legacy))
+        run_id = cursor.lastrowid
+        conn.executemany(
+            f"INSERT INTO node_steps (run_id, seq, model, {step_columns}, extra) "
+            f"VALUES (?, ?, ?, {placeholders}, ?)",
+            [(run_id, *self._step_row(seq, m)) for seq, m in enumerate(metrics)])
+        if spans:
+            conn.executemany(
+                "INSERT INTO spans (run_id, span_id, parent_id, name, start_ms, dur_ms, tid, attrs) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, s.get("id"), s.get("parent"), s["name"], s.get("start_ms"), s.get("dur_ms"),
+                  s.get("tid"), json.dumps(s.get("attrs") or {}, default=str)) for s in spans])
+        return run_id
+
+    # ------------------------------------------------------------------ Abfragen
+    def recent_runs(self, limit: int = 10) -> list:
+        with self.connection() as conn:
+            runs = conn.execute("SELECT id, started_at, summary, total_sec FROM runs ORDER BY id DESC LIMIT ?",
+                                (limit,)).fetchall()
+            result = []
+            for run_id, started_at, summary, total_sec in runs:
+                steps = conn.execute(
+                    f"SELECT model, {', '.join(STEP_COLUMNS.values())}, extra FROM node_steps "
+                    "WHERE run_id = ? ORDER BY seq", (run_id,)).fetchall()
+                metrics = []
+                for row in steps:
+                    step = {"model": row[0], **json.loads(row[-1] or "{}")}
+                    for key, value in zip(STEP_COLUMNS, row[1:-1]):
+                        if value is not None:
+                            step[key] = value
+                    metrics.append(step)
+                result.append({"id": run_id, "timestamp": started_at, "summary": summary,
+                               "total_sec": total_sec, "metrics": metrics})
+        return result
+
+    def metric_stats(self, metric: str, model: str = None, last_runs: int = None, since: str = None,
+                     group_by_model: bool = False) -> list:
+        """
+        Anzahl, Mittel, Min/Max und Perzentile (nächster Rang) einer Kennzahl, komplett in SQL.
+        Beispiel: metric_stats("decode_tps", model="rd211/Qwen3-1.7B-Instruct", last_runs=500)
+        """
+        if metric not in QUERY_METRICS:
+            raise ValueError(f"Unbekannte Kennzahl '{metric}' (erlaubt: {', '.join(sorted(QUERY_METRICS))})")
+
+        filters, params = [f"s.{metric} IS NOT NULL"], []
+        if model is not None:
+            filters.append("s.model = ?")
+            params.append(model)
+        if since is not None:
+            filters.append("r.started_at >= ?")
+            params.append(since)
+        recent = "SELECT id FROM runs ORDER BY id DESC" + (" LIMIT ?" if last_runs else "")
+        partition = "PARTITION BY model" if group_by_model else ""
+        # Perzentil p: Wert mit Rang ceil(n * p / 100), per Ganzzahl-Arithmetik ohne ceil()
+        percentile_columns = ", ".join(
+            f"MAX(CASE WHEN rn = MAX(1, (n * {p} + 99) / 100) THEN v END) AS p{p}" for p in PERCENTILES)
+        sql = f"""
+            WITH recent AS ({recent}),
+            vals AS (
+                SELECT s.model AS model, s.{metric} AS v
+                FROM node_steps s JOIN runs r ON r.id = s.run_id
+                WHERE s.run_id IN (SELECT id FROM recent) AND {' AND '.join(filters)}
+            ),
+            ranked AS (
+                SELECT model, v,
+                       ROW_NUMBER() OVER ({partition} ORDER BY v) AS rn,
+                       COUNT(*) OVER ({partition}) AS n
+                FROM vals
+            )
+            SELECT {'model' if group_by_model else 'NULL'} AS model, COUNT(*) AS count, AVG(v) AS avg,
+                   MIN(v) AS min, MAX(v) AS max, {percentile_columns}
+            FROM ranked
+            {'GROUP BY model ORDER BY model' if group_by_model else ''}
+        """
+        query_params = ([last_runs] if last_runs else []) + params
+        with self.connection() as conn:
+            cursor = conn.execute(sql, query_params)
+            columns = [c[0] for c in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        return [row for row in rows if row["count"]]
+
+    def span_stats(self, last_runs: int = 50) -> list:
+        """Dauer pro Span-Name (Anzahl, Summe, Mittel, Max) über die letzten Runs."""
+        with self.connection() as conn:
+            cursor = conn.execute("""
+                SELECT name, COUNT(*) AS count, SUM(dur_ms) AS total_ms, AVG(dur_ms) AS avg_ms, MAX(dur_ms) AS max_ms
+                FROM spans WHERE run_id IN (SELECT id FROM runs ORDER BY id DESC LIMIT ?)
+                GROUP BY name ORDER BY total_ms DESC""", (last_runs,))
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def speculative_stats(self, model: str = None, last_runs: int = 500) -> list:
+        """
+        Speculative Decoding pro (Zielmodell, Draft): Ø Decode-Rate, Annahmequote und Tokens pro Schritt.
+        draft = None ist die Basis ohne Draft; speedup = Decode-Rate mit Draft / Basis desselben Modells.
+        """
+        filters, params = ["s.decode_tps IS NOT NULL"], [last_runs]
+        if model is not None:
+            filters.append("s.model = ?")
+            params.append(model)
+        with self.connection() as conn:
+            cursor = conn.execute(f"""
+                SELECT s.model AS model, json_extract(s.extra, '$.spec_draft') AS draft, COUNT(*) AS count,
+                       AVG(s.decode_tps) AS decode_tps,
+                       AVG(json_extract(s.extra, '$.spec_accept_rate')) AS accept_rate,
+                       AVG(json_extract(s.extra, '$.spec_tokens_per_step')) AS tokens_per_step
+                FROM node_steps s
+                WHERE s.run_id IN (SELECT id FROM runs ORDER BY id DESC LIMIT ?) AND {' AND '.join(filters)}
+                GROUP BY s.model, draft ORDER BY s.model, draft IS NOT NULL, draft""", params)
+            columns = [c[0] for c in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        baselines = {r["model"]: r["decode_tps"] for r in rows if r["draft"] is None}
+        for row in rows:
+            base = baselines.get(row["model"])
+            row["speedup"] = row["decode_tps"] / base if row["draft"] is not None and base else None
+        return rows
+
+    # ------------------------------------------------------------------ Migration
+    def migrate_legacy(self, history_db: str = None, results_db: str = None) -> dict:
+        """
+        Übernimmt Altbestände: Tabelle history (JSON-Blob pro Run) und workflow_results.db/runs.
+        Bereits übernommene Zeilen werden übersprungen (legacy_source + legacy_id).
+        Die alten 'tokens' enthielten den Prompt -> landen nur in extra, nicht in generated_tokens/speed_tps.
+        """
+        imported = {}
+        sources = [("history", history_db, "SELECT id, timestamp, metrics, summary FROM history"),
+                   ("workflow_results.runs", results_db, "SELECT id, timestamp, metrics, results FROM runs")]
+        for label, path, sql in sources:
+            if not path or not os.path.exists(path):
+                continue
+            with sqlite3.connect(path) as source:
+                try:
+                    rows = source.execute(sql).fetchall()
+                except sqlite3.OperationalError:
+                    continue # Tabelle existiert dort nicht
+            with self.connection() as conn:
+                known = {row[0] for row in conn.execute("SELECT legacy_id FROM runs WHERE legacy_source = ?", (label,))}
+            count = 0
+            for legacy_id, timestamp, metrics_json, summary in rows:
+                if legacy_id in known:
+                    continue
+                metrics = json.loads(metrics_json or "[]")
+                if isinstance(metrics, dict):
+                    metrics = [metrics]
+                for m in metrics:
+                    m["tokens_legacy"] = m.pop("tokens", None)
+                    m["speed_tps_legacy"] = m.pop("speed_tps", None)
+                    m["vram_legacy"] = m.pop("vram_mb", None) # war in GB gespeichert
+                self.record_run(metrics, summary=summary if isinstance(summary, str) else json.dumps(summary),
+                                started_at=timestamp, legacy=(label, legacy_id))
+                count += 1
+            imported[label] = count
+            print(f"[{get_ts()}] [DB] Migration {label}: {count} Runs übernommen ({len(rows) - count} schon vorhanden)")
+        return imported
@@ -1,76 +1,81 @@
 from langgraph.graph import StateGraph, START, END
-from typing import TypedDict, List, Dict, Any, Annotated
-import operator
+import functools
 
 # Deine Module importieren
 from nodes import SpecializedNodes
-from model_manager import LocalModelManager
+from model_manager import create_manager
 from workflow_logger import WorkflowLogger
 from workflow_interface import WorkflowInterface
 from prompt_library import PortfolioPrompts
+from state_schema import WorkflowState
 
 # --- 1. STATE DEFINITION ---
-class PortfolioState(TypedDict):
-    portfolio_items: Any # Kann Text oder Pfad sein
-    # Die Keys MÜSSEN exakt so heißen wie die Modell-IDs im Logger/Decorator
-    # damit die Daten dort landen.
-    llama_out: str 
-    qwen_out: str
-    deepseek_out: str
-    gemma_out: str
-    metrics: Annotated[List[Dict[str, Any]], operator.add]
-    report: str
-    report_complete: bool
+# 🔵 NEU: Gemeinsames Schema (state_schema.py): Ergebnisse unter "results" (Modell -> NodeResult),
+# Metriken werden angehängt. Nodes liefern nur ihr Delta, kein kopierter Gesamt-State.
 
 # --- 2. INITIALISIERUNG ---
-manager = LocalModelManager("modelle.json")
-logger = WorkflowLogger()
-interface = WorkflowInterface()
-nodes = SpecializedNodes(manager, logger, interface)
-
-# --- 3. GRAPH AUFBAU (Fan-out / Fan-in) ---
-workflow = StateGraph(PortfolioState)
-
-# # Nodes hinzufügen
-# #workflow.add_node("qwen_node", nodes.qwen_3_1_7b_node)
-# workflow.add_node("deepseek_node", nodes.deepseek_r1_1_5b_node)
-# workflow.add_node("mistral_node", nodes.mistral_7b_node)
-# workflow.add_node("reporter", nodes.reporter_node)
-# workflow.add_node("llama_node", nodes.llama_3_2_3_b_node)
-# # --- DER FLOW (Edges) ---
-# workflow.add_edge(START, "mistral_node")
-# workflow.add_edge("mistral_node", "deepseek_node")
-# workflow.add_edge("deepseek_node", "llama_node")
-# workflow.add_edge("llama_node", "reporter")
-# workflow.add_edge("reporter", END)
-
-
-
-workflow.add_node("test_node", nodes.llama_1b_test_node)
-workflow.add_node("reporter", nodes.reporter_node)
-
-# Einfacher Flow
-workflow.add_edge(START, "test_node")
-workflow.add_edge("test_node", "reporter")
-workflow.add_edge("reporter", END)
-
-
-
-
-# # Parallelstart (Fan-out)
-# workflow.add_edge(START, "llama323B")
-# workflow.add_edge(START, "qwen317B")
-
-# # Zusammenführung (Fan-in): DeepSeek wartet auf BEIDE
-# workflow.add_edge("llama323B", "deepseekr17B")
-# workflow.add_edge("qwen317B", "deepseekr17B")
-
-# # Finale Kette
-# workflow.add_edge("deepseekr17B", "gemma2B")
-# workflow.add_edge("gemma2B", "reporter")
-# workflow.add_edge("reporter", END)
-
-graph = workflow.compile()
+# 🔵 NEU: Manager, Nodes und Graph werden erst beim ersten Aufruf gebaut, nicht schon beim Import
+# (schneller Start für 'workflow_cli.py graph/history'; torch/transformers laden erst beim Generieren)
+# use_async=True: Async-Nodes für graph.ainvoke() (siehe run_async.py)
+@functools.lru_cache(maxsize=None)
+def build_workflow(use_async: bool = False):
+    manager = create_manager("modelle.json") # 🔵 NEU: lokal oder über den Inferenz-Daemon
+    manager.enable_weight_cache() # 🔵 NEU: Konvertierte/quantisierte Gewichte wiederverwenden (model_cache/converted)
+    logger = WorkflowLogger()
+    interface = WorkflowInterface()
+    nodes = SpecializedNodes(manager, logger, interface)
+
+    # --- 3. GRAPH AUFBAU (Fan-out / Fan-in) ---
+    workflow = StateGraph(WorkflowState)
+
+    # # Nodes hinzufügen
+    # #workflow.add_node("qwen_node", nodes.qwen_3_1_7b_node)
+    # workflow.add_node("deepseek_node", nodes.deepseek_r1_1_5b_node)
+    # workflow.add_node("mistral_node", nodes.mistral_7b_node)
+    # workflow.add_node("reporter", nodes.reporter_node)
+    # workflow.add_node("llama_node", nodes.llama_3_2_3_b_node)
+    # # --- DER FLOW (Edges) ---
+    # workflow.add_edge(START, "mistral_node")
+    # workflow.add_edge("mistral_node", "deepseek_node")
+    # workflow.add_edge("deepseek_node", "llama_node")
+    # workflow.add_edge("llama_node", "reporter")
+    # workflow.add_edge("reporter", END)
+
+
+
+    workflow.add_node("test_node", nodes.allama_1b_test_node if use_async else nodes.llama_1b_test_node)
+    workflow.add_node("reporter", nodes.areporter_node if use_async else nodes.reporter_node)
+
+    # Einfacher Flow
+    workflow.add_edge(START, "test_node")
+    workflow.add_edge("test_node", "reporter")
+    workflow.add_edge("reporter", END)
+
+
+
+
+    # # Parallelstart (Fan-out)
+    # workflow.add_edge(START, "llama323B")
+    # workflow.add_edge(START, "qwen317B")
+
+    # # Zusammenführung (Fan-in): DeepSeek wartet auf BEIDE
+    # workflow.add_edge("llama323B", "deepseekr17B")
+    # workflow.add_edge("qwen317B", "deepseekr17B")
+
+    # # Finale Kette
+    # workflow.add_edge("deepseekr17B", "gemma2B")
+    # workflow.add_edge("gemma2B", "reporter")
+    # workflow.add_edge("reporter", END)
+
+    graph = workflow.compile()
+    nodes.enable_prefetch(graph) # 🔵 NEU: Nächstes Modell im Hintergrund laden
+    nodes.enable_prefix_cache() # 🔵 NEU: KV-Cache für System-Prompt + Quelle wiederverwenden
+    nodes.enable_response_cache() # 🔵 NEU: Unveränderte Nodes nicht erneut rechnen (nur mit Seed/Greedy)
+    nodes.generation_seed = 42 # Fester Seed -> Sampling reproduzierbar; für neue Samples: bypass=True
+    nodes.enable_tracing() # 🔵 NEU: Spans pro Phase -> dAbA/traces (JSONL + Chrome-Trace)
+    nodes.enable_resource_sampler() # 🔵 NEU: RSS/CPU/Gerätespeicher pro Node (Peak + Ø)
+    interface.enable_write_behind() # 🔵 NEU: Tagebuch/DB/Bericht im Hintergrund schreiben, Reporter blockiert nicht
+    return graph, nodes
 
 # --- 4. EXECUTION ---
 if __name__ == "__main__":
@@ -80,6 +85,8 @@ if __name__ == "__main__":
         "metrics": []
     }
 
+    graph, nodes = build_workflow()
+
     print(f"\n Starte parallelen Workflow...")
     print(graph.get_graph().draw_ascii()) # Zeigt dir die Struktur in der Konsole
     
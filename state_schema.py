@@ -0,0 +1,46 @@
+import operator
+from typing import TypedDict, Annotated, Any, Dict, List, get_type_hints
+from node_results import NodeResult
+
+# --- Gemeinsames State-Schema & Node-Protokoll ---
+# Nodes liefern nur ihr Delta: {"results": {Modell: NodeResult}, "metrics": [Metriken]}.
+# Die Reducer im Schema führen die Deltas zusammen - der State wird nie komplett kopiert.
+
+def merge_results(current: dict, update: dict) -> dict:
+    """Reducer für Node-Ergebnisse: Schlüssel = Modell, ein Update ersetzt nur seine eigenen Schlüssel."""
+    if not update:
+        return current if current is not None else {}
+    if not current:
+        return dict(update)
+    return {**current, **update}
+
+class WorkflowState(TypedDict, total=False):
+    portfolio_items: Any # Text oder Pfad zur Quelle
+    # 🔵 NEU: Ergebnisse pro Modell (Keyed), Fan-out-Nodes schreiben parallel ohne sich zu überschreiben
+    results: Annotated[Dict[str, NodeResult], merge_results]
+    metrics: Annotated[List[Dict[str, Any]], operator.add] # nur anhängen
+    report: str
+    report_complete: bool
+
+# Key -> Reducer aus dem Schema (für apply_delta außerhalb von LangGraph)
+REDUCERS = {key: hint.__metadata__[0] for key, hint in get_type_hints(WorkflowState, include_extras=True).items()
+            if hasattr(hint, "__metadata__")}
+
+def node_delta(model_key: str, result: dict, metrics: dict) -> dict:
+    """Rückgabe einer Modell-Node: nur das eigene Ergebnis und ein Metrik-Eintrag."""
+    return {"results": {model_key: result}, "metrics": [metrics]}
+
+def apply_delta(state: dict, delta: dict) -> dict:
+    """
+    Wendet ein Delta wie LangGraph an (Reducer aus WorkflowState, sonst überschreiben) - für Direktaufrufe
+    von Nodes ohne Graph, z.B. in Benchmarks. Der Eingangs-State bleibt unverändert.
+    """
+    new_state = dict(state)
+    for key, value in delta.items():
+        reducer = REDUCERS.get(key)
+        new_state[key] = reducer(new_state[key], value) if reducer and key in new_state else value
+    return new_state
+
+def result_of(state: dict, model_name: str):
+    """NodeResult eines Modells aus dem State (None, wenn die Node noch nicht gelaufen ist)."""
+    return (state.get("results") or {}).get(model_name)
@@ -0,0 +1,162 @@
+import re
+from lazy_imports import lazy_import
+
+torch = lazy_import("torch")
+
+# Satzende: . ! ? (ggf. mit Anführungszeichen/Klammer) gefolgt von Leerraum.
+# Nicht nach Ziffern ("1. ", "3.5") und nicht nach Einzelbuchstaben ("z.B. ", "S. 4").
+SENTENCE_END = re.compile(r"(?<!\d)(?<!\b\w)[.!?]+[\"'»“)\]]*\s")
+
+# Stopp-Gründe, die auf eine Regel aus config["stopping"] zurückgehen (nur dafür zählen gesparte Tokens)
+RULE_REASONS = ("stop_string", "json_complete", "max_sentences", "budget")
+
+class GenerationBudget:
+    """
+    Semantische Stopp-Kriterien einer Node aus config["stopping"], z.B.:
+      {"json": True, "budget": {"per_input_token": 1.5, "min": 96}}
+      {"after": "</think>", "max_sentences": 8, "stop_strings": ["\\n\\n\\n"]}
+    - stop_strings:  Stopp, sobald einer der Texte erscheint
+    - json:          Stopp, sobald das erste JSON-Objekt/-Array vollständig geschlossen ist
+    - max_sentences: Stopp nach n vollständigen Sätzen
+    - after:         Textregeln greifen erst nach diesem Marker (z.B. nach dem Denkteil)
+    - budget:        max_new_tokens = clamp(per_input_token * Eingabe-Tokens, min, max_new_tokens der Config);
+                     Eingabe = config["budget_input"] (Text der Vorgänger-Node), sonst der ganze Prompt
+    Wird als stopping_criteria an model.generate übergeben und nach jedem Schritt (auch mehreren Tokens
+    bei Assisted Generation) pro Zeile geprüft; dekodiert werden dabei nur die neuen Tokens.
+    """
+
+    def __init__(self, settings: dict, tokenizer, input_lengths: list, prompt_width: int, max_new_tokens: int):
+        self.settings = settings or {}
+        self.tokenizer = tokenizer
+        self.input_lengths = list(input_lengths)
+        self.prompt_width = prompt_width # ab dieser Position stehen die generierten Tokens (Links-Padding)
+        self.configured = max_new_tokens
+        budget = self.settings.get("budget")
+        if budget:
+            self.budgets = [min(max_new_tokens, max(budget.get("min", 0), int(budget["per_input_token"] * n)))
+                            for n in input_lengths]
+        else:
+            self.budgets = [max_new_tokens] * len(input_lengths)
+        self.stop_strings = list(self.settings.get("stop_strings") or [])
+        self.longest_stop = max((len(s) for s in self.stop_strings), default=0)
+        self.needs_text = bool(self.stop_strings or self.settings.get("json") or self.settings.get("max_sentences"))
+        rows = len(input_lengths)
+        self.reasons = [None] * rows
+        self._decoded = [0] * rows   # Anzahl bereits dekodierter generierter Tokens
+        self._text = [""] * rows     # bisher generierter Text (ab Marker, falls "after")
+        self._raw = [""] * rows      # Text vor dem Marker (nur solange der Marker fehlt)
+        self._json = [{"depth": 0, "string": False, "escape": False} for _ in range(rows)]
+        self._sentences = [0] * rows
+        self._scanned = [0] * rows
+
+    @classmethod
+    def from_config(cls, config: dict, tokenizer, input_lengths: list, prompt_width: int, max_new_tokens: int):
+        """None, wenn die Node keine Stopp-Regeln hat."""
+        if not config.get("stopping"):
+            return None
+        return cls(config["stopping"], tokenizer, input_lengths, prompt_width, max_new_tokens)
+
+    # Für den Inferenz-Daemon: Regeln als JSON verschicken, dort mit dem Tokenizer des Daemons neu bauen
+    def spec(self) -> dict:
+        return {"settings": self.settings, "input_lengths": self.input_lengths, "max_new_tokens": self.configured}
+
+    @classmethod
+    def from_spec(cls, spec: dict, tokenizer, prompt_width: int):
+        return cls(spec["settings"], tokenizer, spec["input_lengths"], prompt_width, spec["max_new_tokens"])
+
+    @property
+    def max_new_tokens(self) -> int:
+        return max(self.budgets)
+
+    # ------------------------------------------------------------------ Im Generate-Loop
+    def __call__(self, input_ids, scores, **kwargs):
+        generated = input_ids.shape[1] - self.prompt_width
+        done = []
+        for row in range(input_ids.shape[0]):
+            if self.reasons[row] is None:
+                self.reasons[row] = self._check(row, input_ids[row, self.prompt_width:], generated)
+            done.append(self.reasons[row] is not None)
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+    def _check(self, row: int, ids, generated: int):
+        if self.needs_text:
+            reason = self._check_text(row, self._new_text(row, ids))
+            if reason:
+                return reason
+        if generated >= self.budgets[row] and self.budgets[row] < self.configured:
+            return "budget"
+        return None
+
+    def _new_text(self, row: int, ids) -> str:
+        """Dekodiert nur die neuen Tokens (mit einem Token Kontext, damit Leerzeichen erhalten bleiben)."""
+        start = self._decoded[row]
+        self._decoded[row] = ids.shape[0]
+        if start == 0:
+            return self.tokenizer.decode(ids, skip_special_tokens=True)
+        with_context = self.tokenizer.decode(ids[start - 1:], skip_special_tokens=True)
+        context = self.tokenizer.decode(ids[start - 1:start], skip_special_tokens=True)
+        return with_context[len(context):]
+
+    def _check_text(self, row: int, new: str):
+        marker = self.settings.get("after")
+        if marker and self._raw[row] is not None:
+            self._raw[row] += new
+            if marker not in self._raw[row]:
+                return None
+            new = self._raw[row].split(marker, 1)[1]
+            self._raw[row] = None # Marker gefunden -> ab jetzt direkt weiter
+        if not new:
+            return None
+        text = self._text[row] = self._text[row] + new
+
+        if self.stop_strings:
+            tail = text[-(len(new) + self.longest_stop):]
+            if any(s in tail for s in self.stop_strings):
+                return "stop_string"
+        if self.settings.get("json") and self._json_closed(row, new):
+            return "json_complete"
+        limit = self.settings.get("max_sentences")
+        if limit:
+            # Etwas Kontext zurück, damit die Lookbehinds am Übergang greifen
+            offset = max(0, self._scanned[row] - 3)
+            for match in SENTENCE_END.finditer(text, offset):
+                if match.end() > self._scanned[row]:
+                    self._sentences[row] += 1
+            self._scanned[row] = len(text)
+            if self._sentences[row] >= limit:
+                return "max_sentences"
+        return None
+
+    def _json_closed(self, row: int, new: str) -> bool:
+        state = self._json[row]
+        for char in new:
+            if state["string"]:
+                if state["escape"]:
+                    state["escape"] = False
+                elif char == "\\":
+                    state["escape"] = True
+                elif char == '"':
+                    state["string"] = False
+            elif char == '"' and state["depth"] > 0:
+                state["string"] = True
+            elif char in "{[":
+                state["depth"] += 1
+            elif char in "}]" and state["depth"] > 0:
+                state["depth"] -= 1
+                if state["depth"] == 0:
+                    return True
+        return False
+
+    # ------------------------------------------------------------------ Auswertung
+    def outcomes(self, generated_counts: list, ended_with_eos: list) -> list:
+        """Pro Zeile: Stopp-Grund, Token-Budget und gegenüber max_new_tokens gesparte Tokens."""
+        results = []
+        for row, (generated, eos) in enumerate(zip(generated_counts, ended_with_eos)):
+            reason = self.reasons[row] or ("eos" if eos else "max_new_tokens")
+            saved = self.configured - generated if reason in RULE_REASONS else 0
+            results.append({"stop_reason": reason, "token_budget": self.budgets[row], "tokens_saved": max(0, saved)})
+        return results
+
+def plain_outcome(generated: int, eos: bool, max_new_tokens: int) -> dict:
+    """Stopp-Grund für Nodes ohne Regeln (damit jede Generierung einen Grund im Log hat)."""
+    return {"stop_reason": "eos" if eos else "max_new_tokens", "token_budget": max_new_tokens, "tokens_saved": 0}
@@ -0,0 +1,25 @@
+import os
+import sys
+import pytest
+
+# Module liegen flach im Repo-Wurzelverzeichnis
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class CharTokenizer:
+    """Minimaler Tokenizer für Tests: ein Zeichen = ein Token (ID = Codepoint), Offsets exakt."""
+    pad_token_id = 0
+
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=False):
+        if isinstance(text, list):
+            return {"input_ids": [[ord(c) for c in t] for t in text]}
+        encoding = {"input_ids": [ord(c) for c in text]}
+        if return_offsets_mapping:
+            encoding["offset_mapping"] = [(i, i + 1) for i in range(len(text))]
+        return encoding
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(chr(int(i)) for i in ids if int(i) != self.pad_token_id)
+
+@pytest.fixture
+def tokenizer():
+    return CharTokenizer()
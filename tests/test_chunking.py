@@ -0,0 +1,28 @@
+import pytest
+from chunking import group_for_reduce, split_by_tokens
+
+TEXT = "".join(chr(0x100 + i) for i in range(100)) # lauter verschiedene Zeichen
+
+def test_split_overlap(tokenizer):
+    chunks = split_by_tokens(tokenizer, TEXT, chunk_tokens=30, overlap=10)
+    assert chunks[0] == TEXT[:30]
+    assert chunks[-1].endswith(TEXT[-10:])
+    assert all(len(chunk) <= 30 for chunk in chunks)
+    for previous, following in zip(chunks, chunks[1:]):
+        assert previous[-10:] == following[:10]
+    assert [TEXT.index(chunk) for chunk in chunks] == [0, 20, 40, 60, 80]
+
+def test_split_short_text(tokenizer):
+    assert split_by_tokens(tokenizer, "kurz", chunk_tokens=30, overlap=10) == ["kurz"]
+
+def test_split_without_overlap_covers_text(tokenizer):
+    chunks = split_by_tokens(tokenizer, TEXT, chunk_tokens=32, overlap=0)
+    assert "".join(chunks) == TEXT
+
+def test_split_rejects_overlap_too_large(tokenizer):
+    with pytest.raises(ValueError):
+        split_by_tokens(tokenizer, TEXT, chunk_tokens=10, overlap=10)
+
+def test_group_for_reduce(tokenizer):
+    groups = group_for_reduce(tokenizer, ["a" * 6, "b" * 5, "c" * 4, "d" * 20], max_tokens=10)
+    assert groups == [["a" * 6], ["b" * 5, "c" * 4], ["d" * 20]]
@@ -0,0 +1,61 @@
+import pytest
+from chunking import count_tokens
+from context_fusion import _allocate, _truncate_text, fuse_contributions, split_units
+
+def test_allocate_redistributes_unused_budget():
+    assert _allocate([10, 100, 100], [1.0, 1.0, 1.0], 150) == [10, 70, 70]
+    assert _allocate([1000, 1000], [1.0, 3.0], 100) == [25, 75]
+
+def test_allocate_edge_cases():
+    assert _allocate([0, 50], [1.0, 1.0], 100) == [0, 50]
+    assert _allocate([20, 30], [1.0, 1.0], 100) == [20, 30] # alles passt
+    assert _allocate([20, 30], [1.0, 1.0], 0) == [0, 0]
+    assert sum(_allocate([7, 11, 13], [1.0, 2.0, 1.0], 17)) <= 17
+
+def test_truncate_text(tokenizer):
+    assert _truncate_text(tokenizer, "abcdef", 3) == "abc"
+    assert _truncate_text(tokenizer, "abc", 10) == "abc"
+    assert _truncate_text(tokenizer, "abc", 0) == ""
+
+def test_split_units_round_trip():
+    text = "Erster Satz. Zweiter Satz!\n- Punkt z.B. eins\n\nLetzter"
+    units = split_units(text)
+    assert "".join(units) == text
+    assert units[0] == "Erster Satz. "
+    assert units[-1] == "Letzter"
+
+def test_fusion_fits_budget(tokenizer):
+    contributions = [("A", "Alpha eins. Alpha zwei. Alpha drei. " * 5), ("B", "Beta eins. Beta zwei. " * 5)]
+    for strategy in ("extractive", "truncate"):
+        fused, info = fuse_contributions(tokenizer, contributions, 120, strategy=strategy)
+        assert count_tokens(tokenizer, fused) <= 120
+        assert info["fusion_tokens"] == count_tokens(tokenizer, fused)
+        assert info["fusion_strategy"] == strategy
+        assert fused.startswith("A:\n") and "\n\nB:\n" in fused
+
+def test_fusion_keeps_everything_under_budget(tokenizer):
+    contributions = [("A", "Kurz. Knapp."), (None, "Ohne Label.")]
+    fused, info = fuse_contributions(tokenizer, contributions, 1000)
+    assert fused == "A:\nKurz. Knapp.\n\nOhne Label."
+    assert info["fusion_units_dropped"] == 0
+    assert info["fusion_duplicates"] == 0
+
+def test_fusion_dedup_across_contributions(tokenizer):
+    contributions = [("A", "Die Zinsen steigen deutlich. Eigene Aussage."),
+                     ("B", "Die Zinsen steigen deutlich. Andere Aussage.")]
+    fused, info = fuse_contributions(tokenizer, contributions, 1000)
+    assert info["fusion_duplicates"] == 1
+    assert fused.count("Die Zinsen steigen deutlich.") == 1
+    _, info = fuse_contributions(tokenizer, contributions, 1000, dedup=False)
+    assert info["fusion_duplicates"] == 0
+
+def test_extractive_keeps_original_order(tokenizer):
+    text = "Aktien Anleihen Rohstoffe. Wetter heute. Aktien Anleihen Gold. Sonstiges."
+    fused, _ = fuse_contributions(tokenizer, [(None, text)], 60, strategy="extractive")
+    kept = split_units(fused)
+    positions = [text.index(unit.strip()) for unit in kept]
+    assert positions == sorted(positions)
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        fuse_contributions(None, [], 100, strategy="abstractive")
@@ -0,0 +1,45 @@
+import itertools
+import pytest
+import response_cache
+from response_cache import ResponseCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "responses.db"))
+
+def test_key_depends_on_all_inputs():
+    base = ResponseCache.make_key("/m/a", [1, 2, 3], {"max_new_tokens": 64, "do_sample": False}, None)
+    assert base == ResponseCache.make_key("/m/a", [1, 2, 3], {"do_sample": False, "max_new_tokens": 64}, None)
+    variants = [
+        ResponseCache.make_key("/m/b", [1, 2, 3], {"max_new_tokens": 64, "do_sample": False}, None),
+        ResponseCache.make_key("/m/a", [1, 2, 4], {"max_new_tokens": 64, "do_sample": False}, None),
+        ResponseCache.make_key("/m/a", [1, 2, 3], {"max_new_tokens": 65, "do_sample": False}, None),
+        ResponseCache.make_key("/m/a", [1, 2, 3], {"max_new_tokens": 64, "do_sample": False}, 7),
+    ]
+    assert len({base, *variants}) == 5
+
+def test_cacheable(tmp_path, cache):
+    assert cache.is_cacheable({"do_sample": False}, None)
+    assert not cache.is_cacheable({"do_sample": True}, None)
+    assert cache.is_cacheable({"do_sample": True}, 42)
+    bypass = ResponseCache(str(tmp_path / "bypass.db"), bypass=True)
+    assert not bypass.is_cacheable({"do_sample": False}, None)
+
+def test_put_get(cache):
+    assert cache.get("fehlt") is None
+    cache.put("k", "modell", "Antwort", 12)
+    assert cache.get("k") == ("Antwort", 12)
+    cache.put("k", "modell", "Neu", 3)
+    assert cache.get("k") == ("Neu", 3)
+
+def test_lru_eviction(tmp_path, monkeypatch):
+    clock = itertools.count(1000)
+    monkeypatch.setattr(response_cache.time, "time", lambda: next(clock))
+    cache = ResponseCache(str(tmp_path / "small.db"), max_mb=100 / 1024**2) # 100 Bytes
+    cache.put("a", "m", "x" * 40, 1)
+    cache.put("b", "m", "y" * 40, 1)
+    assert cache.get("a") is not None # a ist jetzt jünger als b
+    cache.put("c", "m", "z" * 40, 1)
+    assert cache.get("b") is None
+    assert cache.get("a") == ("x" * 40, 1)
+    assert cache.get("c") == ("z" * 40, 1)
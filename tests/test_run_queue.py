@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+from langgraph.graph import StateGraph, START, END
+from run_queue import ModelAffinityQueue
+from state_schema import WorkflowState, node_delta
+
+def source(state):
+    return node_delta("source", state["portfolio_items"].upper(), {"node": "source"})
+
+def left(state):
+    return node_delta("left", f"L({state['results']['source']})", {"node": "left"})
+
+def right(state):
+    return node_delta("right", f"R({state['results']['source']})", {"node": "right"})
+
+def join(state):
+    # Fan-in: beide Vorgänger müssen schon im State stehen
+    results = state["results"]
+    return {**node_delta("join", None, {"node": "join"}), "report": f"{results['left']}+{results['right']}"}
+
+NODES = SimpleNamespace(NODE_MODELS={"source": "modell-a", "left": "modell-b", "right": "modell-a", "join": "modell-c"})
+
+def build_graph():
+    workflow = StateGraph(WorkflowState)
+    for func in (source, left, right, join):
+        workflow.add_node(func.__name__, func)
+    workflow.add_edge(START, "source")
+    workflow.add_edge("source", "left")
+    workflow.add_edge("source", "right")
+    workflow.add_edge(["left", "right"], "join")
+    workflow.add_edge("join", END)
+    return workflow.compile()
+
+def test_supersteps_follow_graph():
+    queue = ModelAffinityQueue(build_graph(), NODES)
+    steps = queue.supersteps()
+    assert steps[0] == ["source"]
+    assert sorted(steps[1]) == ["left", "right"]
+    assert steps[2:] == [["join"]]
+
+def test_affinity_order_within_step():
+    queue = ModelAffinityQueue(build_graph(), NODES)
+    assert queue._order_by_affinity(["left", "right"], "modell-a") == ["right", "left"]
+    assert queue._order_by_affinity(["left", "right"], "modell-b") == ["left", "right"]
+
+def test_run_matches_invoke():
+    graph = build_graph()
+    initial = [{"portfolio_items": "x", "metrics": []}, {"portfolio_items": "y", "metrics": []}]
+    queue = ModelAffinityQueue(graph, NODES)
+    final_states = queue.run(initial)
+    for start, final in zip(initial, final_states):
+        expected = graph.invoke(start)
+        assert final["report"] == expected["report"] == f"L({start['portfolio_items'].upper()})+R({start['portfolio_items'].upper()})"
+        assert final["results"] == expected["results"]
+        assert sorted(m["node"] for m in final["metrics"]) == sorted(m["node"] for m in expected["metrics"])
+        assert final["metrics"][0]["node"] == "source" and final["metrics"][-1]["node"] == "join"
+
+def test_run_reduces_model_swaps():
+    queue = ModelAffinityQueue(build_graph(), NODES)
+    queue.run([{"portfolio_items": str(i), "metrics": []} for i in range(3)])
+    report = queue.last_report
+    assert report["runs"] == 3
+    assert report["queued_swaps"] == 3 # a (source, right) -> b -> c
+    assert report["naive_swaps"] == 9
+    assert report["swaps_saved"] == 6
@@ -0,0 +1,35 @@
+from state_schema import REDUCERS, apply_delta, merge_results, node_delta, result_of
+
+def test_merge_results_keeps_other_models():
+    current = {"a": {"text": "A"}, "b": {"text": "B"}}
+    merged = merge_results(current, {"b": {"text": "B2"}, "c": {"text": "C"}})
+    assert merged == {"a": {"text": "A"}, "b": {"text": "B2"}, "c": {"text": "C"}}
+    assert current == {"a": {"text": "A"}, "b": {"text": "B"}} # Eingabe bleibt unverändert
+
+def test_merge_results_empty_sides():
+    assert merge_results(None, None) == {}
+    assert merge_results({"a": 1}, {}) == {"a": 1}
+    update = {"a": 1}
+    merged = merge_results(None, update)
+    assert merged == update and merged is not update
+
+def test_reducers_from_schema():
+    assert REDUCERS["results"] is merge_results
+    assert REDUCERS["metrics"]([1], [2]) == [1, 2]
+    assert "report" not in REDUCERS
+
+def test_apply_delta_uses_reducers_and_overwrites_rest():
+    state = {"results": {"a": "A"}, "metrics": [{"node": "a"}], "report": "alt"}
+    delta = {**node_delta("b", "B", {"node": "b"}), "report": "neu"}
+    new_state = apply_delta(state, delta)
+    assert new_state["results"] == {"a": "A", "b": "B"}
+    assert new_state["metrics"] == [{"node": "a"}, {"node": "b"}]
+    assert new_state["report"] == "neu"
+    assert state == {"results": {"a": "A"}, "metrics": [{"node": "a"}], "report": "alt"}
+
+def test_apply_delta_sets_missing_keys():
+    new_state = apply_delta({}, node_delta("a", "A", {"node": "a"}))
+    assert new_state == {"results": {"a": "A"}, "metrics": [{"node": "a"}]}
+    assert result_of(new_state, "a") == "A"
+    assert result_of(new_state, "b") is None
+    assert result_of({}, "a") is None
@@ -0,0 +1,71 @@
+import torch
+from stopping import GenerationBudget, plain_outcome
+
+PROMPT = [ord("p")] * 4
+
+def generate(budget, texts):
+    """Spielt die Generierung Token für Token ab (wie generate mit einem Token pro Schritt)."""
+    rows = [list(PROMPT) for _ in texts]
+    for step in range(max(len(t) for t in texts)):
+        for row, text in enumerate(texts):
+            rows[row].append(ord(text[step]) if step < len(text) else 0)
+        if bool(budget(torch.tensor(rows), None).all()):
+            break
+
+def make(settings, tokenizer, input_lengths=(10,), max_new_tokens=100):
+    return GenerationBudget(settings, tokenizer, list(input_lengths), len(PROMPT), max_new_tokens)
+
+def test_budget_is_clamped_per_row(tokenizer):
+    budget = make({"budget": {"per_input_token": 1.5, "min": 10}}, tokenizer, input_lengths=[2, 20, 1000])
+    assert budget.budgets == [10, 30, 100]
+    assert budget.max_new_tokens == 100
+
+def test_from_config_without_rules(tokenizer):
+    assert GenerationBudget.from_config({"params": {}}, tokenizer, [5], 4, 64) is None
+    assert GenerationBudget.from_config({"stopping": {"json": True}}, tokenizer, [5], 4, 64) is not None
+
+def test_spec_round_trip(tokenizer):
+    settings = {"after": "</think>", "max_sentences": 3, "budget": {"per_input_token": 0.5, "min": 8}}
+    original = make(settings, tokenizer, input_lengths=[40, 200], max_new_tokens=64)
+    rebuilt = GenerationBudget.from_spec(original.spec(), tokenizer, prompt_width=7)
+    assert rebuilt.settings == original.settings
+    assert rebuilt.budgets == original.budgets == [20, 64]
+    assert rebuilt.configured == 64
+    assert rebuilt.prompt_width == 7
+
+def test_stop_string(tokenizer):
+    budget = make({"stop_strings": ["ENDE"]}, tokenizer)
+    generate(budget, ["abc ENDE xyz"])
+    assert budget.reasons == ["stop_string"]
+    assert budget._text[0] == "abc ENDE"
+
+def test_json_complete_ignores_braces_in_strings(tokenizer):
+    budget = make({"json": True}, tokenizer)
+    generate(budget, ['Hier: {"a": "}{", "b": [1, {"c": "\\"}"}]} danach'])
+    assert budget.reasons == ["json_complete"]
+    assert budget._text[0].endswith("]}")
+
+def test_max_sentences_skips_abbreviations_and_numbers(tokenizer):
+    budget = make({"max_sentences": 2}, tokenizer)
+    generate(budget, ["Kurs z.B. bei 3.5 Prozent. Zweiter Satz! Dritter Satz. "])
+    assert budget.reasons == ["max_sentences"]
+    assert budget._text[0].strip() == "Kurs z.B. bei 3.5 Prozent. Zweiter Satz!"
+
+def test_rules_apply_after_marker(tokenizer):
+    budget = make({"after": "</think>", "max_sentences": 1}, tokenizer)
+    generate(budget, ["Satz eins. Satz zwei. </think>Antwort. Rest"])
+    assert budget.reasons == ["max_sentences"]
+    assert budget._text[0] == "Antwort. "
+
+def test_token_budget_and_outcomes(tokenizer):
+    budget = make({"budget": {"per_input_token": 1.0, "min": 0}}, tokenizer, input_lengths=[3, 100], max_new_tokens=10)
+    generate(budget, ["a" * 20, "b" * 20])
+    assert budget.reasons == ["budget", None]
+    outcomes = budget.outcomes([3, 10], [False, False])
+    assert outcomes[0] == {"stop_reason": "budget", "token_budget": 3, "tokens_saved": 7}
+    assert outcomes[1] == {"stop_reason": "max_new_tokens", "token_budget": 10, "tokens_saved": 0}
+
+def test_eos_saves_nothing(tokenizer):
+    budget = make({"json": True}, tokenizer)
+    assert budget.outcomes([5], [True]) == [{"stop_reason": "eos", "token_budget": 100, "tokens_saved": 0}]
+    assert plain_outcome(5, False, 64) == {"stop_reason": "max_new_tokens", "token_budget": 64, "tokens_saved": 0}
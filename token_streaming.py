@@ -0,0 +1,59 @@
+import sys
+import time
+from transformers import TextStreamer
+
+def percentile(values: list, q: float) -> float:
+    """Einfaches Perzentil (nächster Rang), ohne numpy."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+class NodeStreamer(TextStreamer):
+    """
+    Streamt die Tokens einer Node während model.generate auf die Konsole und optional an einen
+    Callback (callback(label, text, stream_end)) oder eine Queue ((label, text, stream_end)).
+    Misst dabei Time-to-First-Token, Inter-Token-Latenzen und Decode-Geschwindigkeit.
+    """
+
+    def __init__(self, tokenizer, label: str, console: bool = True, callback=None, queue=None):
+        super().__init__(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        self.label = label
+        self.console = console
+        self.callback = callback
+        self.queue = queue
+        self.start_time = time.perf_counter()
+        self.token_times = []
+
+    def put(self, value):
+        # Der erste Aufruf enthält den Prompt (skip_prompt), danach ein Token pro Schritt
+        if not self.next_tokens_are_prompt:
+            now = time.perf_counter()
+            self.token_times.extend([now] * value.reshape(-1).shape[0])
+        super().put(value)
+
+    def on_finalized_text(self, text: str, stream_end: bool = False):
+        if self.console:
+            sys.stdout.write(text)
+            if stream_end:
+                sys.stdout.write("\n")
+            sys.stdout.flush()
+        if self.callback is not None:
+            self.callback(self.label, text, stream_end)
+        if self.queue is not None:
+            self.queue.put((self.label, text, stream_end))
+
+    def metrics(self) -> dict:
+        if not self.token_times:
+            return {"ttft_sec": None, "decode_tokens": 0}
+        gaps_ms = [(b - a) * 1000 for a, b in zip(self.token_times, self.token_times[1:])]
+        decode_span = self.token_times[-1] - self.token_times[0]
+        return {
+            "ttft_sec": round(self.token_times[0] - self.start_time, 3),
+            "decode_tokens": len(self.token_times),
+            "decode_tps": round((len(self.token_times) - 1) / decode_span, 2) if decode_span > 0 else 0.0,
+            "itl_p50_ms": round(percentile(gaps_ms, 50), 2),
+            "itl_p90_ms": round(percentile(gaps_ms, 90), 2),
+            "itl_p99_ms": round(percentile(gaps_ms, 99), 2),
+        }
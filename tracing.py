@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from datetime import datetime
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+class Span:
+    """Ein laufender Abschnitt; Attribute können bis zum Ende per set() ergänzt werden."""
+
+    __slots__ = ("tracer", "span_id", "parent_id", "name", "attrs", "start", "tid", "run")
+
+    def __init__(self, tracer, span_id, parent_id, name, attrs):
+        self.tracer = tracer
+        self.run = current_run_id()
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.tid = threading.get_ident()
+        self.start = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer._finish(self, time.perf_counter())
+        return False
+
+# Run, zu dem der laufende Code gehört (pro asyncio-Task bzw. kopiertem Kontext). None = einzelner Run
+# ohne eigene ID (graph.invoke) - Tracer und ResourceSampler ordnen ihre Einträge danach zu.
+_current_run = contextvars.ContextVar("workflow_run_id", default=None)
+
+def current_run_id():
+    return _current_run.get()
+
+def bind_run(run_id: str = None) -> str:
+    """Setzt die Run-ID für den aktuellen Kontext (z.B. am Anfang eines ainvoke-Tasks) und liefert sie."""
+    run_id = run_id or new_run_id()
+    _current_run.set(run_id)
+    return run_id
+
+class _NullSpan:
+    """Ersatz, solange kein Tracer aktiv ist - kostet praktisch nichts."""
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+_run_id_lock = threading.Lock()
+_last_run_id = [None, 0] # [Zeitstempel, Zähler] - gleichzeitige Runs in derselben Millisekunde
+
+def new_run_id() -> str:
+    """Zeitstempel-ID (ms); bei Kollision innerhalb der Millisekunde mit Zähler-Suffix."""
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")[:-3]
+    with _run_id_lock:
+        if stamp == _last_run_id[0]:
+            _last_run_id[1] += 1
+            return f"{stamp}-{_last_run_id[1]}"
+        _last_run_id[0], _last_run_id[1] = stamp, 0
+    return stamp
+
+class Tracer:
+    """
+    Sammelt verschachtelte Spans eines Runs (pro Thread ein eigener Stack, parallele Nodes
+    landen in eigenen Spuren). Export als JSONL (ein Span pro Zeile) und im Chrome-Trace-Format
+    (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self, out_dir: str, run_id: str = None):
+        self.out_dir = out_dir
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        self.reset(run_id)
+
+    def reset(self, run_id: str = None):
+        with self.lock:
+            self.run_id = run_id or new_run_id()
+            self.epoch = time.perf_counter()
+            self.spans = []
+            self.counters = [] # Zeitreihen (z.B. RSS/CPU vom ResourceSampler) als Chrome-Counter
+            self._next_id = 1
+
+    def detach(self, run: str = None) -> "Tracer":
+        """
+        Übergibt die fertigen Spans eines Runs (siehe bind_run; None = ohne Run-ID) an eine eigenständige
+        Kopie, z.B. zum Export im Hintergrund. Spans gleichzeitig laufender anderer Runs bleiben hier.
+        Die Kopie beginnt bei 0 ms mit dem ersten Span des Runs.
+        """
+        done = Tracer.__new__(Tracer)
+        done.out_dir = self.out_dir
+        done.lock = threading.Lock()
+        done._local = threading.local()
+        with self.lock:
+            mine = [s for s in self.spans if s["run"] == run]
+            self.spans = [s for s in self.spans if s["run"] != run]
+            done.run_id = run or self.run_id
+            done._next_id = self._next_id
+            if run is None:
+                self.run_id = new_run_id() # der nächste Run ohne eigene ID bekommt eine neue
+        offset = min((s["start_ms"] for s in mine), default=0.0)
+        done.epoch = self.epoch + offset / 1000
+        done.spans = [{**{k: v for k, v in s.items() if k != "run"}, "start_ms": round(s["start_ms"] - offset, 3)}
+                      for s in mine]
+        done.counters = []
+        return done
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _new_id(self) -> int:
+        with self.lock:
+            span_id = self._next_id
+            self._next_id += 1
+        return span_id
+
+    def span(self, name: str, **attrs) -> Span:
+        stack = self._stack()
+        span = Span(self, self._new_id(), stack[-1].span_id if stack else None, name, attrs)
+        stack.append(span)
+        return span
+
+    def _finish(self, span: Span, end: float):
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        elif span in stack:
+            stack.remove(span)
+        self._store(span.span_id, span.parent_id, span.name, span.start, end, span.tid, span.attrs, span.run)
+
+    def record(self, name: str, start: float, end: float, **attrs):
+        """Nachträglicher Span mit bekannten perf_counter-Zeiten (z.B. Prefill/Decode aus dem Streamer)."""
+        stack = self._stack()
+        self._store(self._new_id(), stack[-1].span_id if stack else None, name, start, end,
+                    threading.get_ident(), attrs, current_run_id())
+
+    def counter(self, name: str, t: float, **values):
+        """Messpunkt einer Zeitreihe zum perf_counter-Zeitpunkt t."""
+        with self.lock:
+            self.counters.append({"name": name, "ts_ms": round((t - self.epoch) * 1000, 3), "values": values})
+
+    def _store(self, span_id, parent_id, name, start, end, tid, attrs, run=None):
+        with self.lock:
+            self.spans.append({
+                "run": run,
+                "id": span_id,
+                "parent": parent_id,
+                "name": name,
+                "start_ms": round((start - self.epoch) * 1000, 3),
+                "dur_ms": round((end - start) * 1000, 3),
+                "tid": tid,
+                "attrs": attrs,
+            })
+
+    def export(self) -> tuple:
+        """Schreibt <run_id>.jsonl und <run_id>.trace.json und liefert beide Pfade."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        with self.lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+        jsonl_path = os.path.join(self.out_dir, f"{self.run_id}.jsonl")
+        chrome_path = os.path.join(self.out_dir, f"{self.run_id}.trace.json")
+
+        with open(jsonl_path, "w", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps({"run_id": self.run_id, **span}, default=str) + "\n")
+
+        # Chrome-Trace: "X" = vollständiges Event, Zeiten in Mikrosekunden
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": f"Thread {i}"}}
+                  for i, tid in enumerate(dict.fromkeys(s["tid"] for s in spans))]
+        events += [{
+            "name": span["name"],
+            "cat": span["name"].split(":")[0],
+            "ph": "X",
+            "ts": round(span["start_ms"] * 1000, 1),
+            "dur": round(span["dur_ms"] * 1000, 1),
+            "pid": pid,
+            "tid": span["tid"],
+            "args": span["attrs"],
+        } for span in spans]
+        events += [{"name": c["name"], "ph": "C", "ts": round(c["ts_ms"] * 1000, 1), "pid": pid, "args": c["values"]}
+                   for c in self.counters]
+        with open(chrome_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                       "otherData": {"run_id": self.run_id}}, f, default=str)
+
+        print(f"[{get_ts()}] [TRACE] {len(spans)} Spans -> {jsonl_path}")
+        print(f"[{get_ts()}] [TRACE] Chrome-Trace -> {chrome_path}")
+        return jsonl_path, chrome_path
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import importlib.metadata
+from datetime import datetime
+from lazy_imports import lazy_import
+
+torch = lazy_import("torch")
+AutoModelForCausalLM = lazy_import("transformers", "AutoModelForCausalLM")
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+CHECKPOINT_SUFFIXES = (".safetensors", ".bin", ".json", ".model")
+TORCH_FILE = "model.pt"
+TMP_MARKER = ".tmp-" # halbfertige Artefakte (eigenes Verzeichnis pro Schreibvorgang, auch über Prozesse)
+STALE_TMP_SEC = 6 * 3600 # so alte Temp-Verzeichnisse stammen von abgebrochenen Prozessen
+
+class ConvertedWeightCache:
+    """
+    Lokaler Cache fertig konvertierter Modelle (nach dtype-Umwandlung bzw. Quantisierung).
+    Schlüssel: Modellpfad + Revision + Lade-Profil. Im Manifest steht zusätzlich ein Fingerabdruck
+    der Checkpoint-Dateien (Größe + mtime) - ändert sich der Checkpoint, wird das Artefakt verworfen.
+    Format: safetensors (von from_pretrained per mmap gelesen, bitsandbytes-Gewichte bleiben
+    vorquantisiert) bzw. torch.save/torch.load(mmap=True) für dynamisch quantisierte CPU-Modelle.
+    """
+
+    def __init__(self, cache_dir: str = None, max_gb: float = 40.0):
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.cache_dir = cache_dir or os.path.join(base_dir, "model_cache", "converted")
+        self.max_gb = max_gb
+        self.lock = threading.Lock()
+        self.log_path = os.path.join(self.cache_dir, "loads.jsonl")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._remove_stale_tmp()
+
+    # ------------------------------------------------------------------ Schlüssel
+    @staticmethod
+    def revision_of(model_path: str, entry: dict) -> str:
+        """Revision aus modelle.json, sonst Commit-Hash eines HF-Snapshot-Ordners, sonst 'local'."""
+        if entry.get("revision"):
+            return entry["revision"]
+        parts = os.path.realpath(model_path).replace("\\", "/").split("/")
+        if "snapshots" in parts[:-1]:
+            return parts[parts.index("snapshots") + 1]
+        return "local"
+
+    @staticmethod
+    def fingerprint(model_path: str) -> dict:
+        files = {}
+        if os.path.isdir(model_path):
+            for name in sorted(os.listdir(model_path)):
+                if name.endswith(CHECKPOINT_SUFFIXES):
+                    stat = os.stat(os.path.join(model_path, name))
+                    files[name] = [stat.st_size, stat.st_mtime_ns]
+        return {"files": files, "transformers": importlib.metadata.version("transformers"),
+                "torch": importlib.metadata.version("torch")}
+
+    def _key(self, model_path: str, revision: str, profile: dict) -> str:
+        weights_profile = {k: v for k, v in profile.items() if k != "threads"} # Threads ändern die Gewichte nicht
+        raw = json.dumps([os.path.abspath(model_path), revision, weights_profile], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+    def artifact_dir(self, model_name: str, model_path: str, entry: dict, profile: dict) -> str:
+        key = self._key(model_path, self.revision_of(model_path, entry), profile)
+        return os.path.join(self.cache_dir, f"{model_name.replace('/', '__')}-{key}")
+
+    # ------------------------------------------------------------------ Lesen / Schreiben
+    def lookup(self, model_name: str, model_path: str, entry: dict, profile: dict):
+        """Pfad des gültigen Artefakts oder None (veraltete Artefakte werden dabei gelöscht)."""
+        target = self.artifact_dir(model_name, model_path, entry, profile)
+        manifest_path = os.path.join(target, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        if manifest.get("fingerprint") != self.fingerprint(model_path):
+            print(f"[{get_ts()}] [WCACHE] INVALID: {model_name} - Checkpoint hat sich geändert, Artefakt verworfen")
+            self.discard(target)
+            return None
+        if not self._files_complete(target, manifest):
+            print(f"[{get_ts()}] [WCACHE] INVALID: {model_name} - Artefakt unvollständig, verworfen")
+            self.discard(target)
+            return None
+        manifest["last_used"] = time.time()
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        return target
+
+    def load(self, artifact: str, load_kwargs: dict):
+        with open(os.path.join(artifact, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["format"] == "torch":
+            return torch.load(os.path.join(artifact, TORCH_FILE), mmap=True, weights_only=False)
+        # Quantisierungs-Einstellungen stehen schon in der gespeicherten config.json
+        kwargs = {k: v for k, v in load_kwargs.items() if k != "quantization_config"}
+        return AutoModelForCausalLM.from_pretrained(artifact, **kwargs)
+
+    @staticmethod
+    def _files_complete(target: str, manifest: dict) -> bool:
+        """Alle Dateien aus dem Manifest vorhanden und gleich groß (ältere Manifeste ohne Liste: ok)."""
+        for name, size in manifest.get("files", {}).items():
+            path = os.path.join(target, name)
+            if not os.path.exists(path) or os.path.getsize(path) != size:
+                return False
+        return True
+
+    def discard(self, artifact: str):
+        """Entfernt ein (defektes oder veraltetes) Artefakt."""
+        with self.lock:
+            shutil.rmtree(artifact, ignore_errors=True)
+
+    def store(self, model, model_name: str, model_path: str, entry: dict, profile: dict) -> str:
+        """Speichert das fertig konvertierte Modell; Fehler (z.B. nicht serialisierbar) sind nicht fatal."""
+        target = self.artifact_dir(model_name, model_path, entry, profile)
+        start = time.time()
+        # Eindeutiges Temp-Verzeichnis: parallele Prozesse (run_pool) schreiben sich nicht gegenseitig hinein
+        tmp = tempfile.mkdtemp(prefix=os.path.basename(target) + TMP_MARKER, dir=self.cache_dir)
+        try:
+            if profile.get("quantization") == "int8-dynamic":
+                fmt = "torch" # dynamisch quantisierte Linear-Module kennt safetensors nicht
+                torch.save(model, os.path.join(tmp, TORCH_FILE))
+            else:
+                fmt = "safetensors"
+                model.save_pretrained(tmp, safe_serialization=True)
+            files = {f: os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)}
+            size_gb = sum(files.values()) / 1024**3
+            manifest = {"files": files, "model_name": model_name, "model_path": os.path.abspath(model_path),
+                        "revision": self.revision_of(model_path, entry), "profile": profile, "format": fmt,
+                        "fingerprint": self.fingerprint(model_path), "size_gb": round(size_gb, 3),
+                        "created": datetime.now().isoformat(timespec="seconds"), "last_used": time.time()}
+            with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+            with self.lock:
+                shutil.rmtree(target, ignore_errors=True)
+                try:
+                    os.replace(tmp, target) # erst fertig geschriebene Artefakte werden sichtbar
+                except OSError:
+                    # Ein anderer Prozess war schneller - sein vollständiges Artefakt gilt
+                    shutil.rmtree(tmp, ignore_errors=True)
+                    print(f"[{get_ts()}] [WCACHE] STORE: {model_name} schon von anderem Prozess geschrieben")
+                    return target
+                self._enforce_budget(keep=target)
+            print(f"[{get_ts()}] [WCACHE] STORE: {model_name} ({fmt}, {size_gb:.2f} GB) in {time.time() - start:.2f}s")
+            return target
+        except Exception as e:
+            shutil.rmtree(tmp, ignore_errors=True)
+            print(f"[{get_ts()}] [WCACHE] STORE fehlgeschlagen für {model_name}: {e}")
+            return None
+
+    def _remove_stale_tmp(self):
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if TMP_MARKER in name and now - os.path.getmtime(path) > STALE_TMP_SEC:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _artifacts(self) -> list:
+        result = []
+        for name in os.listdir(self.cache_dir):
+            if TMP_MARKER in name: # gerade in Arbeit (ggf. in einem anderen Prozess)
+                continue
+            manifest_path = os.path.join(self.cache_dir, name, "manifest.json")
+            if os.path.exists(manifest_path):
+                with open(manifest_path, encoding="utf-8") as f:
+                    result.append((os.path.join(self.cache_dir, name), json.load(f)))
+        return result
+
+    def _enforce_budget(self, keep: str = None):
+        """Älteste (zuletzt benutzte) Artefakte löschen, bis das Budget eingehalten ist."""
+        artifacts = sorted(self._artifacts(), key=lambda a: a[1].get("last_used", 0))
+        total = sum(m.get("size_gb", 0) for _, m in artifacts)
+        for path, manifest in artifacts:
+            if total <= self.max_gb:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= manifest.get("size_gb", 0)
+            print(f"[{get_ts()}] [WCACHE] EVICT: {manifest['model_name']} ({manifest.get('size_gb', 0):.2f} GB)")
+
+    # ------------------------------------------------------------------ Auswertung
+    def record_load(self, model_name: str, profile_label: str, kind: str, load_sec: float):
+        """kind: 'cold' (aus dem Checkpoint konvertiert) oder 'warm' (aus dem Artefakt)."""
+        with self.lock, open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"timestamp": datetime.now().isoformat(timespec="seconds"), "model": model_name,
+                                "profile": profile_label, "kind": kind, "load_sec": round(load_sec, 3)}) + "\n")
+
+    def load_report(self) -> list:
+        """Ø Ladezeit kalt vs. warm pro Modell und Profil aus loads.jsonl."""
+        groups = {}
+        if os.path.exists(self.log_path):
+            with open(self.log_path, encoding="utf-8") as f:
+                for line in f:
+                    row = json.loads(line)
+                    groups.setdefault((row["model"], row["profile"]), {}).setdefault(row["kind"], []).append(
+                        row["load_sec"])
+        report = []
+        for (model, profile), kinds in sorted(groups.items()):
+            cold, warm = kinds.get("cold", []), kinds.get("warm", [])
+            cold_avg = sum(cold) / len(cold) if cold else None
+            warm_avg = sum(warm) / len(warm) if warm else None
+            report.append({"model": model, "profile": profile, "cold_n": len(cold), "warm_n": len(warm),
+                           "cold_avg_sec": cold_avg, "warm_avg_sec": warm_avg,
+                           "speedup": cold_avg / warm_avg if cold_avg and warm_avg else None})
+        return report
@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import subprocess
+from datetime import datetime
+
+# 🔵 Bewusst nur leichte Importe auf Modulebene: torch/transformers/langgraph werden erst
+# geladen, wenn ein Subcommand sie wirklich braucht (siehe lazy_imports.py).
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+WORKFLOWS = {
+    "main": "run_workflow", # Standard-Graph aus run_workflow.py
+    "simple": "04_simple",  # Kette llama -> strategist -> qwen -> reporter
+}
+
+# Subcommand -> Argumente, mit denen der Start im Benchmark gemessen wird
+BENCH_COMMANDS = {
+    "graph": ["graph"],
+    "history": ["history", "--limit", "1"],
+    "run": ["run", "--dry-run"],
+}
+
+def get_ts():
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+def _load_workflow(name: str):
+    module = importlib.import_module(WORKFLOWS[name])
+    return module.build_workflow()
+
+# --- SUBCOMMANDS ---
+def cmd_run(args):
+    from prompt_library import PortfolioPrompts
+
+    graph, nodes = _load_workflow(args.workflow)
+    if args.dry_run:
+        # Nur Aufbau messen/prüfen: Graph steht, Modelle werden nicht angefasst
+        print(f"[{get_ts()}] [CLI] Workflow '{args.workflow}' aufgebaut ({len(graph.get_graph().nodes)} Knoten)")
+        return
+
+    initial_input = {
+        "portfolio_items": args.source or PortfolioPrompts.DEFAULT_PORTFOLIO,
+        "metrics": []
+    }
+    print(graph.get_graph().draw_ascii())
+    print(f"[{get_ts()}] [CLI] Starte Workflow '{args.workflow}'...")
+    final_state = graph.invoke(initial_input)
+
+    print("\n" + "="*50)
+    print(" WORKFLOW ABGESCHLOSSEN")
+    print("="*50)
+    print(final_state.get("report", "Fehler: Kein Bericht generiert."))
+
+def cmd_graph(args):
+    graph, _ = _load_workflow(args.workflow)
+    print(graph.get_graph().draw_ascii())
+
+def cmd_history(args):
+    from workflow_interface import WorkflowInterface
+
+    runs = WorkflowInterface().load_history(args.limit)
+    if not runs:
+        print(f"[{get_ts()}] [CLI] Noch keine Runs in der Datenbank.")
+        return
+    for run in runs:
+        metrics = run["metrics"]
+        total = sum(m.get("duration_sec", 0) for m in metrics)
+        tokens = sum(m.get("tokens", 0) for m in metrics)
+        print(f"#{run['id']} {run['timestamp']} | {len(metrics)} Nodes | {total:.2f}s | {tokens} Tokens | {run['summary']}")
+        for m in metrics:
+            ttft = f"{m['ttft_sec']}s" if m.get("ttft_sec") is not None else "-"
+            print(f"    {m.get('model', '?'):<45} {m.get('duration_sec', 0):>8}s "
+                  f"{m.get('speed_tps', 0):>8} t/s  TTFT {ttft}")
+
+def cmd_stats(args):
+    from workflow_interface import WorkflowInterface
+
+    store = WorkflowInterface().store
+    if args.speculative:
+        return _print_speculative(store.speculative_stats(last_runs=args.last or 500))
+    rows = store.metric_stats(args.metric, model=args.model, last_runs=args.last, since=args.since,
+                              group_by_model=args.model is None)
+    if not rows:
+        print(f"[{get_ts()}] [CLI] Keine Werte für {args.metric}.")
+        return
+    print(f"{'Modell':<45} {'n':>5} {'Ø':>9} {'min':>9} {'p50':>9} {'p90':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for row in rows:
+        values = " ".join(f"{row[k]:>9.2f}" for k in ("avg", "min", "p50", "p90", "p95", "p99", "max"))
+        print(f"{row['model'] or args.model:<45} {row['count']:>5} {values}")
+    if args.spans:
+        print(f"\n{'Span':<25} {'n':>6} {'Summe ms':>12} {'Ø ms':>10} {'max ms':>10}")
+        for row in store.span_stats(args.last or 50):
+            print(f"{row['name']:<25} {row['count']:>6} {row['total_ms']:>12.1f} {row['avg_ms']:>10.1f} {row['max_ms']:>10.1f}")
+
+def _print_speculative(rows: list):
+    """Draft-Paare gegen die Basis ohne Draft: lohnt sich das Paar?"""
+    models = {r["model"] for r in rows if r["draft"] is not None}
+    if not models:
+        print(f"[{get_ts()}] [CLI] Noch keine Runs mit Draft-Modell (siehe enable_speculative).")
+        return
+    fmt = lambda v, pattern: format(v, pattern) if v is not None else "-"
+    print(f"{'Modell':<40} {'Draft':<40} {'n':>5} {'Decode t/s':>10} {'Annahme':>8} {'Tok/Schritt':>11} {'Speedup':>8}")
+    for row in (r for r in rows if r["model"] in models):
+        print(f"{row['model']:<40} {row['draft'] or '(ohne)':<40} {row['count']:>5} {row['decode_tps']:>10.1f} "
+              f"{fmt(row['accept_rate'], '.0%'):>8} {fmt(row['tokens_per_step'], '.2f'):>11} "
+              f"{fmt(row['speedup'], '.2f') + ('x' if row['speedup'] else ''):>8}")
+
+def cmd_migrate(args):
+    from workflow_interface import WorkflowInterface
+
+    imported = WorkflowInterface().migrate_legacy()
+    print(f"[{get_ts()}] [CLI] Migration abgeschlossen: {imported or 'nichts zu übernehmen'}")
+
+def cmd_weights(args):
+    from weight_cache import ConvertedWeightCache
+
+    report = ConvertedWeightCache().load_report()
+    if not report:
+        print(f"[{get_ts()}] [CLI] Noch keine Ladevorgänge mit Gewichte-Cache protokolliert.")
+        return
+    fmt = lambda v, suffix="s": f"{v:.2f}{suffix}" if v is not None else "-"
+    print(f"{'Modell':<45} {'Profil':<22} {'kalt (n)':>14} {'warm (n)':>14} {'Faktor':>8}")
+    for row in report:
+        cold = f"{fmt(row['cold_avg_sec'])} ({row['cold_n']})"
+        warm = f"{fmt(row['warm_avg_sec'])} ({row['warm_n']})"
+        print(f"{row['model']:<45} {row['profile']:<22} {cold:>14} {warm:>14} {fmt(row['speedup'], 'x'):>8}")
+
+def _parse_importtime(stderr: str):
+    """Summe der Top-Level-Importzeiten (-X importtime) und ob schwere Module geladen wurden."""
+    from lazy_imports import HEAVY_MODULES
+
+    total_us, heavy = 0, set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue # Kopfzeile
+        if name.startswith(" ") and not name.startswith("  "):
+            total_us += int(cumulative)
+        if name.strip().split(".")[0] in HEAVY_MODULES:
+            heavy.add(name.strip().split(".")[0])
+    return total_us / 1e6, sorted(heavy)
+
+def _median(values: list) -> float:
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+def cmd_bench(args):
+    results_path = os.path.join(BASE_DIR, "dAbA", "startup_bench.jsonl")
+    previous = {}
+    if os.path.exists(results_path):
+        with open(results_path, "r", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                previous[entry["command"]] = entry
+
+    commands = args.commands or list(BENCH_COMMANDS)
+    unknown = [command for command in commands if command not in BENCH_COMMANDS]
+    if unknown:
+        raise SystemExit(f"[BENCH] Unbekannte Subcommands: {', '.join(unknown)}")
+    entries = []
+    for command in commands:
+        walls, imports, heavy = [], [], []
+        for _ in range(args.repeat):
+            argv = [sys.executable, "-X", "importtime", os.path.abspath(__file__), *BENCH_COMMANDS[command]]
+            start = time.perf_counter()
+            proc = subprocess.run(argv, cwd=BASE_DIR, capture_output=True, text=True)
+            walls.append(time.perf_counter() - start)
+            if proc.returncode != 0:
+                raise SystemExit(f"[BENCH] '{command}' fehlgeschlagen:\n{proc.stderr[-2000:]}")
+            import_sec, heavy = _parse_importtime(proc.stderr)
+            imports.append(import_sec)
+
+        entry = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "command": command,
+            "repeat": args.repeat,
+            "wall_min_sec": round(min(walls), 3),
+            "wall_median_sec": round(_median(walls), 3),
+            "import_median_sec": round(_median(imports), 3),
+            "heavy_modules": heavy,
+        }
+        entries.append(entry)
+
+        delta = ""
+        if command in previous:
+            diff = entry["wall_median_sec"] - previous[command]["wall_median_sec"]
+            delta = f" | Δ {diff:+.3f}s ggü. {previous[command]['timestamp']}"
+        print(f"[{get_ts()}] [BENCH] {command:<8} Start {entry['wall_median_sec']:.3f}s (min {entry['wall_min_sec']:.3f}s) | "
+              f"Importe {entry['import_median_sec']:.3f}s | schwere Module: {', '.join(heavy) or '-'}{delta}")
+        if heavy and command != "run":
+            print(f"[{get_ts()}] [BENCH] WARNUNG: '{command}' lädt {', '.join(heavy)} - Lazy-Import defekt?")
+
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    with open(results_path, "a", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    print(f"[{get_ts()}] [BENCH] Ergebnisse -> {results_path}")
+
+# --- EXECUTION ---
+# Aufruf: python workflow_cli.py {run,graph,history,stats,migrate,weights,bench} [...]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Einstiegspunkt für Workflow, Graph-Ansicht, Historie, Statistik und Start-Benchmark.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Workflow ausführen")
+    run_parser.add_argument("source", nargs="?", help="Text oder Pfad zur Quelle (Standard: DEFAULT_PORTFOLIO)")
+    run_parser.add_argument("--workflow", choices=WORKFLOWS, default="main")
+    run_parser.add_argument("--dry-run", action="store_true", help="Nur Graph aufbauen, nichts generieren")
+    run_parser.set_defaults(func=cmd_run)
+
+    graph_parser = sub.add_parser("graph", help="Graph als ASCII anzeigen (lädt keine Modelle)")
+    graph_parser.add_argument("--workflow", choices=WORKFLOWS, default="main")
+    graph_parser.set_defaults(func=cmd_graph)
+
+    history_parser = sub.add_parser("history", help="Letzte Runs aus performance.db anzeigen")
+    history_parser.add_argument("--limit", type=int, default=10)
+    history_parser.set_defaults(func=cmd_history)
+
+    stats_parser = sub.add_parser("stats", help="Aggregate/Perzentile einer Kennzahl (in SQL berechnet)")
+    stats_parser.add_argument("--metric", default="decode_tps",
+                              help="z.B. decode_tps, ttft_sec, duration_sec, speed_tps, rss_peak_mb")
+    stats_parser.add_argument("--model", help="Nur dieses Modell (Standard: gruppiert nach Modell)")
+    stats_parser.add_argument("--last", type=int, help="Nur die letzten N Runs")
+    stats_parser.add_argument("--since", help="ISO-Zeitpunkt, z.B. 2026-01-01")
+    stats_parser.add_argument("--spans", action="store_true", help="Zusätzlich Dauer pro Span-Name")
+    stats_parser.add_argument("--speculative", action="store_true",
+                              help="Draft-Paare: Annahmequote und Speedup ggü. Decoding ohne Draft")
+    stats_parser.set_defaults(func=cmd_stats)
+
+    migrate_parser = sub.add_parser("migrate", help="Alte history-Tabelle und workflow_results.db übernehmen")
+    migrate_parser.set_defaults(func=cmd_migrate)
+
+    weights_parser = sub.add_parser("weights", help="Ladezeiten kalt vs. warm aus dem Gewichte-Cache")
+    weights_parser.set_defaults(func=cmd_weights)
+
+    bench_parser = sub.add_parser("bench", help="Kaltstart-Zeit pro Subcommand messen")
+    bench_parser.add_argument("commands", nargs="*", help=f"Auswahl aus {', '.join(BENCH_COMMANDS)} (Standard: alle)")
+    bench_parser.add_argument("--repeat", type=int, default=5)
+    bench_parser.set_defaults(func=cmd_bench)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
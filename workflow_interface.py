@@ -1,7 +1,8 @@
 import os 
-import sqlite3
-import json
 from datetime import datetime
+from run_store import RunStore
+from tracing import new_run_id
+from export_writer import PartialExport
 
 class WorkflowInterface:
     def __init__(self):
@@ -19,41 +20,120 @@ class WorkflowInterface:
         self.db_path = os.path.join(self.dAbA_dir, "performance.db") 
         self.md_path = os.path.join(self.md_output_dir, "tagebuch.md") 
         
-        self._init_db()
-
-    def _init_db(self):
-        """Initialisiert die SQL-Datenbank am neuen Pfad."""
-        with sqlite3.connect(self.db_path) as conn: 
-            conn.execute('''CREATE TABLE IF NOT EXISTS history 
-                           (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                            timestamp TEXT, 
-                            metrics TEXT,
-                            summary TEXT)''')
-
-    def save_all(self, state: dict):
+        self.reports_dir = os.path.join(self.md_output_dir, "reports")
+        
+        self._store = None
+        self.exporter = None # optional: WriteBehindExporter, siehe enable_write_behind()
+
+    @property
+    def store(self) -> RunStore:
+        """🔵 NEU: Normalisierte Run-Historie (runs / node_steps / spans) in performance.db, erst bei Bedarf geöffnet."""
+        if self._store is None:
+            self._store = RunStore(self.db_path)
+        return self._store
+
+    def enable_write_behind(self, max_queue: int = 64, batch_size: int = 16):
+        """🔵 NEU: Exporte laufen im Hintergrund; save_all() kehrt sofort zurück (Flush beim Beenden)."""
+        from export_writer import WriteBehindExporter
+        self.exporter = WriteBehindExporter(max_queue=max_queue, batch_size=batch_size)
+        for kind, writer in self._writers().items():
+            # runs = eine Transaktion, report = Datei überschreiben -> einzeln wiederholbar
+            self.exporter.register(kind, writer, retry_each=kind in ("runs", "report"))
+        return self.exporter
+
+    def _writers(self) -> dict:
+        # Art -> Funktion, die eine Liste von Datensätzen dieser Art auf einmal schreibt
+        return {"diary": self._write_diary, "runs": self._write_runs,
+                "report": self._write_reports, "task": self._run_tasks}
+
+    def submit(self, kind: str, payload):
+        """Über den Hintergrund-Writer schreiben, falls aktiv - sonst sofort."""
+        if self.exporter is not None:
+            self.exporter.submit(kind, payload)
+        else:
+            self._writers()[kind]([payload])
+
+    def flush(self):
+        if self.exporter is not None:
+            self.exporter.flush()
+
+    def save_all(self, state: dict, spans: list = None, run_uid: str = None, report: str = None,
+                 reasoning: str = None):
         from workflow_logger import get_ts 
         timestamp = get_ts() 
         
         metrics = state.get("metrics", [])
         
         self._export_markdown(timestamp, metrics)
-        self._export_sql(timestamp, metrics)
+        self._export_sql(metrics, spans, run_uid)
+        run_uid = run_uid or new_run_id()
+        if report is not None:
+            self.submit("report", (run_uid, report))
+        if reasoning is not None:
+            self.submit("report", (f"{run_uid}_denkprozess", reasoning))
         
-        print(f"[{timestamp}] [INTF] Berichte -> {self.md_output_dir}") 
-        print(f"[{timestamp}] [INTF] Datenbank -> {self.dAbA_dir}") 
+        mode = "im Hintergrund" if self.exporter is not None else "geschrieben"
+        print(f"[{timestamp}] [INTF] Berichte -> {self.md_output_dir} ({mode})") 
+        print(f"[{timestamp}] [INTF] Datenbank -> {self.dAbA_dir} ({mode})") 
 
     def _export_markdown(self, timestamp, metrics):
-        #  Nutzt den sicheren Pfad im Output-Ordner
+        self.submit("diary", (timestamp, list(metrics)))
+
+    def _write_diary(self, entries: list):
+        #  Nutzt den sicheren Pfad im Output-Ordner; mehrere Runs mit einem open()
         with open(self.md_path, "a", encoding="utf-8") as f: 
-            f.write(f"\n##  Run am {timestamp}\n")
-            f.write("| Modell | Zeit | Speed | VRAM |\n")
-            f.write("| :--- | :---: | :---: | :---: |\n")
-            for m in metrics:
-                vram_gb = m['vram_mb'] / 1024
-                f.write(f"| {m['model']} | {m['duration_sec']}s | {m['speed_tps']} t/s | {vram_gb:.2f} GB |\n")
-
-    def _export_sql(self, timestamp, metrics):
-        metrics_json = json.dumps(metrics)
-        with sqlite3.connect(self.db_path) as conn: 
-            conn.execute("INSERT INTO history (timestamp, metrics, summary) VALUES (?, ?, ?)", 
-                         (timestamp, metrics_json, "Workflow erfolgreich beendet"))
\ No newline at end of file
+            for i, (timestamp, metrics) in enumerate(entries):
+                try:
+                    block = self._diary_entry(timestamp, metrics) # erst komplett bauen, dann schreiben
+                except Exception as e:
+                    raise PartialExport(i, e) from e
+                f.write(block)
+
+    def _diary_entry(self, timestamp, metrics) -> str:
+        lines = [f"\n##  Run am {timestamp}\n",
+                 "| Modell | Zeit | Speed | TTFT | Decode | VRAM | RSS Peak / Ø | CPU Ø |\n",
+                 "| :--- | :---: | :---: | :---: | :---: | :---: | :---: | :---: |\n"]
+        for m in metrics:
+            # Gerätespeicher: Sampler-Peak, falls vorhanden, sonst Momentwert aus log_step
+            vram_gb = m.get('device_peak_mb', m['vram_mb']) / 1024
+            ttft = f"{m['ttft_sec']}s" if m.get('ttft_sec') is not None else "-"
+            decode = f"{m['decode_tps']} t/s" if m.get('decode_tps') is not None else "-"
+            rss = f"{m['rss_peak_mb']:.0f} / {m['rss_avg_mb']:.0f} MB" if 'rss_peak_mb' in m else "-"
+            cpu = f"{m['cpu_avg_pct']:.0f}%" if 'cpu_avg_pct' in m else "-"
+            lines.append(f"| {m['model']} | {m['duration_sec']}s | {m['speed_tps']} t/s | {ttft} | {decode} | "
+                         f"{vram_gb:.2f} GB | {rss} | {cpu} |\n")
+        return "".join(lines)
+
+    def _export_sql(self, metrics, spans=None, run_uid=None):
+        # Ein Run = eine Transaktion: runs + alle node_steps (+ Spans); im Hintergrund mehrere Runs pro Transaktion
+        self.submit("runs", {"metrics": list(metrics), "summary": "Workflow erfolgreich beendet", "run_uid": run_uid,
+                             "spans": spans, "started_at": datetime.now().isoformat(timespec="milliseconds")})
+
+    def _write_runs(self, runs: list):
+        self.store.record_runs(runs)
+
+    @staticmethod
+    def _run_tasks(tasks: list):
+        # Beliebige Export-Aufgaben (z.B. Trace-Dateien), als Callables eingereicht
+        for i, task in enumerate(tasks):
+            try:
+                task()
+            except Exception as e:
+                raise PartialExport(i, e) from e # erledigte Aufgaben nicht erneut ausführen
+
+    def _write_reports(self, reports: list):
+        """Kompletter Bericht pro Run als eigene Markdown-Datei (md_output/reports/<run_id>.md)."""
+        os.makedirs(self.reports_dir, exist_ok=True)
+        for run_uid, text in reports:
+            with open(os.path.join(self.reports_dir, f"{run_uid}.md"), "w", encoding="utf-8") as f:
+                f.write(text)
+
+    def load_history(self, limit: int = 10) -> list:
+        """Die letzten Runs (neueste zuerst) mit ihren Node-Metriken."""
+        self.flush() # noch wartende Runs zuerst schreiben
+        return self.store.recent_runs(limit)
+
+    def migrate_legacy(self) -> dict:
+        """Übernimmt die alte history-Tabelle und workflow_results.db/runs in das neue Schema."""
+        return self.store.migrate_legacy(history_db=self.db_path,
+                                         results_db=os.path.join(self.base_dir, "workflow_results.db"))
@@ -1,33 +1,68 @@
+import sys
 import time
-import torch
 from datetime import datetime
+from lazy_imports import lazy_import
+
+torch = lazy_import("torch")
 
 def get_ts(): 
     return datetime.now().strftime("%H:%M:%S.%f")[:-3] 
 
 class WorkflowLogger:
-    def log_step(self, model_name: str, duration: float, token_count: int):
-        # VRAM Messung
-        vram_used = torch.cuda.memory_allocated() / 1024**3 # Umrechnung in MB
-        vram_reserved = torch.cuda.memory_reserved() / 1024**2
-        
-        # Speed Berechnung
+    def log_step(self, model_name: str, duration: float, token_count: int, cache_stats: dict = None,
+                 extra: dict = None):
+        # Gerätespeicher nur abfragen, wenn torch schon geladen ist und CUDA existiert (sonst 0)
+        vram_used_mb = 0.0
+        if "torch" in sys.modules and torch.cuda.is_available():
+            vram_used_mb = torch.cuda.memory_allocated() / 1024**2
+
+        # Speed Berechnung (token_count = nur generierte Tokens, ohne Prompt)
         tps = token_count / duration if duration > 0 else 0
-        vram_used_gb = 0.0 
-        if torch.cuda.is_available(): 
-            vram_used_gb = torch.cuda.memory_allocated()/ 1024**3
         # Konsolen-Ausgabe (Schick formatiert)
         print(f"\n" + "="*50)
         print(f"[{get_ts()}] [PERF] INFERENCE: {model_name}") 
-        print(f"[{get_ts()}] [PERF] Duration: {duration:.2f}s | Speed: {tps:.2f} t/s | Tokens: {token_count}") 
-        print(f"[{get_ts()}] [PERF] VRAM belegt: {vram_used_gb:.2f} GB") 
+        print(f"[{get_ts()}] [PERF] Duration: {duration:.2f}s | Speed: {tps:.2f} t/s | Tokens: {token_count} generiert"
+              + (f" | {extra['prompt_tokens']} Prompt" if extra and extra.get("prompt_tokens") else ""))
+        if vram_used_mb:
+            print(f"[{get_ts()}] [PERF] VRAM belegt: {vram_used_mb / 1024:.2f} GB")
+        if extra and "rss_peak_mb" in extra:
+            print(f"[{get_ts()}] [PERF] RSS Peak/Ø: {extra['rss_peak_mb']:.0f}/{extra['rss_avg_mb']:.0f} MB | "
+                  f"CPU Ø {extra['cpu_avg_pct']:.0f}% ({len(extra['cpu_cores_avg_pct'])} Kerne)"
+                  + (f" | Device Peak {extra['device_peak_mb']:.0f} MB" if "device_peak_mb" in extra else ""))
+        if cache_stats:
+            hits = sum(v for k, v in cache_stats.items() if k.startswith("hits_"))
+            print(f"[{get_ts()}] [PERF] Modell-Cache: {hits} Hits | {cache_stats.get('misses', 0)} Misses | "
+                  f"{cache_stats.get('demotions', 0)} Demotions")
+        if extra and extra.get("response_cache"):
+            print(f"[{get_ts()}] [PERF] Antwort-Cache: {extra['response_cache']}")
+        if extra and extra.get("ttft_sec") is not None:
+            print(f"[{get_ts()}] [PERF] TTFT: {extra['ttft_sec']:.2f}s | Decode: {extra['decode_tps']:.2f} t/s | "
+                  f"ITL p50/p90/p99: {extra['itl_p50_ms']:.0f}/{extra['itl_p90_ms']:.0f}/{extra['itl_p99_ms']:.0f} ms")
+        if extra and extra.get("prefill_tokens_skipped"):
+            print(f"[{get_ts()}] [PERF] Prefix-Cache: {extra['prefill_tokens_skipped']} Prefill-Tokens übersprungen | "
+                  f"{extra['prefill_tokens']} berechnet")
+        if extra and extra.get("stop_reason"):
+            print(f"[{get_ts()}] [PERF] Stopp: {extra['stop_reason']} | {extra.get('tokens_saved', 0)} Tokens gespart "
+                  f"(Budget {extra.get('token_budget')})")
+        if extra and "fusion_tokens" in extra:
+            print(f"[{get_ts()}] [PERF] Kontext-Fusion: {extra['fusion_input_tokens']} -> {extra['fusion_tokens']} Tokens "
+                  f"(Budget {extra['fusion_budget']}) "
+                  + ("aus Cache" if extra.get("fusion_cached") else f"in {extra['fusion_sec'] * 1000:.1f} ms"))
+        if extra and "prefetch_hidden_sec" in extra:
+            print(f"[{get_ts()}] [PERF] Prefetch: {extra['prefetch_hidden_sec']:.2f}s Ladezeit versteckt | "
+                  f"{extra['prefetch_exposed_sec']:.2f}s sichtbar")
         print("="*50 + "\n")
         
         # Rückgabe als Dictionary für das DTO (State)
-        return {
+        metrics = {
             "model": model_name,
             "duration_sec": round(duration, 2),
             "tokens": token_count,
             "speed_tps": round(tps, 2),
-            "vram_mb": round(vram_used, 0)
-        }
\ No newline at end of file
+            "vram_mb": round(vram_used_mb, 0)
+        }
+        # 🔵 NEU: Zähler des Modell-Caches (kumuliert seit Start des Managers)
+        for key, value in (cache_stats or {}).items():
+            metrics[f"cache_{key}"] = value
+        metrics.update(extra or {})
+        return metrics
\ No newline at end of file